@@ -14,13 +14,16 @@ import os
 import logging
 from .prompts import *  # 确保 CLARIFICATION_QUESTION_PROMPT 从这里导入
 from dotenv import load_dotenv
-from .tools import search_arxiv_papers_tool, search_crossref_papers_tool, search_web_content_tool, summarize_pdf, generate_gantt_chart_tool, search_google_scholar_site_tool
+from .tools import search_arxiv_papers_tool, search_local_papers_tool, search_crossref_papers_tool, search_web_content_tool, summarize_pdf, generate_gantt_chart_tool, search_google_scholar_site_tool
 from .state import ProposalState
+from .references import ReferenceRegistry, render_citation_table
 from ..utils.queue_util import QueueUtil
 from ..utils.stream_mes_util import StreamUtil
+from ..utils.metrics_util import MetricsUtil, token_usage_callback
+from ..utils.token_util import PromptBudget
 from ..entity.stream_mes import StreamMes, StreamAnswerMes
-from langchain_chroma import Chroma
-from langchain_dashscope import DashScopeEmbeddings
+from ..services.memory_service import search_memory, save_memory, build_memory_chunks
+from ..services.literature_service import search_literature, upsert_papers, record_summary, find_summary, paper_key
 
 load_dotenv()
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY")
@@ -45,12 +48,14 @@ class ProposalAgent:
             base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
             temperature=0,
             streaming=True,  # 统一为流式输出
+            stream_usage=True,  # 流式输出时返回token用量，用于指标统计
+            callbacks=[token_usage_callback],
         )
 
         # 设置Tavily API密钥
         # os.environ["TAVILY_API_KEY"] = TAVILY_API_KEY
 
-        self.tools = [search_arxiv_papers_tool, search_web_content_tool, search_crossref_papers_tool, summarize_pdf, generate_gantt_chart_tool, search_google_scholar_site_tool]
+        self.tools = [search_local_papers_tool, search_arxiv_papers_tool, search_web_content_tool, search_crossref_papers_tool, summarize_pdf, generate_gantt_chart_tool, search_google_scholar_site_tool]
         self.tools_description = self.load_tools_description()
         self.agent_with_tools = create_react_agent(self.llm, self.tools)
         
@@ -58,15 +63,6 @@ class ProposalAgent:
         print("先编译工作流...")
         self.workflow = self._build_workflow()
         
-        print("再初始化向量数据库...")
-        # 初始化长期记忆
-        self.embedding_function = DashScopeEmbeddings(model="text-embedding-v4")
-        self.long_term_memory = Chroma(
-            collection_name="proposal_agent_memory",
-            embedding_function=self.embedding_function,
-            persist_directory="./chroma_db"  # 持久化存储路径
-        )
-
         # self.workflow = self._build_workflow()
 
     def load_tools_description(self) -> List[Dict]:
@@ -188,18 +184,22 @@ class ProposalAgent:
         # --- 从长期记忆中检索相关信息 ---
         logging.info(f"🔍 正在从长期记忆中检索与 '{research_field_original}' 相关的信息...")
         try:
-            retrieved_docs = self.long_term_memory.similarity_search(research_field_original, k=2)  # 检索最相关的2个
+            retrieved_docs = search_memory(research_field_original)  # 超过相关度阈值的片段中MMR选取
         except Exception as e:
             logging.warning(f"⚠️ 从长期记忆中检索信息失败: {e}")
             retrieved_docs = []
 
         retrieved_knowledge_text = ""
         if retrieved_docs:
-            logging.info(f"✅ 从长期记忆中检索到 {len(retrieved_docs)} 条相关记录。")
-            retrieved_knowledge_text += "\n\n### 供参考的历史研究项目摘要\n"
-            retrieved_knowledge_text += "这是过去完成的类似研究项目，你可以借鉴它们的思路和结论，但不要照搬。\n"
+            logging.info(f"✅ 从长期记忆中检索到 {len(retrieved_docs)} 条相关片段。")
+            retrieved_knowledge_text += "\n\n### 供参考的历史研究项目片段\n"
+            retrieved_knowledge_text += "这是过去完成的类似研究项目中的相关片段，你可以借鉴它们的思路和结论，但不要照搬。\n"
             for i, doc in enumerate(retrieved_docs):
-                retrieved_knowledge_text += f"\n--- 相关历史项目 {i + 1} ---\n"
+                metadata = doc.metadata or {}
+                details = [metadata.get(key) for key in ("section", "date") if metadata.get(key)]
+                if metadata.get("review_score") is not None:
+                    details.append(f"评审得分 {metadata['review_score']}")
+                retrieved_knowledge_text += f"\n--- 相关片段 {i + 1}（{'，'.join(map(str, details)) or '历史项目'}）---\n"
                 retrieved_knowledge_text += doc.page_content
                 retrieved_knowledge_text += "\n--------------------------\n"        # ------------------------------------
 
@@ -293,10 +293,14 @@ class ProposalAgent:
             tools_info=tools_info
         )
         
-        # 将所有上下文信息整合到最终的提示中
+        # 将所有上下文信息整合到最终的提示中，历史知识超出预算时优先裁剪
+        parts = (PromptBudget("create_master_plan")
+                 .add("master_planning_prompt", master_planning_prompt, trimmable=False)
+                 .add("retrieved_knowledge", retrieved_knowledge_text, priority=0)
+                 .fit())
         final_prompt = (
             f"{master_planning_prompt}\n"
-            f"{retrieved_knowledge_text}"
+            f"{parts['retrieved_knowledge']}"
         )
         
         logging.info(f"🤖 Agent正在为 '{research_field_original}' (已考虑用户澄清和历史知识) 制定总体研究计划...")
@@ -395,12 +399,28 @@ class ProposalAgent:
                     status = "成功" if success else "失败"
                     memory_text += f"- {description}: {status} - {result[:100]}...\n"
 
+        # 先查本地文献库，已覆盖的论文直接加入资料，规划时只为缺口安排外部检索
+        local_literature_text = ""
+        local_papers = self.add_local_papers(state, self.search_local_literature(research_field))
+        if local_papers:
+            state = self.add_references_from_data(state)
+            local_literature_text = "\n\n本地文献库中已有以下相关论文（已加入资料，不要重复检索，只为尚未覆盖的方面安排检索步骤）:\n"
+            local_literature_text += "".join(f"- {paper.get('title', '')} ({paper.get('published', '')})\n"
+                                             for paper in local_papers)
+
+        parts = (PromptBudget("plan_analysis")
+                 .add("instruction", EXECUTION_PLAN_PROMPT + tools_info, trimmable=False)
+                 .add("research_plan", research_plan, priority=1)
+                 .add("memory_text", memory_text, priority=0)
+                 .add("local_literature", local_literature_text, priority=1)
+                 .fit())
+
         # 首先让Agent分析计划，确定检索策略
         plan_analysis_prompt = EXECUTION_PLAN_PROMPT.format(
             research_field=research_field,
-            research_plan=research_plan,
+            research_plan=parts["research_plan"],
             tools_info=tools_info,
-            memory_text=memory_text
+            memory_text=parts["memory_text"] + parts["local_literature"]
         )
         logging.info("🔍 Agent正在分析计划并生成执行步骤...")
         full_content = StreamUtil.transfer_stream_answer_mes(
@@ -474,6 +494,7 @@ class ProposalAgent:
         try:
             # 根据action_name调用相应的工具
             tool_to_call = {
+                "search_local_papers": search_local_papers_tool,
                 "search_arxiv_papers": search_arxiv_papers_tool,
                 "search_web_content": search_web_content_tool,
                 "search_crossref_papers": search_crossref_papers_tool,
@@ -482,16 +503,38 @@ class ProposalAgent:
             }.get(action_name)
 
             if tool_to_call:
-                result = tool_to_call.invoke(parameters)
+                tool_start_time = time.time()
+                try:
+                    if action_name == "search_arxiv_papers":
+                        result = self.search_arxiv_with_local_index(state, parameters)
+                    elif action_name == "summarize_pdf":
+                        result = self.summarize_pdf_with_local_index(parameters)
+                    else:
+                        result = tool_to_call.invoke(parameters)
+                except Exception:
+                    MetricsUtil.record_tool_call(action_name, False, time.time() - tool_start_time)
+                    raise
+                MetricsUtil.record_tool_call(action_name, True, time.time() - tool_start_time)
                 # 特定于工具的状态更新
                 if action_name == "search_arxiv_papers":
                     state["arxiv_papers"].extend(result or [])
+                elif action_name == "search_local_papers":
+                    self.add_local_papers(state, result or [])
                 elif action_name in ["search_web_content", "search_crossref_papers", "search_google_scholar_site"]:
                     state["web_search_results"].extend(result or [])
+                    if action_name == "search_crossref_papers":
+                        try:
+                            upsert_papers(result or [], paper_type="CrossRef")
+                        except Exception as e:
+                            logging.warning(f"⚠️ 写入本地文献库失败: {e}")
                 elif action_name == "summarize_pdf" and result and "summary" in result:
                     for paper in state["arxiv_papers"]:
                         if paper.get("local_pdf_path") == parameters.get("path"):
                             paper["detailed_summary"] = result["summary"]
+                            # 论文可能已登记，同步更新参考文献中的摘要
+                            registry = ReferenceRegistry(state)
+                            registry.update_summary(paper.get("arxiv_id", ""), result["summary"])
+                            registry.save()
                             break
             else:
                 result = f"未知或不支持的 action: {action_name}"
@@ -525,15 +568,79 @@ class ProposalAgent:
         logging.info(f"✅ 步骤 {state['current_step']}/{len(execution_plan)} 执行完成: {action_name}")
         return state
 
+    def search_local_literature(self, query: str, k: int = None) -> List[Dict]:
+        """检索本地文献库，失败时返回空列表（退化为只用外部检索）"""
+        try:
+            return search_literature(query, k=k) if k else search_literature(query)
+        except Exception as e:
+            logging.warning(f"⚠️ 本地文献库检索失败: {e}")
+            return []
+
+    def add_local_papers(self, state: ProposalState, papers: List[Dict]) -> List[Dict]:
+        """把本地文献库的论文加入检索结果（arXiv论文和CrossRef文献分别归入对应列表），返回本次新加入的论文"""
+        known = {paper_key(paper) for paper in state["arxiv_papers"] + state["web_search_results"]}
+        added = []
+        for paper in papers:
+            if "error" in paper or paper_key(paper) in known:
+                continue
+            known.add(paper_key(paper))
+            (state["arxiv_papers"] if paper.get("type") == "ArXiv" else state["web_search_results"]).append(paper)
+            added.append(paper)
+        if added:
+            logging.info(f"📚 从本地文献库加入 {len(added)} 篇论文")
+        return added
+
+    def search_arxiv_with_local_index(self, state: ProposalState, parameters: Dict) -> List[Dict]:
+        """
+        先查本地文献库，相关论文（含已加入资料的）不足max_results篇时才调用arXiv补齐差额
+        返回本次新增的论文，外部检索到的论文同时写入文献库
+        """
+        query = parameters.get("query", state["research_field"])
+        max_results = int(parameters.get("max_results", 10))
+        local_papers = [paper for paper in self.search_local_literature(query, k=max_results)
+                        if paper.get("type") == "ArXiv"]
+        known = {paper_key(paper) for paper in state["arxiv_papers"] + state["web_search_results"]}
+        new_local = [paper for paper in local_papers if paper_key(paper) not in known]
+        missing = max_results - len(local_papers)
+        if missing <= 0:
+            logging.info(f"📚 本地文献库已覆盖 '{query}'（{len(local_papers)} 篇），跳过arXiv检索")
+            return new_local
+        logging.info(f"📚 本地文献库命中 {len(local_papers)} 篇，从arXiv补充 {missing} 篇")
+        remote_papers = search_arxiv_papers_tool.invoke({**parameters, "max_results": missing})
+        try:
+            upsert_papers(remote_papers or [])
+        except Exception as e:
+            logging.warning(f"⚠️ 写入本地文献库失败: {e}")
+        return new_local + (remote_papers or [])
+
+    def summarize_pdf_with_local_index(self, parameters: Dict) -> Dict:
+        """PDF已在之前的计划书中总结过时直接复用摘要，否则调用总结工具并保存结果"""
+        path = parameters.get("path", "")
+        try:
+            summary = find_summary(path) if path else ""
+        except Exception as e:
+            logging.warning(f"⚠️ 查询本地文献库摘要失败: {e}")
+            summary = ""
+        if summary:
+            logging.info(f"📚 复用本地文献库中的PDF摘要: {path}")
+            return {"summary": summary, "source_excerpt": "", "total_length": 0, "from_local_index": True}
+        result = summarize_pdf.invoke(parameters)
+        if result and result.get("summary"):
+            try:
+                record_summary(path, result["summary"])
+            except Exception as e:
+                logging.warning(f"⚠️ 保存PDF摘要到本地文献库失败: {e}")
+        return result
+
     def add_references_from_data(self, state: ProposalState) -> ProposalState:
         """从收集的数据中提取并添加参考文献"""
         state["global_step_num"] += 1
         start_time = time.time()
 
-        arxiv_papers = state.get("arxiv_papers", [])
-        web_results = state.get("web_search_results", [])
-        reference_list = state.get("reference_list", [])
-        ref_counter = state.get("ref_counter", 1)
+        # 只处理上次调用之后新增的检索结果，查重走索引
+        registry = ReferenceRegistry(state)
+        arxiv_papers = registry.take_new("arxiv_papers", state.get("arxiv_papers", []))
+        web_results = registry.take_new("web_search_results", state.get("web_search_results", []))
 
         QueueUtil.push_mes(StreamAnswerMes(
             proposal_id=state["proposal_id"],
@@ -543,70 +650,59 @@ class ProposalAgent:
         ))
 
         # 处理ArXiv论文
+        new_arxiv_count = 0
         for paper in arxiv_papers:
             if "error" not in paper:
-                # 检查是否已经存在
-                paper_title = paper.get('title', 'Unknown')
-                existing_ref = next((ref for ref in reference_list if ref.get('title') == paper_title), None)
-
-                if not existing_ref:
-                    reference_list.append({
-                        "id": ref_counter,
-                        "type": "ArXiv",
-                        "title": paper_title,
-                        "authors": paper.get('authors', []),
-                        "published": paper.get('published', 'Unknown'),
-                        "arxiv_id": paper.get('arxiv_id', ''),
-                        "categories": paper.get('categories', []),
-                        "summary": paper.get('detailed_summary', paper.get('summary', ''))  # 优先使用详细摘要
-                    })
-                    ref_counter += 1
+                new_arxiv_count += registry.add({
+                    "type": "ArXiv",
+                    "title": paper.get('title', 'Unknown'),
+                    "authors": paper.get('authors', []),
+                    "published": paper.get('published', 'Unknown'),
+                    "arxiv_id": paper.get('arxiv_id', ''),
+                    "categories": paper.get('categories', []),
+                    "summary": paper.get('detailed_summary', paper.get('summary', ''))  # 优先使用详细摘要
+                })
 
         QueueUtil.push_mes(StreamAnswerMes(
             proposal_id=state["proposal_id"],
             step=state["global_step_num"],
             title="",
-            content=f"\n\n✅ 成功处理Arxiv论文，共 {len(arxiv_papers)} 篇",
+            content=f"\n\n✅ 成功处理Arxiv论文，新增 {len(arxiv_papers)} 篇，去重后新增 {new_arxiv_count} 篇",
         ))
 
         # 处理网络搜索结果和CrossRef结果
+        new_web_count = 0
         for result in web_results:
             if "error" not in result:
                 result_title = result.get('title', result.get('url', 'Unknown'))
-                existing_ref = next((ref for ref in reference_list if ref.get('title') == result_title), None)
-
-                if not existing_ref:
-                    # 区分CrossRef和普通Web结果
-                    if result.get('doi'):  # CrossRef结果
-                        reference_list.append({
-                            "id": ref_counter,
-                            "type": "CrossRef",
-                            "title": result_title,
-                            "authors": result.get('authors', []),
-                            "doi": result.get('doi', ''),
-                            "journal": result.get('journal', ''),
-                            "published": result.get('published', ''),
-                            "url": result.get('url', '')
-                        })
-                    else:  # 普通Web结果
-                        reference_list.append({
-                            "id": ref_counter,
-                            "type": "Web",
-                            "title": result_title,
-                            "url": result.get('url', ''),
-                            "content_preview": result.get('content', result.get('snippet', 'No content'))[:200]
-                        })
-                    ref_counter += 1
+                # 区分CrossRef和普通Web结果
+                if result.get('doi'):  # CrossRef结果
+                    reference = {
+                        "type": "CrossRef",
+                        "title": result_title,
+                        "authors": result.get('authors', []),
+                        "doi": result.get('doi', ''),
+                        "journal": result.get('journal', ''),
+                        "published": result.get('published') or str(result.get('year') or ''),
+                        "url": result.get('url', '')
+                    }
+                else:  # 普通Web结果
+                    reference = {
+                        "type": "Web",
+                        "title": result_title,
+                        "url": result.get('url', ''),
+                        "content_preview": result.get('content', result.get('snippet', 'No content'))[:200]
+                    }
+                new_web_count += registry.add(reference)
 
         QueueUtil.push_mes(StreamAnswerMes(
             proposal_id=state["proposal_id"],
             step=state["global_step_num"],
             title="",
-            content=f"\n\n✅ 成功处理网络结果和CrossRef论文，共 {len(web_results)} 篇",
+            content=f"\n\n✅ 成功处理网络结果和CrossRef论文，新增 {len(web_results)} 篇，去重后新增 {new_web_count} 篇",
         ))
 
-        state["reference_list"] = reference_list
-        state["ref_counter"] = ref_counter
+        registry.save()
 
         QueueUtil.push_mes(StreamAnswerMes(
             proposal_id=state["proposal_id"],
@@ -616,54 +712,28 @@ class ProposalAgent:
         )
         return state
 
-    def get_literature_summary_with_refs(self, state: ProposalState) -> str:
-        """获取带有统一编号的文献摘要"""
+    def build_citation_table(self, state: ProposalState) -> str:
+        """基于当前（重排序后的）参考文献列表构建紧凑引用表，并缓存到state中供各章节复用"""
         state["global_step_num"] += 1
         start_time = time.time()
 
         reference_list = state.get("reference_list", [])
-        literature_summary = ""
-
-        # 按类型分组显示
-        arxiv_refs = [ref for ref in reference_list if ref.get("type") == "ArXiv"]
-        web_refs = [ref for ref in reference_list if ref.get("type") == "Web"]
-
-        if arxiv_refs:
-            literature_summary += "\n\n**相关Arxiv论文：**\n"
-            for ref in arxiv_refs:
-                literature_summary += f"[{ref['id']}] {ref['title']}\n"
-                literature_summary += f"   作者: {', '.join(ref['authors'])}\n"
-                literature_summary += f"   发表时间: {ref['published']}\n"
-                literature_summary += f"   摘要: {ref['summary']}\n"
-                literature_summary += f"   分类: {', '.join(ref['categories'])}\n\n"
-            QueueUtil.push_mes(StreamAnswerMes(
-                proposal_id=state["proposal_id"],
-                step=state["global_step_num"],
-                title="引用编号处理",
-                content=f"\n\n✅ 成功生成Arxiv论文引用编号，共 {len(arxiv_refs)} 篇",
-            ))
-
-        if web_refs:
-            literature_summary += "\n**相关网络信息：**\n"
-            for ref in web_refs:
-                literature_summary += f"[{ref['id']}] {ref['title']}\n"
-                literature_summary += f"   来源: {ref['url']}\n"
-                literature_summary += f"   内容摘要: {ref['content_preview']}...\n\n"
-
-            QueueUtil.push_mes(StreamAnswerMes(
-                proposal_id=state["proposal_id"],
-                step=state["global_step_num"],
-                title="",
-                content=f"\n\n✅ 成功生成网络资源和CrossRef论文引用编号，共 {len(web_refs)} 篇",
-            ))
+        citation_table = render_citation_table(reference_list)
+        state["citation_table"] = citation_table
 
+        QueueUtil.push_mes(StreamAnswerMes(
+            proposal_id=state["proposal_id"],
+            step=state["global_step_num"],
+            title="引用编号处理",
+            content=f"\n\n✅ 成功生成文献引用表，共 {len(reference_list)} 篇",
+        ))
         QueueUtil.push_mes(StreamAnswerMes(
             proposal_id=state["proposal_id"],
             step=state["global_step_num"],
             title="",
             content="\n\n✅ 处理完成，共耗时 %.2fs" % (time.time() - start_time))
         )
-        return literature_summary
+        return citation_table
 
     def generate_reference_section(self, state: ProposalState) -> str:
         """生成格式化的参考文献部分"""
@@ -723,8 +793,8 @@ class ProposalAgent:
             ref["id"] = i
 
         state["reference_list"] = rank_reference_list
-        # 使用统一的文献摘要
-        literature_summary = self.get_literature_summary_with_refs(state)
+        # 每次重排序后构建一次引用表，后续章节直接复用
+        citation_table = self.build_citation_table(state)
 
         state["global_step_num"] += 1
         start_time = time.time()
@@ -749,6 +819,14 @@ class ProposalAgent:
         请根据上述修订指导对引言部分进行针对性改进。
         """
 
+        # 按token预算裁剪各部分
+        parts = (PromptBudget("write_introduction")
+                 .add("instruction", proposal_introduction_instruction + citation_instruction, trimmable=False)
+                 .add("research_plan", research_plan, priority=3)
+                 .add("citation_table", citation_table, priority=1)
+                 .add("revision_instruction", revision_instruction, priority=2)
+                 .fit())
+
         # 使用prompts.py中的instruction
         introduction_prompt = f"""
         {proposal_introduction_instruction}
@@ -756,16 +834,13 @@ class ProposalAgent:
         **研究主题：** {research_field}
         
         **研究计划：**
-        {research_plan}
+        {parts["research_plan"]}
         
-        **已收集的文献和信息：**
-        {literature_summary}
+        **已收集的文献（引用表）：**
+        {parts["citation_table"]}
         {citation_instruction}
         
-        **真实的文献列表**
-        {state["reference_list"]}
-        
-        {revision_instruction}
+        {parts["revision_instruction"]}
 
         请基于以上信息，按照instruction的要求，为"{research_field}"这个研究主题撰写一个学术规范的引言部分。
         
@@ -805,7 +880,7 @@ class ProposalAgent:
         introduction_content = state.get("introduction", "")
 
         # 使用统一的文献摘要
-        literature_summary = self.get_literature_summary_with_refs(state)
+        citation_table = state.get("citation_table") or self.build_citation_table(state)
 
         state["global_step_num"] += 1
         start_time = time.time()
@@ -833,28 +908,33 @@ class ProposalAgent:
         6. 对引言中提及的关键概念和理论进行更深入的文献分析
         """
 
+        section_instruction = LITERATURE_REVIEW_PROMPT.format(research_field=research_field)
+        parts = (PromptBudget("write_literature_review")
+                 .add("instruction", section_instruction + citation_instruction + coherence_instruction, trimmable=False)
+                 .add("research_plan", research_plan, priority=3)
+                 .add("introduction", introduction_content, priority=2)
+                 .add("citation_table", citation_table, priority=1)
+                 .fit())
+
         # 使用prompts.py中的LITERATURE_REVIEW_PROMPT
         literature_review_prompt = f"""
-        {LITERATURE_REVIEW_PROMPT.format(research_field=research_field)}
+        {section_instruction}
         
         **研究主题：** {research_field}
         
         **研究计划：**
-        {research_plan}
+        {parts["research_plan"]}
         
         **已完成的引言部分：**
-        {introduction_content}
+        {parts["introduction"]}
         
-        **已收集的文献和信息：**
-        {literature_summary}
+        **已收集的文献（引用表）：**
+        {parts["citation_table"]}
         
         {citation_instruction}
         
         {coherence_instruction}
         
-        **真实的文献列表**
-        {state["reference_list"]}
-        
         请基于以上信息，按照instruction的要求，为"{research_field}"这个研究主题撰写一个学术规范的文献综述部分。
         
         要求：
@@ -897,7 +977,7 @@ class ProposalAgent:
         literature_review_content = state.get("literature_review", "")
 
         # 使用统一的文献摘要
-        literature_summary = self.get_literature_summary_with_refs(state)
+        citation_table = state.get("citation_table") or self.build_citation_table(state)
 
         state["global_step_num"] += 1
         start_time = time.time()
@@ -924,31 +1004,37 @@ class ProposalAgent:
         6. 明确说明为什么选择的方法适合解决引言中提出的研究问题
         """
 
+        section_instruction = PROJECT_DESIGN_PROMPT.format(research_field=research_field)
+        parts = (PromptBudget("write_research_design")
+                 .add("instruction", section_instruction + citation_instruction + coherence_instruction, trimmable=False)
+                 .add("research_plan", research_plan, priority=3)
+                 .add("introduction", introduction_content, priority=1)
+                 .add("literature_review", literature_review_content, priority=2)
+                 .add("citation_table", citation_table, priority=1)
+                 .fit())
+
         # 使用prompts.py中的PROJECT_DESIGN_PROMPT
         research_design_prompt = f"""
-        {PROJECT_DESIGN_PROMPT.format(research_field=research_field)}
+        {section_instruction}
         
         **研究主题：** {research_field}
         
         **研究计划概要：**
-        {research_plan}
+        {parts["research_plan"]}
         
         **已完成的引言部分：**
-        {introduction_content}
+        {parts["introduction"]}
         
         **已完成的文献综述部分：**
-        {literature_review_content}
+        {parts["literature_review"]}
         
-        **已收集的文献和信息（用于可能的引用）：**
-        {literature_summary}
+        **已收集的文献引用表（用于可能的引用）：**
+        {parts["citation_table"]}
         
         {citation_instruction}
         
         {coherence_instruction}
         
-        **真实的文献列表**
-        {state["reference_list"]}
-        
         请基于以上信息，按照instruction的要求，为"{research_field}"这个研究主题撰写一个学术规范的研究设计部分。
         重点关注研究数据、方法、工作流程和局限性。
         必须**使用中文撰写**
@@ -993,7 +1079,7 @@ class ProposalAgent:
         research_design_content = state.get("research_design", "")
 
         # 为结论部分也添加文献引用能力
-        literature_summary = self.get_literature_summary_with_refs(state)
+        citation_table = state.get("citation_table") or self.build_citation_table(state)
         
         # 结论部分的引用指导
         citation_instruction = """
@@ -1005,8 +1091,16 @@ class ProposalAgent:
         5. 你所引用的内容必须真实来自文献列表
         """
 
+        section_instruction = CONCLUSION_PROMPT.format(research_field=research_field)
+        parts = (PromptBudget("write_conclusion")
+                 .add("instruction", section_instruction + citation_instruction, trimmable=False)
+                 .add("sections", introduction_content[:1000] + literature_review_content[:1000]
+                      + research_design_content[:1000], trimmable=False)
+                 .add("citation_table", citation_table, priority=1)
+                 .fit())
+
         conclusion_prompt_text = f"""
-        {CONCLUSION_PROMPT.format(research_field=research_field)}
+        {section_instruction}
 
         **研究主题：** {research_field}
 
@@ -1019,13 +1113,10 @@ class ProposalAgent:
         **已完成的研究设计部分摘要（用于回顾方法和流程）：**
         {research_design_content[:1000]}...
         
-        **已收集的文献和信息（用于可能的引用）：**
-        {literature_summary}
+        **已收集的文献引用表（用于可能的引用）：**
+        {parts["citation_table"]}
         
         {citation_instruction}
-        
-        **真实的文献列表**
-        {state["reference_list"]}
 
         请基于以上提供的引言、文献综述和研究设计内容，撰写一个连贯的结论部分。
         结论应包含时间轴、预期成果和最终总结。
@@ -1292,10 +1383,10 @@ class ProposalAgent:
             content="\n\n🔍 正在评审研究计划书"
         ))
         
-        # 初始化ReviewerAgent并进行评审
+        # 使用进程内共享的ReviewerAgent进行评审（内容未变化时直接复用缓存的评审结果）
         try:
-            from src.reviewer.reviewer import ReviewerAgent
-            reviewer = ReviewerAgent()
+            from src.reviewer.reviewer import get_reviewer
+            reviewer = get_reviewer()
             review_result = reviewer.review_proposal(report_content, research_field)
             
             if review_result.get("success"):
@@ -1312,6 +1403,11 @@ class ProposalAgent:
                 for criterion, score in scores.items():
                     if criterion != "总体评分":
                         score_message += f"\n- {criterion}: {score}/10"
+                section_scores = review_result.get("section_scores", {})
+                if section_scores:
+                    score_message += "\n\n**章节得分**:" + "".join(
+                        f"\n- {section}: {'缺失' if score is None else f'{score}/10'}" for section, score in section_scores.items()
+                    )
                         
                 QueueUtil.push_mes(StreamAnswerMes(
                     proposal_id=state["proposal_id"],
@@ -1485,47 +1581,11 @@ class ProposalAgent:
         
         overall_score = llm_scores.get("总体评分", 0)
         logging.info(f"获取到的总体评分: {overall_score} (类型: {type(overall_score)})")
-          # 如果无法获取有效的评审结果，尝试从文件中读取
-        if not review_result or not review_result.get("success", False):
-            logging.warning("⚠️ 状态中无法获取有效的评审结果，尝试从文件中读取")
-            
-            try:
-                # 尝试从JSON文件中读取评审结果
-                proposal_id = state.get("proposal_id", "")
-                if proposal_id:
-                    reviews_dir = Path(__file__).parent.parent.parent.parent / "output" / "reviews"
-                    review_filepath = reviews_dir / f"Review_{proposal_id}.json"
-                    
-                    if review_filepath.exists():
-                        logging.info(f"📁 尝试从文件读取评审结果: {review_filepath}")
-                        with open(review_filepath, 'r', encoding='utf-8') as f:
-                            file_review_result = json.load(f)
-                        
-                        if file_review_result.get("success", False):
-                            logging.info("✅ 成功从文件中读取到有效的评审结果")
-                            review_result = file_review_result
-                            # 重新获取评分信息
-                            llm_scores = review_result.get("llm_scores", {})
-                            overall_score = llm_scores.get("总体评分", 0)
-                            logging.info(f"📁 从文件获取的总体评分: {overall_score}")
-                        else:
-                            logging.warning("⚠️ 文件中的评审结果也无效")
-                    else:
-                        logging.warning(f"⚠️ 评审结果文件不存在: {review_filepath}")
-            except Exception as e:
-                logging.error(f"❌ 从文件读取评审结果失败: {e}")
-            
-            # 如果仍然无法获取有效结果，强制进行改进
-            if not review_result or not review_result.get("success", False):
-                logging.warning("⚠️ 最终无法获取有效的评审结果，强制进行改进")
-                return "improve"
-          # 重新获取评分信息（可能从文件中更新了review_result）
-        llm_scores = review_result.get("llm_scores", {})
-        logging.info(f"llm_scores类型: {type(llm_scores)}")
-        logging.info(f"llm_scores: {llm_scores}")
         
-        overall_score = llm_scores.get("总体评分", 0)
-        logging.info(f"最终获取到的总体评分: {overall_score} (类型: {type(overall_score)})")
+        # 评审结果由 review_proposal_node 直接写入状态；无效时强制进行改进
+        if not review_result or not review_result.get("success", False):
+            logging.warning("⚠️ 状态中没有有效的评审结果，强制进行改进")
+            return "improve"
         
         # 如果无法获取评分，强制进行改进    
         if overall_score == 0 or not isinstance(overall_score, (int, float)):
@@ -1569,9 +1629,9 @@ class ProposalAgent:
         ))
         
         try:
-            # 导入ReviewerAgent
-            from src.reviewer.reviewer import ReviewerAgent
-            reviewer = ReviewerAgent()
+            # 使用进程内共享的ReviewerAgent
+            from src.reviewer.reviewer import get_reviewer
+            reviewer = get_reviewer()
             
             # 使用ReviewerAgent生成修订指导
             guidance_result = reviewer.generate_revision_guidance(
@@ -1794,26 +1854,26 @@ class ProposalAgent:
         workflow = StateGraph(ProposalState)
 
         # 1. 定义所有节点
-        workflow.add_node("clarify_focus", self.clarify_research_focus_node)
-        workflow.add_node("create_master_plan", self.create_master_plan_node)
-        workflow.add_node("plan_analysis", self.plan_analysis_node)
-        workflow.add_node("execute_step", self.execute_step_node)
-        workflow.add_node("summarize_history", self.summarize_history_node)  # 短期记忆节点
-        workflow.add_node("add_references", self.add_references_from_data)
+        workflow.add_node("clarify_focus", MetricsUtil.trace_node("clarify_focus", self.clarify_research_focus_node))
+        workflow.add_node("create_master_plan", MetricsUtil.trace_node("create_master_plan", self.create_master_plan_node))
+        workflow.add_node("plan_analysis", MetricsUtil.trace_node("plan_analysis", self.plan_analysis_node))
+        workflow.add_node("execute_step", MetricsUtil.trace_node("execute_step", self.execute_step_node))
+        workflow.add_node("summarize_history", MetricsUtil.trace_node("summarize_history", self.summarize_history_node))  # 短期记忆节点
+        workflow.add_node("add_references", MetricsUtil.trace_node("add_references", self.add_references_from_data))
 
         # 报告生成节点
-        workflow.add_node("write_introduction", self.write_introduction_node)
-        workflow.add_node("write_literature_review", self.write_literature_review_node)
-        workflow.add_node("write_research_design", self.write_research_design_node)
-        workflow.add_node("write_conclusion", self.write_conclusion_node)
-        workflow.add_node("generate_final_references", self.generate_final_references_node)
-        workflow.add_node("generate_final_report", self.generate_final_report_node)
+        workflow.add_node("write_introduction", MetricsUtil.trace_node("write_introduction", self.write_introduction_node))
+        workflow.add_node("write_literature_review", MetricsUtil.trace_node("write_literature_review", self.write_literature_review_node))
+        workflow.add_node("write_research_design", MetricsUtil.trace_node("write_research_design", self.write_research_design_node))
+        workflow.add_node("write_conclusion", MetricsUtil.trace_node("write_conclusion", self.write_conclusion_node))
+        workflow.add_node("generate_final_references", MetricsUtil.trace_node("generate_final_references", self.generate_final_references_node))
+        workflow.add_node("generate_final_report", MetricsUtil.trace_node("generate_final_report", self.generate_final_report_node))
         
         # 评审和改进节点
-        workflow.add_node("review_proposal", self.review_proposal_node)
-        workflow.add_node("generate_revision_guidance", self.generate_revision_guidance_node)
-        workflow.add_node("apply_improvements", self.apply_improvements_node)
-        workflow.add_node("save_memory", self.save_to_long_term_memory_node)  # 长期记忆节点
+        workflow.add_node("review_proposal", MetricsUtil.trace_node("review_proposal", self.review_proposal_node))
+        workflow.add_node("generate_revision_guidance", MetricsUtil.trace_node("generate_revision_guidance", self.generate_revision_guidance_node))
+        workflow.add_node("apply_improvements", MetricsUtil.trace_node("apply_improvements", self.apply_improvements_node))
+        workflow.add_node("save_memory", MetricsUtil.trace_node("save_memory", self.save_to_long_term_memory_node))  # 长期记忆节点
 
         # 2. 设置图的入口点
         workflow.set_entry_point("clarify_focus")
@@ -1911,6 +1971,11 @@ class ProposalAgent:
             "timeline_plan": "",
             "expected_results": "",
             "reference_list": [],  # 初始化统一参考文献列表
+            "reference_index": {},  # 参考文献查重索引
+            "reference_lsh": {},  # 参考文献近似重复检测的LSH桶
+            "reference_cursor": {},  # 各检索来源已登记到的位置
+            "reference_fingerprint": "",  # 建索引时参考文献列表的指纹
+            "citation_table": "",  # 重排序后构建的紧凑引用表
             "ref_counter": 1,  # 初始化参考文献计数器
             "final_references": "",
             "conclusion": "",
@@ -2049,27 +2114,25 @@ class ProposalAgent:
             logging.warning("⚠️ proposal_id 不存在，无法存入长期记忆。")
             return state
 
-        # 生成一个用于存储的文档
-        document_to_store = f"""
-        研究课题: {state.get('research_field')}
-        用户澄清: {state.get('user_clarifications', '无')}
-        最终研究计划摘要: {state.get('research_plan', '')[:500]}...
-        引言核心: {state.get('introduction', '')[:500]}...
-        文献综述要点: {state.get('literature_review', '')[:500]}...
-        最终结论: {state.get('conclusion', '')[:500]}...
-        """
+        # 按章节切片存储，元数据供检索时展示和过滤
+        review_scores = (state.get("review_result") or {}).get("llm_scores") or {}
+        metadata = {"timestamp": datetime.now().isoformat(), "date": datetime.now().strftime("%Y-%m-%d")}
+        if isinstance(review_scores.get("总体评分"), (int, float)):
+            metadata["review_score"] = float(review_scores["总体评分"])
+        sections = {
+            "研究计划": state.get("research_plan", ""),
+            "用户澄清": state.get("user_clarifications", ""),
+            "引言": state.get("introduction", ""),
+            "文献综述": state.get("literature_review", ""),
+            "研究设计": state.get("research_design", ""),
+            "结论": state.get("conclusion", ""),
+        }
+        texts, metadatas, ids = build_memory_chunks(proposal_id, state.get("research_field", ""), sections, metadata)
 
-        try:
-            self.long_term_memory.add_texts(
-                texts=[document_to_store],
-                metadatas=[{"proposal_id": proposal_id, "timestamp": datetime.now().isoformat()}],
-                ids=[proposal_id]  # 使用 proposal_id 作为唯一标识
-            )
-            # ChromaDB in-memory with persist_directory handles saving automatically on updates.
-            # self.long_term_memory.persist() # 显式调用 persist() 可能不是必需的，但可以确保写入
-            logging.info(f"✅ 成功将 proposal_id '{proposal_id}' 存入长期记忆。")
-        except Exception as e:
-            logging.error(f"❌ 存入长期记忆失败: {e}")        # 发送最终完成消息给前端
+        # 写入由后台线程攒批完成，这里不等待嵌入
+        save_memory(texts=texts, metadatas=metadatas, ids=ids)
+        logging.info(f"✅ 已提交 proposal_id '{proposal_id}' 的长期记忆写入（{len(texts)} 个片段）。")
+        # 发送最终完成消息给前端
         QueueUtil.push_mes(StreamAnswerMes(
             proposal_id=state["proposal_id"],
             step=state.get("global_step_num", 0),
@@ -68,6 +68,7 @@ Each step should be:
 - **Strategic**: prioritize steps that help advance the research plan meaningfully
 
 **Available Actions:**
+- `search_local_papers`: Search the local paper library (previously downloaded papers and past references) with keyword + semantic matching; fast and needs no external API
 - `search_arxiv_papers`: Search and download ArXiv papers
 - `search_web_content`: Search web content using Tavily
 - `search_crossref_papers`: Search academic papers via CrossRef
@@ -77,7 +78,7 @@ Each step should be:
 You cannot use `generate_gantt_chart` tool while making the execution plan.
 
 **Strategy for PDF Analysis:**
-1. First search and download relevant papers using arxiv or crossref tools
+1. First check the local library with search_local_papers, then search and download papers for the remaining gaps using arxiv or crossref tools
 2. For the most important/relevant papers, use summarize_pdf to get detailed analysis
 3. Use the PDF path from the download results (usually in "./papers/" directory)
 
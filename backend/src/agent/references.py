@@ -0,0 +1,336 @@
+"""
+参考文献的管理
+- ReferenceRegistry：按标准化标题、DOI、arXiv ID 建立索引，增量登记检索结果并合并跨来源的重复文献
+- NearDuplicateIndex：基于标题与作者shingle的MinHash/LSH索引，识别标题略有差异的近似重复文献
+- render_citation_table：重排序后构建一次引用表（编号、短标题、年份、精简摘要），在各章节prompt中复用，
+  替代原先完整的reference_list字典和重复的文献摘要
+"""
+import hashlib
+import logging
+import random
+import re
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Set
+
+_YEAR_PATTERN = re.compile(r"(19|20)\d{2}")
+_SENTENCE_PATTERN = re.compile(r"[^。！？.!?]+[。！？.!?]*\s*")
+
+_TITLE_STRIP_PATTERN = re.compile(r"[^0-9a-z\u4e00-\u9fff]+")
+_DOI_PATTERN = re.compile(r"10\.\d{4,9}/\S+", re.IGNORECASE)
+_ARXIV_ID_PATTERN = re.compile(r"(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(v\d+)?", re.IGNORECASE)
+_ARXIV_URL_PATTERN = re.compile(r"arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:\.pdf)?(?:[?#]|$)", re.IGNORECASE)
+
+# 同一文献出现在多个来源时保留信息最完整的类型
+_TYPE_RANK = {"ArXiv": 3, "CrossRef": 2, "Web": 1}
+
+# MinHash/LSH参数：60个哈希分12个band，每band 5行，候选阈值约为 (1/12)^(1/5) ≈ 0.6
+MINHASH_PERMUTATIONS = 60
+LSH_BANDS = 12
+SHINGLE_SIZE = 3
+# 候选对确认为重复的标题shingle Jaccard阈值；双方都有作者但作者姓氏无交集时要求更高
+TITLE_SIMILARITY_THRESHOLD = 0.8
+TITLE_SIMILARITY_THRESHOLD_NO_AUTHOR_OVERLAP = 0.95
+# 标准化后过短的标题（如网页的泛化标题）不参与模糊去重
+MIN_FUZZY_TITLE_LENGTH = 12
+
+_HASH_MASK = 0xFFFFFFFF
+_hash_rng = random.Random(20240601)  # 固定种子，保证state中保存的LSH桶在不同进程间一致
+_HASH_PARAMS = [(_hash_rng.getrandbits(32) | 1, _hash_rng.getrandbits(32)) for _ in range(MINHASH_PERMUTATIONS)]
+
+SHORT_TITLE_CHARS = 80
+ABSTRACT_CHARS = 160
+
+
+def _clean(text) -> str:
+    return " ".join(str(text or "").split())
+
+
+def extract_year(ref: Dict) -> str:
+    """从发表时间中提取年份，取不到时返回 n.d."""
+    match = _YEAR_PATTERN.search(str(ref.get("published", "")))
+    return match.group(0) if match else "n.d."
+
+
+def short_title(title: str, max_chars: int = SHORT_TITLE_CHARS) -> str:
+    title = _clean(title).rstrip(".")
+    if len(title) <= max_chars:
+        return title
+    return title[:max_chars].rstrip() + "…"
+
+
+def tight_abstract(text: str, max_chars: int = ABSTRACT_CHARS) -> str:
+    """按句子截取摘要开头，至少保留第一句的前max_chars个字符"""
+    text = _clean(text)
+    if len(text) <= max_chars:
+        return text
+    result = ""
+    for sentence in _SENTENCE_PATTERN.findall(text):
+        if len(result) + len(sentence) > max_chars:
+            break
+        result += sentence
+    result = result.strip()
+    return result if result else text[:max_chars].rstrip() + "…"
+
+
+def render_citation_table(reference_list: List[Dict], abstract_chars: int = ABSTRACT_CHARS) -> str:
+    """
+    将参考文献渲染为紧凑的引用表，每篇文献一行：[编号] 短标题 (年份) | 精简摘要
+    """
+    if not reference_list:
+        return "（暂无可引用的文献）"
+
+    lines = ["格式：[编号] 标题 (年份) | 摘要"]
+    for ref in reference_list:
+        abstract = ref.get("summary") or ref.get("content_preview") or ref.get("journal") or ""
+        line = f"[{ref['id']}] {short_title(ref.get('title', 'Unknown'))} ({extract_year(ref)})"
+        abstract = tight_abstract(abstract, abstract_chars)
+        if abstract:
+            line += f" | {abstract}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def normalize_title(title: str) -> str:
+    """标准化标题：统一全半角和大小写，去掉标点与空白"""
+    title = unicodedata.normalize("NFKC", str(title or "")).lower()
+    return _TITLE_STRIP_PATTERN.sub("", title)
+
+
+def normalize_doi(doi: str) -> str:
+    match = _DOI_PATTERN.search(str(doi or ""))
+    return match.group(0).lower().rstrip(".") if match else ""
+
+
+def normalize_arxiv_id(arxiv_id: str) -> str:
+    """去掉 arXiv: 前缀和版本号，2301.00001v2 与 2301.00001 视为同一篇"""
+    match = _ARXIV_ID_PATTERN.search(str(arxiv_id or ""))
+    return match.group(1).lower() if match else ""
+
+
+def author_surnames(authors: Iterable[str]) -> Set[str]:
+    """取作者姓氏（最后一个词），兼容 "J. Smith" 与 "John Smith" 两种写法"""
+    surnames = set()
+    for author in authors or []:
+        parts = str(author).replace(".", " ").split()
+        if parts:
+            surname = normalize_title(parts[-1])
+            if surname:
+                surnames.add(surname)
+    return surnames
+
+
+class NearDuplicateIndex:
+    """
+    近似重复文献的MinHash/LSH索引
+    对标准化标题取字符shingle计算MinHash签名，分band哈希入桶；只有落在同一桶中的候选才做精确比较，
+    登记和查询都是亚线性的。桶保存在普通dict中（band键 -> reference_list中的位置），可直接放入state
+    """
+
+    def __init__(self, buckets: Optional[Dict[str, List[int]]] = None):
+        self.buckets: Dict[str, List[int]] = buckets if buckets is not None else {}
+
+    @staticmethod
+    def shingles(title: str) -> Set[str]:
+        text = normalize_title(title)
+        if len(text) < MIN_FUZZY_TITLE_LENGTH:
+            return set()
+        return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+    @staticmethod
+    def signature(shingles: Set[str]) -> List[int]:
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+        return [min([(a * h + b) & _HASH_MASK for h in hashes]) for a, b in _HASH_PARAMS]
+
+    @classmethod
+    def band_keys(cls, shingles: Set[str]) -> List[str]:
+        """计算shingle集合对应的各band桶键，shingle为空（标题过短）时返回空列表"""
+        if not shingles:
+            return []
+        signature = cls.signature(shingles)
+        rows = MINHASH_PERMUTATIONS // LSH_BANDS
+        return [f"{band}:{zlib.crc32(repr(signature[band * rows:(band + 1) * rows]).encode())}"
+                for band in range(LSH_BANDS)]
+
+    @staticmethod
+    def is_duplicate(ref: Dict, other: Dict, ref_shingles: Optional[Set[str]] = None,
+                     other_shingles: Optional[Set[str]] = None) -> bool:
+        """候选对的精确判定：标题shingle的Jaccard相似度，结合作者姓氏是否有交集"""
+        if ref_shingles is None:
+            ref_shingles = NearDuplicateIndex.shingles(ref.get("title", ""))
+        if other_shingles is None:
+            other_shingles = NearDuplicateIndex.shingles(other.get("title", ""))
+        if not ref_shingles or not other_shingles:
+            return False
+        similarity = len(ref_shingles & other_shingles) / len(ref_shingles | other_shingles)
+        ref_authors = author_surnames(ref.get("authors", []))
+        other_authors = author_surnames(other.get("authors", []))
+        if ref_authors and other_authors and not ref_authors & other_authors:
+            return similarity >= TITLE_SIMILARITY_THRESHOLD_NO_AUTHOR_OVERLAP
+        return similarity >= TITLE_SIMILARITY_THRESHOLD
+
+    def query(self, ref: Dict, reference_list: List[Dict], band_keys: Optional[List[str]] = None) -> Optional[int]:
+        """返回与ref近似重复的已登记文献位置，没有则返回None"""
+        ref_shingles = self.shingles(ref.get("title", ""))
+        if band_keys is None:
+            band_keys = self.band_keys(ref_shingles)
+        checked = set()
+        for key in band_keys:
+            for position in self.buckets.get(key, []):
+                if position in checked:
+                    continue
+                checked.add(position)
+                if self.is_duplicate(ref, reference_list[position], ref_shingles):
+                    return position
+        return None
+
+    def add(self, ref: Dict, position: int, band_keys: Optional[List[str]] = None):
+        if band_keys is None:
+            band_keys = self.band_keys(self.shingles(ref.get("title", "")))
+        for key in band_keys:
+            bucket = self.buckets.setdefault(key, [])
+            if position not in bucket:
+                bucket.append(position)
+
+
+def cluster_near_duplicates(reference_list: List[Dict]) -> List[List[int]]:
+    """将参考文献列表聚类为近似重复簇，返回每个簇中各文献的位置（每簇第一个为规范记录）"""
+    index = NearDuplicateIndex()
+    clusters: Dict[int, List[int]] = {}
+    for position, ref in enumerate(reference_list):
+        band_keys = index.band_keys(index.shingles(ref.get("title", "")))
+        canonical = index.query(ref, reference_list, band_keys)
+        if canonical is None:
+            clusters[position] = [position]
+            index.add(ref, position, band_keys)
+        else:
+            clusters[canonical].append(position)
+    return list(clusters.values())
+
+
+class ReferenceRegistry:
+    """
+    参考文献登记表
+    索引(reference_index)、近似重复LSH桶(reference_lsh)和各来源已处理到的位置(reference_cursor)保存在state中，
+    每次只处理新增的检索结果；先按标识精确查重，未命中再做近似查重。
+    索引按位置记录文献，同时保存列表的指纹(reference_fingerprint)，列表被外部重排或替换时重建索引
+    """
+
+    def __init__(self, state: Dict):
+        self.state = state
+        self.reference_list: List[Dict] = state.get("reference_list") or []
+        self.index: Dict[str, int] = state.get("reference_index") or {}
+        self.cursor: Dict[str, int] = state.get("reference_cursor") or {}
+        self.near_duplicates = NearDuplicateIndex(state.get("reference_lsh") or {})
+        self.ref_counter: int = state.get("ref_counter", 1)
+
+        # 参考文献列表被外部改动过（如重排序后长度不变但顺序改变）时重建索引
+        if (self.cursor.get("references") != len(self.reference_list)
+                or state.get("reference_fingerprint") != self.fingerprint(self.reference_list)):
+            self.rebuild()
+
+    @staticmethod
+    def fingerprint(reference_list: List[Dict]) -> str:
+        """按顺序汇总每篇文献的标识，顺序或内容变化时指纹随之变化"""
+        digest = hashlib.sha1()
+        for ref in reference_list:
+            digest.update("\x1f".join(str(ref.get(field) or "") for field in ("arxiv_id", "doi", "url", "title"))
+                          .encode("utf-8", "ignore"))
+            digest.update(b"\x1e")
+        return digest.hexdigest()
+
+    def rebuild(self):
+        """按当前列表顺序重建精确索引和LSH桶"""
+        self.index = {}
+        self.near_duplicates = NearDuplicateIndex()
+        for position, ref in enumerate(self.reference_list):
+            for key in self._keys(ref):
+                self.index.setdefault(key, position)
+            self.near_duplicates.add(ref, position)
+        self.cursor["references"] = len(self.reference_list)
+
+    @staticmethod
+    def _keys(ref: Dict) -> List[str]:
+        keys = []
+        arxiv_id = normalize_arxiv_id(ref.get("arxiv_id", ""))
+        url = ref.get("url", "") or ""
+        if not arxiv_id:
+            url_match = _ARXIV_URL_PATTERN.search(url)
+            arxiv_id = normalize_arxiv_id(url_match.group(1)) if url_match else ""
+        if arxiv_id:
+            keys.append(f"arxiv:{arxiv_id}")
+        doi = normalize_doi(ref.get("doi", "")) or (normalize_doi(url) if "doi.org" in url else "")
+        if doi:
+            keys.append(f"doi:{doi}")
+        title = normalize_title(ref.get("title", ""))
+        if title:
+            keys.append(f"title:{title}")
+        return keys
+
+    def _band_keys(self, ref: Dict) -> List[str]:
+        return self.near_duplicates.band_keys(self.near_duplicates.shingles(ref.get("title", "")))
+
+    def _find_position(self, ref: Dict, band_keys: List[str]) -> Optional[int]:
+        for key in self._keys(ref):
+            position = self.index.get(key)
+            if position is not None:
+                return position
+        return self.near_duplicates.query(ref, self.reference_list, band_keys)
+
+    def find(self, ref: Dict) -> Optional[Dict]:
+        position = self._find_position(ref, self._band_keys(ref))
+        return self.reference_list[position] if position is not None else None
+
+    def add(self, ref: Dict) -> bool:
+        """登记一篇文献，已存在时合并字段，返回是否为新文献"""
+        band_keys = self._band_keys(ref)
+        position = self._find_position(ref, band_keys)
+        is_new = position is None
+        if is_new:
+            ref["id"] = self.ref_counter
+            self.ref_counter += 1
+            self.reference_list.append(ref)
+            position = len(self.reference_list) - 1
+            self.near_duplicates.add(ref, position, band_keys)
+            self.cursor["references"] = len(self.reference_list)
+        else:
+            self._merge(self.reference_list[position], ref)
+
+        # 合并后可能多出新的标识（如arXiv论文补上了DOI），一并加入索引
+        for key in self._keys(self.reference_list[position]):
+            self.index.setdefault(key, position)
+        return is_new
+
+    @staticmethod
+    def _merge(existing: Dict, new: Dict):
+        """合并同一文献的不同来源：补齐缺失字段，类型升级为信息更完整的来源"""
+        if _TYPE_RANK.get(new.get("type"), 0) > _TYPE_RANK.get(existing.get("type"), 0):
+            logging.info(f"合并重复文献: {existing.get('title', '')[:50]} ({existing.get('type')} -> {new.get('type')})")
+            existing["type"] = new["type"]
+        for field, value in new.items():
+            if field == "id" or field == "type":
+                continue
+            if value and not existing.get(field):
+                existing[field] = value
+
+    def update_summary(self, arxiv_id: str, summary: str):
+        """PDF总结完成后用详细摘要替换已登记文献的摘要"""
+        position = self.index.get(f"arxiv:{normalize_arxiv_id(arxiv_id)}")
+        if position is not None and summary:
+            self.reference_list[position]["summary"] = summary
+
+    def take_new(self, source: str, items: List[Dict]) -> List[Dict]:
+        """返回某个来源自上次处理以来新增的条目，并推进游标"""
+        start = self.cursor.get(source, 0)
+        if start > len(items):
+            start = 0
+        self.cursor[source] = len(items)
+        return items[start:]
+
+    def save(self):
+        self.state["reference_list"] = self.reference_list
+        self.state["reference_index"] = self.index
+        self.state["reference_lsh"] = self.near_duplicates.buckets
+        self.state["reference_cursor"] = self.cursor
+        self.state["reference_fingerprint"] = self.fingerprint(self.reference_list)
+        self.state["ref_counter"] = self.ref_counter
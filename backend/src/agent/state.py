@@ -49,6 +49,11 @@ class ProposalState(TypedDict):
     # 统一参考文献管理
     reference_list: List[Dict] # 统一的参考文献列表
     ref_counter: int # 参考文献的全局唯一ID计数器
+    reference_index: Dict[str, int] # 标准化标题/DOI/arXiv ID -> reference_list中的位置
+    reference_lsh: Dict[str, List[int]] # 近似重复检测的LSH桶：band键 -> reference_list中的位置
+    reference_cursor: Dict[str, int] # 各检索结果列表已处理到的位置，用于增量登记
+    reference_fingerprint: str # 建索引时reference_list的指纹，列表被重排后据此重建索引
+    citation_table: str # 重排序后构建的紧凑引用表，各章节prompt复用
 
     timeline_plan: str # Note: This might be redundant if CONCLUSION_PROMPT handles timeline
     expected_results: str # Note: This might be redundant if CONCLUSION_PROMPT handles expected outcomes
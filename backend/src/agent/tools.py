@@ -4,25 +4,27 @@
 from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FuturesTimeoutError
 from pathlib import Path
 
-import arxiv
 from langchain_core.tools import tool
 import logging
 import os
 from dotenv import load_dotenv
 from typing import List, Dict 
-from langchain_community.tools import TavilySearchResults
-from crossref.restful import Works
 from langchain_core.messages import HumanMessage, SystemMessage
-import fitz
 from .rag import generate_search_queries
+from ..utils.metrics_util import token_usage_callback
+from ..utils.gantt_util import GanttUtil
+from ..utils.pdf_text_util import PdfTextUtil
+from ..utils.token_util import TokenUtil
+from ..services.literature_service import search_local_papers
 from langchain_openai import ChatOpenAI
+import contextvars
 import datetime
+import json
+import threading
 import time
-import scholarly
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 import requests
 import urllib.parse
-from tavily import TavilyClient
 
 load_dotenv()
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY")
@@ -52,6 +54,7 @@ def search_arxiv_papers_tool(query: str, max_results: int = 10, Download: bool =
         seen_ids = set()
         
         # 添加SSL和连接配置
+        import arxiv
         import ssl
         import urllib3
         
@@ -189,6 +192,25 @@ def search_arxiv_papers_tool(query: str, max_results: int = 10, Download: bool =
         return [{"error": f"ArXiv搜索失败: {str(e)}"}]
 
 
+@tool
+def search_local_papers_tool(query: str, max_results: int = 10) -> List[Dict]:
+    """在本地文献库中检索论文的工具（已下载的PDF和历史计划书的参考文献），不访问外部接口
+
+    Args:
+        query: 搜索关键词，中英文均可
+        max_results: 最大结果数量，默认10篇
+
+    Returns:
+        包含论文信息的字典列表，格式与search_arxiv_papers_tool相同，已有详细摘要的论文带detailed_summary
+    """
+    logging.info(f"在本地文献库中搜索:{query}")
+    try:
+        return search_local_papers(query, k=max_results)
+    except Exception as e:
+        logging.error(f"❌ 本地文献库检索失败: {str(e)}")
+        return [{"error": f"本地文献库检索失败: {str(e)}"}]
+
+
 @tool
 def search_web_content_tool(query: str) -> List[Dict]:
     """使用Tavily搜索网络内容的工具
@@ -205,6 +227,7 @@ def search_web_content_tool(query: str) -> List[Dict]:
 
     try:
         # 初始化Tavily客户端
+        from tavily import TavilyClient
         client = TavilyClient(api_key=TAVILY_API_KEY)
         
         # 将查询列表合并为一个字符串
@@ -291,34 +314,118 @@ def search_crossref_papers_tool(query: str, max_results: int = 5) -> List[Dict]:
         return []
 
 
+# PDF总结：一次调用送入的正文token上限（默认与改造前截取10000字符的输入量相当，
+# 超出时按章节分配预算，每个章节都截取开头部分），进程内同时进行的总结调用数，以及单篇论文的总超时（秒）
+PDF_SINGLE_PASS_TOKENS = int(os.environ.get("PDF_SINGLE_PASS_TOKENS", "2500"))
+PDF_SUMMARY_CONCURRENCY = int(os.environ.get("PDF_SUMMARY_CONCURRENCY", "6"))
+PDF_SUMMARY_TIMEOUT = int(os.environ.get("PDF_SUMMARY_TIMEOUT", "120"))
+# 分段总结（map-reduce）：各片段并发提取要点后再合并，覆盖更多正文，但比单次调用多一轮生成、耗时更长，默认关闭；
+# 开启后使用的正文token预算、单个片段的token上限和最多片段数
+PDF_SUMMARY_MAP_REDUCE = os.environ.get("PDF_SUMMARY_MAP_REDUCE", "0") == "1"
+PDF_SUMMARY_TOKEN_BUDGET = int(os.environ.get("PDF_SUMMARY_TOKEN_BUDGET", "24000"))
+PDF_CHUNK_TOKENS = int(os.environ.get("PDF_CHUNK_TOKENS", "4000"))
+PDF_MAX_CHUNKS = int(os.environ.get("PDF_MAX_CHUNKS", "8"))
+# 片段要点的输出token上限：map阶段的耗时主要取决于输出长度，要点保持简短
+PDF_CHUNK_SUMMARY_MAX_TOKENS = 250
+# 提取文本的字符上限（约100页），避免超大文件拖慢提取
+PDF_MAX_EXTRACT_CHARS = 400000
+
+PDF_SUMMARY_PROMPT = """
+You are an academic assistant specializing in research paper analysis.
+Summarize the following academic text into a comprehensive but concise analysis (around 300-400 words in Chinese).
+Focus on:
+1. 研究目标和问题
+2. 主要方法论
+3. 核心发现和结论
+4. 研究贡献和意义
+
+请用中文回答，使用学术化的语言。
+
+Text:
+\"\"\"
+{text}
+\"\"\"
+"""
+
+PDF_CHUNK_SUMMARY_PROMPT = """
+You are an academic assistant. The following is part {index}/{total} of a research paper (split by sections).
+Extract the key points of this part in Chinese, within 100 words: research question, method details,
+experimental setup, quantitative results and conclusions that appear here. Skip anything not present in this part.
+Do not add any preamble.
+
+Text:
+\"\"\"
+{text}
+\"\"\"
+"""
+
+PDF_REDUCE_SUMMARY_PROMPT = """
+You are an academic assistant specializing in research paper analysis.
+Below are section-by-section notes of one research paper, in reading order.
+Combine them into a comprehensive but concise analysis (around 300-400 words in Chinese).
+Focus on:
+1. 研究目标和问题
+2. 主要方法论
+3. 核心发现和结论
+4. 研究贡献和意义
+
+请用中文回答，使用学术化的语言，不要逐段复述。
+
+Notes:
+{notes}
+"""
+
+_pdf_summary_pool = None
+_pdf_summary_pool_lock = threading.Lock()
+
+
+def _get_pdf_summary_pool() -> ThreadPoolExecutor:
+    """进程内共享的总结线程池，同时进行的PDF总结调用总数不超过PDF_SUMMARY_CONCURRENCY"""
+    global _pdf_summary_pool
+    with _pdf_summary_pool_lock:
+        if _pdf_summary_pool is None:
+            _pdf_summary_pool = ThreadPoolExecutor(max_workers=PDF_SUMMARY_CONCURRENCY,
+                                                   thread_name_prefix="pdf-summary")
+        return _pdf_summary_pool
+
+
+def _extract_pdf_text(path: str, max_chars: int) -> str:
+    import fitz
+    parts, length = [], 0
+    with fitz.open(path) as doc:
+        for page in doc:
+            text = page.get_text()
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                logging.info(f"PDF '{path}' 内容已截断至 {max_chars} 字符。")
+                break
+    return "".join(parts)[:max_chars]
+
+
 @tool
-def summarize_pdf(path: str, max_chars: int = 10000) -> Dict:
+def summarize_pdf(path: str, max_chars: int = 0) -> Dict:
     """总结PDF文件内容的工具
-    
+    按章节切分全文（参考文献之后的内容不计入），在单次调用的token上限内为每个章节分配预算后一次总结；
+    开启PDF_SUMMARY_MAP_REDUCE时，长论文的各片段并发总结后再合并为最终摘要
+
     Args:
         path: PDF文件路径
-        max_chars: 最大字符数限制，默认10000
-        
+        max_chars: 最大处理字符数限制，0表示只受token预算限制
+
     Returns:
         包含摘要和源文本片段的字典。如果摘要生成超时或失败，摘要内容将为空字符串。
     """
     logging.info(f"调用工具：summarize_pdf:{path}")
-    
+
     full_text = ""
     source_excerpt = ""
     total_length = 0
+    start_time = time.time()
 
     try:
-        # 1. 打开并提取 PDF 文本
-        doc = fitz.open(path)
-        for page_num, page in enumerate(doc):
-            full_text += page.get_text()
-            if len(full_text) > max_chars:
-                full_text = full_text[:max_chars]
-                logging.info(f"PDF '{path}' 内容已截断至 {max_chars} 字符。")
-                break
-        doc.close()
-
+        # 1. 提取全文并按章节切分
+        full_text = _extract_pdf_text(path, max_chars or PDF_MAX_EXTRACT_CHARS)
         source_excerpt = full_text[:500] + "..." if full_text else ""
         total_length = len(full_text)
 
@@ -331,61 +438,105 @@ def summarize_pdf(path: str, max_chars: int = 10000) -> Dict:
                 "total_length": total_length
             }
 
-        # 2. 构造摘要提示
-        prompt = f"""
-        You are an academic assistant specializing in research paper analysis.
-        Summarize the following academic text into a comprehensive but concise analysis (around 300-400 words in Chinese).
-        Focus on:
-        1. 研究目标和问题
-        2. 主要方法论
-        3. 核心发现和结论
-        4. 研究贡献和意义
-        
-        请用中文回答，使用学术化的语言。
-
-        Text:
-        \"\"\"
-        {full_text}
-        \"\"\"
-        """
+        sections = PdfTextUtil.split_sections(full_text)
+        section_texts = [f"{title}\n{body}".strip() for title, body in sections]
+        if PDF_SUMMARY_MAP_REDUCE and sum(TokenUtil.count_tokens(text) for text in section_texts) > PDF_SINGLE_PASS_TOKENS:
+            chunk_tokens = PDF_CHUNK_TOKENS
+            chunks = PdfTextUtil.chunk_sections(sections, chunk_tokens)
+            while len(chunks) > PDF_MAX_CHUNKS:
+                # 片段过多时放大片段，控制调用次数
+                chunk_tokens = int(chunk_tokens * 1.5)
+                chunks = PdfTextUtil.chunk_sections(sections, chunk_tokens)
+            chunks = PdfTextUtil.fit_budget(chunks, PDF_SUMMARY_TOKEN_BUDGET)
+        else:
+            # 单次调用：超出上限时每个章节只保留开头部分，输入量与改造前相当但覆盖全部章节
+            chunks = ["\n\n".join(PdfTextUtil.fit_budget(section_texts, PDF_SINGLE_PASS_TOKENS))]
+        covered_chars = sum(len(chunk) for chunk in chunks)
+        logging.info(f"PDF '{path}' 共 {total_length} 字符，{len(sections)} 个章节，"
+                     f"切分为 {len(chunks)} 个片段，送入总结 {covered_chars} 字符")
 
-        # 3. 调用语言模型
         llm = ChatOpenAI(
             temperature=0, 
             model="qwen-plus", 
             base_url=base_url, 
-            api_key=DASHSCOPE_API_KEY
+            api_key=DASHSCOPE_API_KEY,
+            timeout=PDF_SUMMARY_TIMEOUT,
+            callbacks=[token_usage_callback]
         )
+        chunk_llm = ChatOpenAI(
+            temperature=0,
+            model="qwen-plus",
+            base_url=base_url,
+            api_key=DASHSCOPE_API_KEY,
+            max_tokens=PDF_CHUNK_SUMMARY_MAX_TOKENS,
+            timeout=PDF_SUMMARY_TIMEOUT,
+            callbacks=[token_usage_callback]
+        )
+        pool = _get_pdf_summary_pool()
+
+        def llm_call(prompt: str, model=llm) -> str:
+            return model.invoke([HumanMessage(content=prompt)]).content.strip()
+
+        # 超时从任务提交后开始计算；超时或失败时取消尚未开始的调用，不占用共享线程池
+        submitted: List[Future] = []
+        deadline = None
+
+        def submit(*args) -> Future:
+            nonlocal deadline
+            # 在调用方上下文的副本中执行，token用量归属到当前节点而不是 unknown
+            future = pool.submit(contextvars.copy_context().run, *args)
+            submitted.append(future)
+            if deadline is None:
+                deadline = time.time() + PDF_SUMMARY_TIMEOUT
+            return future
+
+        def wait(future: Future) -> str:
+            return future.result(timeout=max(deadline - time.time(), 0))
+
+        # 2. 单次调用直接生成最终摘要；或 map：各片段并发提取要点
+        # 3. reduce：按原文顺序合并要点生成最终摘要
+        summary_content = ""  # 默认为空值
+        try:
+            if len(chunks) == 1:
+                summary_content = wait(submit(llm_call, PDF_SUMMARY_PROMPT.format(text=chunks[0])))
+            else:
+                futures = [submit(llm_call, PDF_CHUNK_SUMMARY_PROMPT.format(index=i + 1, total=len(chunks), text=chunk),
+                                  chunk_llm)
+                           for i, chunk in enumerate(chunks)]
+                notes = []
+                for i, future in enumerate(futures):
+                    try:
+                        notes.append(f"[第{i + 1}部分] {wait(future)}")
+                    except FuturesTimeoutError:
+                        raise
+                    except Exception as e_chunk:
+                        logging.warning(f"⚠️ PDF片段 {i + 1}/{len(chunks)} 总结失败: {e_chunk}")
+                if not notes:
+                    raise RuntimeError("所有片段总结均失败")
+                summary_content = wait(submit(llm_call, PDF_REDUCE_SUMMARY_PROMPT.format(notes="\n\n".join(notes))))
+            logging.info(f"✅ PDF摘要生成成功: {path}（{len(chunks)} 个片段，耗时 {time.time() - start_time:.1f}s）")
+        except FuturesTimeoutError:
+            for future in submitted:
+                future.cancel()
+            logging.warning(f"⏳ PDF摘要生成超时 (超过{PDF_SUMMARY_TIMEOUT}秒): {path}. 返回空摘要。")
+            summary_content = ""  # 超时则摘要为空字符串
+        except Exception as e_invoke:
+            for future in submitted:
+                future.cancel()
+            logging.error(f"❌ PDF摘要生成过程中LLM调用失败: {path} - {str(e_invoke)}")
+            return {
+                "summary": "", 
+                "error": f"LLM调用失败: {str(e_invoke)}",
+                "source_excerpt": source_excerpt,
+                "total_length": total_length
+            }
 
-        logging.info(f"正在为PDF文件 '{path}' 生成摘要 (超时时间: 120秒)...")
-        
-        summary_content = "" # 默认为空值
-
-        def llm_call():
-            return llm.invoke([HumanMessage(content=prompt)])
-
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(llm_call)
-            try:
-                response = future.result(timeout=120)  # 2分钟超时
-                summary_content = response.content.strip()
-                logging.info(f"✅ PDF摘要生成成功: {path}")
-            except FuturesTimeoutError:
-                logging.warning(f"⏳ PDF摘要生成超时 (超过120秒): {path}. 返回空摘要。")
-                summary_content = "" # 超时则摘要为空字符串
-            except Exception as e_invoke:
-                logging.error(f"❌ PDF摘要生成过程中LLM调用失败: {path} - {str(e_invoke)}")
-                return {
-                    "summary": "", 
-                    "error": f"LLM调用失败: {str(e_invoke)}",
-                    "source_excerpt": source_excerpt,
-                    "total_length": total_length
-                }
-        
         return {
             "summary": summary_content,
             "source_excerpt": source_excerpt,
-            "total_length": total_length
+            "total_length": total_length,
+            "chunks": len(chunks),
+            "covered_chars": covered_chars,
         }
 
     except Exception as e:
@@ -398,6 +549,22 @@ def summarize_pdf(path: str, max_chars: int = 10000) -> Dict:
         }
 
 
+GANTT_MAX_REPAIRS = 2
+
+
+def _parse_json_object(text: str):
+    """从LLM响应中取出JSON对象（兼容```json代码块和前后说明文字）"""
+    text = text.strip()
+    if "```" in text:
+        start = text.find("\n", text.find("```")) + 1
+        end = text.find("```", start)
+        text = text[start:end if end != -1 else None].strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("响应中没有JSON对象")
+    return json.loads(text[start:end + 1])
+
+
 @tool
 def generate_gantt_chart_tool(timeline_content: str, research_field: str = "") -> Dict:
     """生成项目甘特图的工具
@@ -407,7 +574,7 @@ def generate_gantt_chart_tool(timeline_content: str, research_field: str = "") -
         research_field: 研究领域名称，用于图表标题
         
     Returns:
-        包含Mermaid甘特图代码的字典
+        包含Mermaid甘特图代码和结构化排期的字典
     """
     logging.info(f"调用工具：generate_gantt_chart_tool")
     logging.info(f"输入研究领域: {research_field}")
@@ -415,10 +582,10 @@ def generate_gantt_chart_tool(timeline_content: str, research_field: str = "") -
     logging.info(f"时间线内容前200字符: {timeline_content[:200]}...")
     
     try:
-        # 构造甘特图生成提示
+        # 让LLM输出结构化排期，本地校验后再生成Mermaid代码，避免无效的图表进入导出流程
         current_date = datetime.datetime.now().strftime("%Y-%m-%d")
         gantt_prompt = f"""
-        你是一个项目管理专家，需要根据提供的研究时间线内容生成Mermaid格式的甘特图。
+        你是一个项目管理专家，需要根据提供的研究时间线内容制定项目排期。
 
         **研究领域：** {research_field}
         
@@ -429,83 +596,100 @@ def generate_gantt_chart_tool(timeline_content: str, research_field: str = "") -
 
         **要求：**
         1. 仔细分析时间线内容，提取关键的阶段、任务和时间节点
-        2. 将任务按逻辑分组为不同的section（如：文献调研、系统设计、实验评估等）
-        3. 生成标准的Mermaid甘特图语法
-        4. 使用合理的日期格式（YYYY-MM-DD），以当前时间作为开始时间
-        5. 根据任务的重要性和依赖关系设置状态（done, active, 或不设置）
-        6. 确保时间安排合理，避免任务重叠冲突
+        2. 将任务按逻辑分组为不同的阶段（如：文献调研、系统设计、实验评估等）
+        3. 以当前时间作为开始时间，日期使用YYYY-MM-DD格式
+        4. 根据任务的重要性和依赖关系设置状态（done、active、crit、milestone或空字符串）
+        5. 确保时间安排合理，避免任务重叠冲突
         
         **输出格式要求：**
-        只输出纯净的Mermaid代码，格式如下：
-        ```mermaid
-        gantt
-            dateFormat  YYYY-MM-DD
-            title       [研究项目标题]
-            section [阶段名称1]
-            [任务名称1]    :done,   YYYY-MM-DD, YYYY-MM-DD
-            [任务名称2]    :active, YYYY-MM-DD, 30d
-            section [阶段名称2]
-            [任务名称3]    :        YYYY-MM-DD, 20d
-            [任务名称4]    :        YYYY-MM-DD, 25d
-        ```
+        只输出一个JSON对象，格式如下：
+        {{
+            "title": "研究项目标题",
+            "phases": [
+                {{
+                    "name": "阶段名称",
+                    "tasks": [
+                        {{"name": "任务名称", "start": "YYYY-MM-DD", "duration_days": 30, "status": "active"}},
+                        {{"name": "任务名称", "start": "", "duration_days": 20, "status": ""}}
+                    ]
+                }}
+            ]
+        }}
         
         注意：
-        - 不要包含任何解释文字，只输出Mermaid代码
-        - 确保语法正确，可以直接渲染
+        - 不要包含任何解释文字，只输出JSON
+        - start为空字符串表示紧接上一个任务开始，第一个任务必须给出start
+        - duration_days为整数天数，里程碑为0
         - 如果时间线内容不够详细，请基于常见的研究项目流程进行合理推断
-        - 必须以"gantt"开头
         """
 
-        # 调用LLM生成甘特图
+        # 调用LLM生成排期
         llm = ChatOpenAI(
             temperature=0,
             model="qwen-plus",
             base_url=base_url,
-            api_key=DASHSCOPE_API_KEY
+            api_key=DASHSCOPE_API_KEY,
+            callbacks=[token_usage_callback]
         )
 
-        logging.info(f"正在调用LLM生成甘特图...")
+        logging.info(f"正在调用LLM生成甘特图排期...")
         
         response = llm.invoke([HumanMessage(content=gantt_prompt)])
-        gantt_content = response.content.strip()
-        
-        logging.info(f"LLM原始响应长度: {len(gantt_content)} 字符")
-        logging.info(f"LLM原始响应前500字符: {gantt_content[:500]}...")
-        
-        # 清理输出，确保只包含Mermaid代码
-        if "```mermaid" in gantt_content:
-            start = gantt_content.find("```mermaid") + 10
-            end = gantt_content.find("```", start)
-            if end != -1:
-                gantt_content = gantt_content[start:end].strip()
-                logging.info("✅ 成功提取mermaid代码块")
-        elif "```" in gantt_content:
-            start = gantt_content.find("```") + 3
-            end = gantt_content.find("```", start)
-            if end != -1:
-                gantt_content = gantt_content[start:end].strip()
-                logging.info("✅ 成功提取通用代码块")
-        else:
-            logging.info("⚠️ 未找到代码块标记，使用原始内容")
-        
-        # 验证甘特图内容
-        if not gantt_content.startswith("gantt"):
-            if gantt_content.strip():
-                gantt_content = "gantt\n" + gantt_content
-                logging.info("⚠️ 添加了缺失的'gantt'开头")
-            else:
-                logging.error("❌ 甘特图内容为空")
-                return {
-                    "gantt_chart": "",
-                    "status": "error",
-                    "message": "生成的甘特图内容为空"
-                }
-        
-        logging.info(f"✅ 最终甘特图内容长度: {len(gantt_content)} 字符")
+        logging.info(f"LLM原始响应长度: {len(response.content)} 字符")
+        try:
+            schedule = _parse_json_object(response.content)
+        except ValueError as e:
+            # 整体无法解析时重新生成一次
+            logging.warning(f"⚠️ 排期不是有效的JSON，重新生成: {e}")
+            response = llm.invoke([HumanMessage(content=gantt_prompt + "\n上一次的输出不是有效的JSON，请严格只输出JSON对象。")])
+            schedule = _parse_json_object(response.content)
+
+        chart, errors = GanttUtil.from_schedule(schedule)
+        for attempt in range(1, GANTT_MAX_REPAIRS + 1):
+            if not errors or "" in errors or "phases" in errors:
+                break
+            # 只把出错的字段发回LLM修正，而不是重新生成整个排期
+            logging.info(f"🔧 第{attempt}次修正排期中的 {len(errors)} 个字段: {list(errors)}")
+            invalid_fields = "\n".join(f"- {path}: {message}" for path, message in errors.items())
+            repair_prompt = f"""
+            以下项目排期JSON中有字段不合法：
+            {json.dumps(schedule, ensure_ascii=False)}
+
+            **不合法的字段：**
+            {invalid_fields}
+
+            现在的时间是：{current_date}。
+            只为上面列出的字段给出修正后的值，输出一个以字段路径为键的JSON对象，例如
+            {{"phases[0].tasks[1].start": "2025-01-01", "phases[0].tasks[1].duration_days": 14}}
+            不要输出任何解释文字。
+            """
+            try:
+                patch = _parse_json_object(llm.invoke([HumanMessage(content=repair_prompt)]).content)
+            except ValueError as e:
+                logging.warning(f"⚠️ 排期修正结果无法解析: {e}")
+                continue
+            for path, value in patch.items():
+                if path in errors and not GanttUtil.set_path(schedule, path, value):
+                    logging.warning(f"⚠️ 无法写入修正字段: {path}")
+            chart, errors = GanttUtil.from_schedule(schedule)
+
+        if chart is None:
+            logging.error(f"❌ 排期中没有合法的任务: {errors}")
+            return {
+                "gantt_chart": "",
+                "status": "error",
+                "message": f"生成的甘特图排期不合法: {errors}"
+            }
+        if errors:
+            logging.warning(f"⚠️ 修正后仍有不合法的字段，已忽略对应任务: {errors}")
+
+        gantt_content = GanttUtil.to_mermaid(chart)
+        logging.info(f"✅ 最终甘特图共 {len(chart.sections)} 个阶段、{len(chart.tasks)} 个任务")
         logging.info(f"最终甘特图内容前300字符: {gantt_content[:300]}...")
         
         return {
             "gantt_chart": gantt_content,
+            "schedule": GanttUtil.to_schedule(chart),
             "status": "success",
             "message": "甘特图生成成功"
         }
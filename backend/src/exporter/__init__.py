@@ -0,0 +1,4 @@
+from .api import ExportArtifacts, ExportOptions, export
+from .proposal_exporter import ProposalExporter
+
+__all__ = ["export", "ExportOptions", "ExportArtifacts", "ProposalExporter"]
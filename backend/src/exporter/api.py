@@ -0,0 +1,61 @@
+"""
+导出接口：export(markdown, references, options) -> ExportArtifacts
+导入本模块不会加载大模型、LaTeX等依赖，它们在真正导出时才被导入
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class ExportOptions:
+    """导出选项，未设置的项沿用 ProposalExporter 的默认值（环境变量或 exporter 目录）"""
+    name: str = "proposal"  # 输出文件名（不含扩展名）
+    proposal_id: Optional[str] = None
+    output_dir: Optional[str] = None
+    compile_pdf: bool = True
+    use_cache: bool = True
+    max_concurrency: Optional[int] = None
+    progress_callback: Optional[Callable[[Dict], None]] = None
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    llm: Any = None  # 自定义聊天模型（需提供invoke方法）
+
+
+@dataclass
+class ExportArtifacts:
+    """导出结果：生成的文件和各阶段耗时（秒）"""
+    tex_path: str
+    pdf_path: Optional[str] = None
+    diagram_paths: List[str] = field(default_factory=list)
+    pdf_from_cache: bool = False
+    # extract：章节提取；mermaid：甘特图/Mermaid图表；convert：章节转LaTeX；compile：xelatex编译；total：总耗时
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def export(markdown: str, references: Optional[List[Dict]] = None,
+           options: Optional[ExportOptions] = None) -> ExportArtifacts:
+    """
+    将研究计划书Markdown导出为LaTeX（以及PDF）
+    :param markdown: 研究计划书Markdown内容
+    :param references: 参考文献列表（与 References_<id>.json 格式相同）
+    :param options: 导出选项
+    :return: 生成的文件路径和各阶段耗时
+    """
+    from .proposal_exporter import ProposalExporter
+
+    options = options or ExportOptions()
+    kwargs = {}
+    if options.max_concurrency is not None:
+        kwargs["max_concurrency"] = options.max_concurrency
+    exporter = ProposalExporter(
+        api_key=options.api_key,
+        base_url=options.base_url,
+        proposal_id=options.proposal_id,
+        progress_callback=options.progress_callback,
+        use_cache=options.use_cache,
+        output_dir=options.output_dir,
+        llm=options.llm,
+        **kwargs,
+    )
+    exporter.references_data = list(references or [])
+    return exporter.export_markdown(markdown, options.name, compile_pdf=options.compile_pdf)
@@ -0,0 +1,77 @@
+"""
+命令行导出：python -m backend.src.exporter [markdown_file] [proposal_id]
+（兼容旧入口 python export2.py / python workflow.py）
+"""
+import argparse
+import logging
+import os
+import sys
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout),  # 明确指定输出到stdout
+        ],
+        force=True  # 强制覆盖任何已存在的配置
+    )
+    # 确保日志输出不被缓冲
+    sys.stdout.reconfigure(line_buffering=True)
+
+    # 设置环境变量以防止自动打开文件
+    os.environ.update({
+        'EDITOR': 'none',
+        'VISUAL': 'none',
+        'LATEX_EDITOR': 'none',
+        'TEXEDIT': 'none',
+        'TEX_EDITOR': 'none',
+        'PYTHONUNBUFFERED': '1'
+    })
+    
+    # 解析命令行参数
+    parser = argparse.ArgumentParser(description='导出提案为LaTeX和PDF格式')
+    parser.add_argument('markdown_file', nargs='?', help='要导出的Markdown文件路径（可选，默认使用最新的md文件）')
+    parser.add_argument('proposal_id', nargs='?', default='none', help='提案ID（可选，默认为none）')
+    parser.add_argument('--no-pdf', action='store_true', help='只生成LaTeX文件，不编译PDF')
+    args = parser.parse_args()
+    
+    try:
+        from .proposal_exporter import ProposalExporter
+
+        # 创建导出器实例
+        exporter = ProposalExporter(proposal_id=args.proposal_id)
+        
+        # 如果没有指定markdown文件，则使用最新的md文件
+        if not args.markdown_file:
+            md_files = exporter.read_markdown_files()
+            args.markdown_file = max(md_files.keys(), key=os.path.getmtime)
+            logging.info(f"使用最新的Markdown文件: {args.markdown_file}")
+        else:
+            # 如果指定了文件，确保使用完整路径
+            if not os.path.isabs(args.markdown_file):
+                args.markdown_file = os.path.join(exporter.markdown_source_dir, args.markdown_file)
+            logging.info(f"使用指定的Markdown文件: {args.markdown_file}")
+        
+        # 验证文件是否存在
+        if not os.path.exists(args.markdown_file):
+            raise FileNotFoundError(f"找不到指定的Markdown文件: {args.markdown_file}")
+        
+        logging.info(f"提案ID: {args.proposal_id}")
+        
+        # 导出提案
+        exporter.export_proposal(compile_pdf=not args.no_pdf, specific_file=args.markdown_file)
+        
+        report_filename_base = os.path.splitext(os.path.basename(args.markdown_file))[0]
+        logging.info("\n导出完成！")
+        logging.info(f"LaTeX文件: {os.path.join(exporter.output_dir, report_filename_base + '.tex')}")
+        logging.info("✅ 所有文件已成功生成！")
+            
+    except Exception as e:
+        logging.error(f"❌ 导出过程中发生错误: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
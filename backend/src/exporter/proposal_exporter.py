@@ -0,0 +1,1282 @@
+"""
+研究计划书导出器：Markdown → LaTeX → PDF
+章节提取和无法本地转换的Markdown块使用大模型（客户端在首次使用时才创建），
+Markdown转换、甘特图、Mermaid渲染和xelatex编译分别由 utils 中的工具类完成
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from ..services.cache_service import get_from_cache, set_to_cache
+from ..utils.gantt_util import GanttUtil
+from ..utils.file_cache_util import FileCacheUtil
+from ..utils.latex_util import LatexUtil
+from ..utils.md_latex_util import MdLatexUtil, CONVERTER_VERSION
+from ..utils.md_section_util import MdSectionIndex
+from ..utils.mermaid_util import MermaidUtil
+from .api import ExportArtifacts
+
+load_dotenv()
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# 正文章节，按模板中的顺序排列
+SECTION_ORDER = ['引言', '文献综述', '研究内容', '总结']
+# 各章节在Markdown中的常见标题，找到对应标题时直接按章节索引截取，否则交给大模型提取
+SECTION_TITLES = {
+    '引言': ['引言', '绪论', 'Introduction'],
+    '文献综述': ['文献综述', 'Literature Review'],
+    '研究内容': ['研究内容', '研究设计', 'Research Design'],
+    '总结': ['总结', '结论', 'Conclusion'],
+}
+# 章节提取/转换时同时进行的LLM请求数上限
+DEFAULT_LLM_CONCURRENCY = int(os.getenv('EXPORT_LLM_CONCURRENCY', '4'))
+
+
+class ProposalExporter:
+    def __init__(self, api_key: str = None, base_url: str = None, proposal_id: str = None,
+                 progress_callback: Optional[Callable[[Dict], None]] = None,
+                 max_concurrency: int = DEFAULT_LLM_CONCURRENCY, use_cache: bool = True,
+                 output_dir: str = None, llm: Any = None):
+        """
+        初始化导出器
+        :param api_key: 千问API密钥
+        :param base_url: API基础URL
+        :param proposal_id: 提案ID，用于发送消息
+        :param progress_callback: 进度消息回调，未设置时以 QUEUE_MESSAGE 行输出到stdout（命令行模式）
+        :param max_concurrency: 章节提取/转换时同时进行的LLM请求数上限
+        :param use_cache: 是否复用已转换的章节LaTeX和已编译的PDF（按内容哈希）
+        :param output_dir: TeX/PDF的输出目录，默认为 exporter/pdf_output
+        :param llm: 自定义的聊天模型（需提供invoke方法），默认在首次使用时创建qwen-plus客户端
+        """
+        # 优先使用传入的参数，其次使用环境变量
+        self.api_key = api_key if api_key is not None else os.getenv('DASHSCOPE_API_KEY')
+        self.base_url = base_url if base_url is not None else os.getenv('DASHSCOPE_BASE_URL', 'https://dashscope.aliyuncs.com/compatible-mode/v1')
+        self.proposal_id = proposal_id
+        self.progress_callback = progress_callback
+        self.max_concurrency = max(1, max_concurrency)
+        self.use_cache = use_cache
+        self._llm = llm
+        
+        # 设置导出步骤，使用更高的初始值
+        self.export_step = 100
+        
+        # 设置各种路径
+        self.exporter_dir = os.path.join(ROOT_DIR, "exporter")  # exporter目录路径
+        self.template_path = os.path.join(self.exporter_dir, "main.tex")
+        self.markdown_source_dir = os.path.join(ROOT_DIR, "output")  # Markdown文件的源目录
+        self.output_dir = output_dir or os.path.join(self.exporter_dir, "pdf_output")  # TeX/PDF的输出目录
+        self.pdf_cache_dir = os.path.join(self.exporter_dir, "pdf_cache")  # 按模板内容哈希缓存的PDF
+        self.latex_cache_dir = os.path.join(self.exporter_dir, "latex_cache")  # 辅助文件种子
+        self.mermaid_cache_dir = os.path.join(self.exporter_dir, "mermaid_cache")  # 按源码哈希缓存的Mermaid图片
+        
+        # 确保目录存在
+        os.makedirs(self.markdown_source_dir, exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+        os.makedirs(self.pdf_cache_dir, exist_ok=True)
+        
+        # 检查模板文件是否存在
+        if not os.path.exists(self.template_path):
+            raise FileNotFoundError(f"找不到LaTeX模板文件: {self.template_path}")
+            
+        logging.info(f"✓ 使用模板文件: {self.template_path}")
+        logging.info(f"✓ Markdown源目录: {self.markdown_source_dir}")
+        logging.info(f"✓ PDF输出目录: {self.output_dir}")
+        
+        self.references_data: List[Dict] = None  # 存储解析后的参考文献
+
+    @property
+    def llm(self):
+        """大模型客户端，首次使用时才导入langchain并创建"""
+        if self._llm is None:
+            if not self.api_key:
+                raise ValueError("API key is not set. Please provide it as a parameter or set DASHSCOPE_API_KEY environment variable.")
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                api_key=self.api_key,
+                model="qwen-plus",
+                base_url=self.base_url,
+                temperature=0,
+                streaming=True,
+            )
+        return self._llm
+
+    def read_template(self) -> str:
+        """读取LaTeX模板文件"""
+        with open(self.template_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def read_markdown_files(self, specific_file: str = None) -> Dict[str, str]:
+        """读取Markdown文件内容"""
+        md_files = {}
+        
+        try:
+            if specific_file:
+                # 如果指定了特定文件，确保使用完整路径
+                if not os.path.isabs(specific_file):
+                    specific_file = os.path.join(self.markdown_source_dir, specific_file)
+                if not os.path.exists(specific_file):
+                    raise FileNotFoundError(f"找不到指定的Markdown文件: {specific_file}")
+                md_files[specific_file] = self._read_file(specific_file)
+                logging.info(f"✓ 成功读取指定文件: {specific_file}")
+            else:
+                # 读取目录中的所有md文件
+                for filename in os.listdir(self.markdown_source_dir):
+                    if filename.endswith('.md'):
+                        filepath = os.path.join(self.markdown_source_dir, filename)
+                        md_files[filepath] = self._read_file(filepath)
+                        logging.info(f"✓ 已读取文件: {filename}")
+                
+                if not md_files:
+                    raise FileNotFoundError(f"在目录 {self.markdown_source_dir} 中未找到任何Markdown文件")
+                
+                # 获取最新的文件
+                latest_file = max(md_files.keys(), key=lambda x: os.path.getmtime(x))
+                logging.info(f"✓ 自动选择最新文件: {latest_file}")
+            
+            return md_files
+            
+        except Exception as e:
+            logging.error(f"❌ 读取Markdown文件时发生错误: {str(e)}")
+            raise
+
+    def _load_references_json(self, md_filepath: str):
+        """加载参考文献JSON文件"""
+        try:
+            # 从Markdown文件路径中提取ID
+            filename = os.path.basename(md_filepath)
+            if filename.startswith("Research_Proposal_"):
+                proposal_id = filename.replace("Research_Proposal_", "").replace(".md", "")
+            else:
+                proposal_id = os.path.splitext(filename)[0]
+            
+            # 首先在Markdown文件所在目录下查找
+            ref_filepath = os.path.join(os.path.dirname(os.path.abspath(md_filepath)), f"References_{proposal_id}.json")
+            if not os.path.exists(ref_filepath):
+                # 如果不存在，尝试在markdown_source_dir下查找
+                ref_filepath = os.path.join(self.markdown_source_dir, f"References_{proposal_id}.json")
+            
+            if os.path.exists(ref_filepath):
+                with open(ref_filepath, 'r', encoding='utf-8') as f:
+                    self.references_data = json.load(f)
+                logging.info(f"✓ 成功加载参考文献文件: {ref_filepath}")
+                logging.info(f"ℹ️ 加载了 {len(self.references_data)} 条参考文献")
+            else:
+                logging.warning(f"⚠️ 未找到参考文献文件: {ref_filepath}")
+                self.references_data = []
+                
+        except Exception as e:
+            logging.error(f"❌ 加载参考文献文件时发生错误: {str(e)}")
+            self.references_data = []
+
+    def _escape_latex(self, text: str) -> str:
+        """Escapes special LaTeX characters in a string."""
+        if not isinstance(text, str):
+            return ""
+        # Order matters
+        text = text.replace('\\', r'\textbackslash{}')
+        text = text.replace('{', r'\{')
+        text = text.replace('}', r'\}')
+        text = text.replace('_', r'\_')
+        text = text.replace('^', r'\^{}')
+        text = text.replace('&', r'\&')
+        text = text.replace('%', r'\%')
+        text = text.replace('$', r'\$')
+        text = text.replace('#', r'\#')
+        text = text.replace('~', r'\textasciitilde{}')
+        return text
+
+    def _format_single_reference_to_latex(self, ref: Dict) -> str:
+        """Formats a single reference dictionary to a LaTeX \bibitem content string."""
+        item_text = ""
+        ref_type = ref.get("type", "Unknown")
+
+        title = self._escape_latex(ref.get("title", "N.T."))
+        authors_list = ref.get("authors", [])
+        authors_str = self._escape_latex(", ".join(authors_list) if authors_list else "N.A.")
+
+        if ref_type == "ArXiv":
+            arxiv_id = self._escape_latex(ref.get("arxiv_id", ""))
+            published = self._escape_latex(ref.get("published", ""))
+            # summary = self._escape_latex(ref.get("summary", "")) # Summary usually not in bib item
+            item_text = f"{authors_str}. {title}. arXiv:{arxiv_id} ({published})."
+        elif ref_type == "CrossRef":
+            journal = self._escape_latex(ref.get("journal", ""))
+            published = self._escape_latex(ref.get("published", ""))
+            doi = self._escape_latex(ref.get("doi", ""))
+            item_text = f"{authors_str}. {title}. {journal} ({published}). DOI: {doi}."
+        elif ref_type == "Web":
+            url = ref.get("url", "") # Do not escape URL, pass to \url{}
+            # Access date might be missing, graph.py generates it on the fly.
+            # For now, we'll just use the URL.
+            item_text = f"{title}. URL: \\url{{{url}}}"
+        else:
+            item_text = f"{self._escape_latex(ref.get('title', 'N.T.'))} (Unknown Type)"
+        
+        return item_text
+
+    def _generate_latex_bibliography(self) -> str:
+        """生成LaTeX格式的参考文献部分"""
+        if not self.references_data:
+            logging.warning("ℹ️ 未生成参考文献部分 (无数据或错误)")
+            return ""
+            
+        try:
+            bib_items = []
+            for ref in self.references_data:
+                try:
+                    # 提取作者信息
+                    authors = []
+                    if 'author' in ref:
+                        if isinstance(ref['author'], list):
+                            authors = [author.get('name', '') for author in ref['author']]
+                        elif isinstance(ref['author'], str):
+                            authors = [ref['author']]
+                    
+                    # 提取标题
+                    title = ref.get('title', '')
+                    
+                    # 提取年份
+                    year = ref.get('year', '')
+                    
+                    # 提取期刊/会议名称
+                    venue = ref.get('venue', '')
+                    if not venue:
+                        venue = ref.get('journal', '')
+                    
+                    # 提取DOI
+                    doi = ref.get('doi', '')
+                    
+                    # 构建参考文献条目
+                    bib_item = f"\\bibitem{{{ref.get('id', '')}}} "
+                    if authors:
+                        bib_item += f"{', '.join(authors)}. "
+                    if title:
+                        bib_item += f"\\textit{{{self._escape_latex(title)}}}. "
+                    if venue:
+                        bib_item += f"{self._escape_latex(venue)}. "
+                    if year:
+                        bib_item += f"({year}). "
+                    if doi:
+                        bib_item += f"DOI: {doi}"
+                    
+                    bib_items.append(bib_item)
+                    
+                except Exception as e:
+                    logging.warning(f"⚠️ 处理参考文献条目时出错: {str(e)}")
+                    continue
+            
+            if not bib_items:
+                logging.warning("ℹ️ 未生成参考文献部分 (无有效条目)")
+                return ""
+            
+            # 生成完整的参考文献部分
+            bibliography = "\\begin{thebibliography}{99}\n"
+            bibliography += "\n".join(bib_items)
+            bibliography += "\n\\end{thebibliography}"
+            
+            logging.info(f"✓ 成功生成参考文献部分，包含 {len(bib_items)} 条引用")
+            return bibliography
+            
+        except Exception as e:
+            logging.error(f"❌ 生成参考文献部分时发生错误: {str(e)}")
+            return ""
+    
+    def truncate_content(self, content: str, max_length: int = 120000) -> str:
+        """
+        截断内容以避免超出模型输入限制
+        """
+        if len(content) > max_length:
+            truncated = content[:max_length]
+            # 尝试在完整句子处截断
+            last_period = truncated.rfind('。')
+            last_newline = truncated.rfind('\n')
+            cut_point = max(last_period, last_newline)
+            
+            if cut_point > max_length * 0.8:  # 如果找到的截断点不会丢失太多内容
+                return truncated[:cut_point + 1]
+            else:
+                return truncated
+        return content
+    
+    def clean_duplicate_numbering(self, latex_content: str) -> str:
+        """清理重复的章节编号、中文编号以及残留的Markdown标题标记。"""
+        lines = latex_content.split('\n')
+        cleaned_lines = []
+        
+        for line in lines:
+            original_line_for_logging = line.strip() # For logging/commenting if removed/changed
+            
+            # Rule 1: Clean LaTeX section commands for duplicate numbering
+            if '\\section{' in line:
+                line = re.sub(r'\\section\{[\d\.]+\s*', r'\\section{', line)
+                line = re.sub(r'\\section\{[（(][一二三四五六七八九十]+[）)]\s*', r'\\section{', line)
+            elif '\\subsection{' in line:
+                line = re.sub(r'\\subsection\{[\d\.]+\s*', r'\\subsection{', line)
+                line = re.sub(r'\\subsection\{[（(][一二三四五六七八九十]+[）)]\s*', r'\\subsection{', line)
+            elif '\\subsubsection{' in line:
+                line = re.sub(r'\\subsubsection\{[\d\.]+\s*', r'\\subsubsection{', line)
+                line = re.sub(r'\\subsubsection\{[（(][一二三四五六七八九十]+[）)]\s*', r'\\subsubsection{', line)
+            
+            # Rule 2: Handle stray Markdown-like headings
+            stripped_line = line.strip()
+            if stripped_line.startswith('#') and not stripped_line.startswith('%'):
+                md_heading_match = re.match(r'^\s*(#+)\s*(.*)', stripped_line)
+                if md_heading_match:
+                    hashes = md_heading_match.group(1)
+                    title_text_raw = md_heading_match.group(2).strip()
+                    
+                    # Clean title_text_raw from further Markdown list/heading markers
+                    title_text_cleaned = re.sub(r'^\s*([#\*\-]\s*)+', '', title_text_raw).strip()
+
+                    if not title_text_cleaned: # If only hashes or markers, comment out
+                        cleaned_lines.append(f"% Removed empty MD remnant: {original_line_for_logging}")
+                        continue
+
+                    # Convert to appropriate LaTeX sectioning command
+                    num_hashes = len(hashes)
+                    # If title_text_raw itself contained hashes, count them too for level
+                    # e.g. "# ### title" -> hashes="#", title_text_raw="### title"
+                    # We need to determine the true intended level.
+                    # Let's count effective hashes:
+                    effective_hashes = num_hashes
+                    if title_text_raw.startswith('#'):
+                        inner_hashes_match = re.match(r'^\s*(#+)', title_text_raw)
+                        if inner_hashes_match:
+                            effective_hashes += len(inner_hashes_match.group(1))
+                            title_text_cleaned = re.sub(r'^\s*#+\s*', '', title_text_raw).strip()
+                    
+                    if effective_hashes == 1: # Typically \chapter, but we use \section for top-level from MD
+                        cleaned_lines.append(f"\\section{{{title_text_cleaned}}} % Converted MD remnant: {original_line_for_logging}")
+                    elif effective_hashes == 2:
+                        cleaned_lines.append(f"\\section{{{title_text_cleaned}}} % Converted MD remnant: {original_line_for_logging}")
+                    elif effective_hashes == 3:
+                        cleaned_lines.append(f"\\subsection{{{title_text_cleaned}}} % Converted MD remnant: {original_line_for_logging}")
+                    elif effective_hashes >= 4:
+                        cleaned_lines.append(f"\\subsubsection{{{title_text_cleaned}}} % Converted MD remnant: {original_line_for_logging}")
+                    else: # Should not happen if md_heading_match was successful
+                        cleaned_lines.append(f"% Problematic MD remnant (unhandled hash count): {original_line_for_logging}")
+                    continue # Move to next line after handling
+                else:
+                    # Line starts with # but not a clear MD heading (e.g., #no_space_title)
+                    # This is likely an error or needs specific handling if it's a valid LaTeX construct (rare for #)
+                    cleaned_lines.append(f"% Problematic line (starts with #, not MD heading): {original_line_for_logging}")
+                    continue # Move to next line
+
+            cleaned_lines.append(line)
+        
+        return '\n'.join(cleaned_lines)
+
+    def clean_markdown_numbering(self, content: str) -> str:
+        """清理Markdown内容中的重复编号和中文编号"""
+        lines = content.split('\n')
+        cleaned_lines = []
+        
+        for line in lines:
+            # 清理标题中的数字编号和中文编号
+            if line.strip().startswith('#'):
+                # 移除## 3.2 这样的编号
+                line = re.sub(r'^(#+)\s*[\d\.]+\s*', r'\1 ', line)
+                # 移除## （二）这样的中文编号
+                line = re.sub(r'^(#+)\s*[（(][一二三四五六七八九十]+[）)]\s*', r'\1 ', line)
+            
+            cleaned_lines.append(line)
+        
+        return '\n'.join(cleaned_lines)
+
+    def simple_md_to_latex(self, markdown_content: str) -> str:
+        """简单的Markdown到LaTeX转换"""
+        # 处理表格
+        def convert_table(match):
+            table_content = match.group(1)
+            lines = table_content.strip().split('\n')
+            
+            # 处理表头
+            header = lines[0].strip('|').split('|')
+            header = [h.strip() for h in header]
+            
+            # 处理分隔行
+            separator = lines[1].strip('|').split('|')
+            separator = [s.strip() for s in separator]
+            
+            # 处理数据行
+            data_rows = []
+            for line in lines[2:]:
+                if line.strip():
+                    cells = line.strip('|').split('|')
+                    cells = [cell.strip() for cell in cells]
+                    data_rows.append(cells)
+            
+            # 构建LaTeX表格
+            latex_table = "\\begin{table}[htbp]\n\\centering\n\\begin{tabular}{" + "|c" * len(header) + "|}\n\\hline\n"
+            
+            # 添加表头
+            latex_table += " & ".join(header) + " \\\\\n\\hline\n"
+            
+            # 添加数据行
+            for row in data_rows:
+                latex_table += " & ".join(row) + " \\\\\n\\hline\n"
+            
+            latex_table += "\\end{tabular}\n\\end{table}\n"
+            return latex_table
+
+        # 转换表格
+        table_pattern = r"\|(.*?)\|\n\|(.*?)\|\n(\|.*?\|)"
+        markdown_content = re.sub(table_pattern, convert_table, markdown_content, flags=re.DOTALL)
+        
+        # 处理图片
+        image_pattern = r"!\[(.*?)\]\((.*?)\)"
+        def convert_image(match):
+            alt_text = match.group(1)
+            image_path = match.group(2)
+            return f"\\begin{{figure}}[htbp]\n\\centering\n\\includegraphics[width=0.8\\textwidth]{{{image_path}}}\n\\caption{{{alt_text}}}\n\\end{{figure}}"
+        
+        markdown_content = re.sub(image_pattern, convert_image, markdown_content)
+        
+        return markdown_content
+
+    def extract_title(self, content: str) -> str:
+        """提取标题"""
+        # 首先尝试从第一行或明显的标题标记中提取
+        lines = content.split('\n')
+        for line in lines[:10]:  # 检查前10行
+            if line.strip().startswith('#'):
+                title = re.sub(r'^[#+]\s*', '', line.strip())
+                # 清理标题，移除特殊字符和编号
+                title = re.sub(r'：.*$', '', title)  # 移除冒号后的内容
+                title = re.sub(r'研究计划书[：:]?\s*', '', title)  # 秼除"研究计划书："
+                # 如果清理后的标题太短或为空，尝试提取冒号后的内容
+                if len(title.strip()) < 3:
+                    # 重新提取，这次保留冒号后的内容
+                    original_line = re.sub(r'^[#+]\s*', '', line.strip())
+                    if '：' in original_line:
+                        title = original_line.split('：', 1)[1].strip()
+                    elif ':' in original_line:
+                        title = original_line.split(':', 1)[1].strip()
+                    else:
+                        title = original_line
+                
+                if title.strip():
+                    return title.strip()
+        
+        # 如果从标题行没有提取到有效标题，尝试从文件名提取
+        # 查找文件名中可能包含的研究主题
+        for filename in content.split('\n')[:5]:  # 检查前5行是否有文件名信息
+            if 'Research_Proposal_' in filename and '.md' in filename:
+                # 从文件名中提取主题
+                match = re.search(r'Research_Proposal_([^_]+)', filename)
+                if match:
+                    topic = match.group(1)
+                    # 清理可能的编码问题
+                    topic = topic.replace('_', ' ').strip()
+                    if len(topic) > 3:
+                        return topic
+        
+        # 使用大模型提取标题
+        truncated_content = self.truncate_content(content, 1000)
+        
+        try:
+            from langchain_core.messages import HumanMessage, SystemMessage
+            
+            prompt = f"""
+从以下文本中提取一个合适的研究计划标题，要求简洁明确，适合学术论文：
+
+{truncated_content}
+
+请只返回标题文字，不要包含任何标点符号或格式标记，不要包含"研究计划书"等词汇，最多20个字：
+"""
+            
+            response = self.llm.invoke([
+                SystemMessage(content="你是一个标题提取助手，专门为学术研究计划生成合适的标题。"),
+                HumanMessage(content=prompt)
+            ])
+            extracted_title = response.content.strip()
+            # 清理可能的前缀
+            extracted_title = re.sub(r'^研究计划书[：:]\s*', '', extracted_title)
+            return extracted_title
+        except Exception as e:
+            logging.error(f"提取标题失败: {e}")
+            return "人工智能在医疗领域的应用研究"
+
+    def convert_md_to_latex(self, markdown_content: str, section_type: str) -> str:
+        """
+        将Markdown内容转换为LaTeX格式
+        常见写法（标题、强调、列表、表格、引用、代码/mermaid块）由本地规则确定性转换，
+        只有无法识别的块才交给大模型处理
+        :param markdown_content: Markdown格式的内容
+        :param section_type: 章节类型（如"引言"、"文献综述"等）
+        :return: 转换后的LaTeX内容
+        """
+        citation_keys = [str(ref.get('id')) for ref in self.references_data or [] if ref.get('id') is not None]
+
+        # 按章节Markdown、可引用的文献编号和转换器版本缓存，未改动的章节无需重新转换
+        cache_key = None
+        if self.use_cache:
+            digest = hashlib.sha256(
+                "\x00".join([section_type, markdown_content, ",".join(citation_keys)]).encode('utf-8')
+            ).hexdigest()
+            cache_key = f"latex_section:v{CONVERTER_VERSION}:{digest}"
+            cached = get_from_cache(cache_key)
+            if cached is not None:
+                logging.info(f"✓ {section_type} 内容未变化，复用已转换的LaTeX")
+                return cached
+
+        unrecognized = MdLatexUtil.find_unrecognized(markdown_content)
+        if unrecognized:
+            logging.info(f"{section_type} 中有 {len(unrecognized)} 个块无法本地转换，将使用大模型处理")
+        failed_blocks = []
+
+        def fallback(block: str) -> str:
+            try:
+                return self.convert_md_to_latex_with_llm(block, section_type, raise_on_error=True)
+            except Exception:
+                failed_blocks.append(block)
+                return self._fallback_latex(block, section_type)
+
+        latex_content = MdLatexUtil.render(markdown_content, citation_keys=citation_keys, fallback=fallback)
+        if failed_blocks:
+            # 大模型转换失败的块只做了转义，不写入缓存，下次导出重新转换
+            logging.warning(f"⚠️ {section_type} 中 {len(failed_blocks)} 个块大模型转换失败，本次结果不缓存")
+        elif cache_key:
+            set_to_cache(cache_key, latex_content)
+        return latex_content
+
+    def _fallback_latex(self, markdown_content: str, section_type: str) -> str:
+        """大模型转换失败时的基本LaTeX表示：原文转义后原样输出"""
+        escaped_markdown = self._escape_latex(markdown_content)
+        return f"% ---- Fallback for section: {section_type} ----\n{escaped_markdown}\n% ---- End fallback ----"
+
+    def convert_md_to_latex_with_llm(self, markdown_content: str, section_type: str, raise_on_error: bool = False) -> str:
+        """
+        使用大模型将Markdown内容转换为LaTeX格式
+        :param markdown_content: Markdown格式的内容
+        :param section_type: 章节类型（如"引言"、"文献综述"等）
+        :param raise_on_error: 转换失败时抛出异常，否则返回转义后的原文
+        :return: 转换后的LaTeX内容
+        """
+        # 截断内容以避免超出模型限制
+        truncated_content = self.truncate_content(markdown_content, 60000)
+        
+        prompt = f"""
+请将以下Markdown内容转换为LaTeX格式，用于学术论文的{section_type}部分。要求：
+
+1. 内容只能填入[]占位符中
+2. 严格保持原文内容不变，只转换格式标记
+3. 格式转换规则：
+   - 将 **文本** 转换为 \\textbf{{文本}}
+   - 将 *文本* 转换为 \\textit{{文本}}
+   - 将 ## 标题 转换为 \\subsection{{标题}}
+   - 将 ### 标题 转换为 \\subsubsection{{标题}}
+   - 将 #### 标题 转换为 \\paragraph{{标题}}
+   - 保持引用格式 [数字] 不变
+   - 保持图片相关的LaTeX代码（如\\begin{{figure}}...\\end{{figure}}）不变
+4. 表格处理规则：
+   - 识别Markdown中的表格（以 | 分隔的文本块）
+   - 将表格转换为LaTeX的tabularx环境
+   - 对于三列表格，使用以下列宽比例：
+     * 第一列：15% 的文本宽度
+     * 第二列：25% 的文本宽度
+     * 第三列：60% 的文本宽度
+   - 对于其他列数的表格，使用X列类型平均分配宽度
+   - 表格示例：
+     ```latex
+     \\begin{{tabularx}}{{\\textwidth}}{{>{{\\hsize=0.15\\hsize}}X >{{\\hsize=0.25\\hsize}}X >{{\\hsize=0.60\\hsize}}X}}
+     \\hline
+     列1 & 列2 & 列3 \\\\
+     \\hline
+     内容1 & 内容2 & 内容3 \\\\
+     \\hline
+     \\end{{tabularx}}
+     ```
+5. 段落格式：
+   - 每个段落之间保留一个空行
+   - 确保中文排版正确
+6. 其他要求：
+   - 不要生成任何 \\chapter、\\section 等命令
+   - 不要修改原文中的任何文字内容
+   - 不要添加任何额外的内容
+   - 最多返回2000字的内容
+   - 直接返回LaTeX内容，不要使用```latex```或其他代码块标记包裹
+   - 确保清理所有Markdown格式符号，包括：
+     * 删除所有 **** 加粗符号
+     * 删除所有 ** 加粗符号
+     * 删除所有 * 斜体符号
+     * 删除所有 # 标题符号
+     * 删除所有 - 列表符号
+     * 删除所有 > 引用符号
+     * 删除所有 ` 代码块符号
+     * 删除所有 ``` 代码块符号
+     * 删除所有 [] 链接符号
+     * 删除所有 () 链接符号
+     * 删除所有 | 表格符号
+     * 删除所有 --- 分隔线符号
+7. 反斜杠使用规则：
+   - 严格禁止在非LaTeX命令中使用反斜杠（\\）
+   - 只允许在以下情况使用反斜杠：
+     * LaTeX命令中（如 \\textbf、\\textit、\\subsection 等）
+     * LaTeX环境中（如 \\begin、\\end 等）
+     * LaTeX特殊字符转义（如 \\%、\\$、\\# 等）
+   - 如果原文中包含反斜杠，需要：
+     * 如果是LaTeX命令，保持原样
+     * 如果是普通文本中的反斜杠，需要删除或替换为其他符号
+   - 特别注意：
+     * 不要在普通文本中使用反斜杠作为分隔符
+     * 不要在普通文本中使用反斜杠作为转义字符
+     * 不要在普通文本中使用反斜杠作为路径分隔符
+     * 严格禁止使用非LaTeX语法的反斜杠，例如：
+       - 禁止使用 \\Minecraft、\\CS 等游戏相关缩写
+       - 禁止使用 \\Windows、\\Linux 等操作系统名称
+       - 禁止使用 \\Python、\\Java 等编程语言名称
+       - 禁止使用 \\AI、\\ML 等缩写
+       - 禁止使用 \\URL、\\HTTP 等网络相关缩写
+       - 禁止使用 \\CPU、\\GPU 等硬件相关缩写
+       - 禁止使用 \\API、\\SDK 等软件相关缩写
+       - 禁止使用 \\PDF、\\HTML 等文件格式缩写
+       - 禁止使用 \\USB、\\HDMI 等接口名称
+       - 禁止使用 \\WiFi、\\4G 等网络技术名称
+     * 如果遇到这些情况，应该：
+       - 删除反斜杠，直接使用原文本（如 "Minecraft" 而不是 "\\Minecraft"）
+       - 或者使用适当的LaTeX命令（如 \\texttt{{Minecraft}} 如果需要特殊格式）
+       - 或者使用其他合适的表达方式
+
+Markdown内容：
+{truncated_content}
+
+请只返回转换后的纯LaTeX内容，不要包含任何代码块标记，不要包含任何章节标题：
+"""
+        
+        try:
+            from langchain_core.messages import HumanMessage, SystemMessage
+            
+            response = self.llm.invoke([
+                SystemMessage(content="你是一个专业的LaTeX格式转换助手。请严格按照要求转换格式，保持原文内容不变。对于图片和表格相关的LaTeX代码，请保持原样。确保清理所有Markdown格式符号和编号。特别注意表格的转换，使用tabularx环境并设置合适的列宽比例。特别注意反斜杠的使用，只在LaTeX命令和环境中使用，严格禁止使用非LaTeX语法的反斜杠。"),
+                HumanMessage(content=prompt)
+            ])
+            
+            latex_content = response.content.strip()
+            
+            # 清理提取出的内容
+            # 1. 移除所有章节标题命令
+            latex_content = re.sub(r'\\chapter\{.*?\}', '', latex_content)
+            latex_content = re.sub(r'\\section\{.*?\}', '', latex_content)
+            
+            # 2. 移除所有Markdown标题标记
+            latex_content = re.sub(r'^\s*#+\s*.*$', '', latex_content, flags=re.MULTILINE)
+            
+            # 3. 确保段落之间有适当的空行
+            latex_content = re.sub(r'\n{3,}', '\n\n', latex_content)
+            
+            # 4. 清理所有Markdown格式符号
+            latex_content = re.sub(r'\*\*\*(.*?)\*\*\*', r'\1', latex_content)  # 删除 *** 加粗符号
+            latex_content = re.sub(r'\*\*(.*?)\*\*', r'\1', latex_content)      # 删除 ** 加粗符号
+            latex_content = re.sub(r'\*(.*?)\*', r'\1', latex_content)          # 删除 * 斜体符号
+            latex_content = re.sub(r'^\s*[-*+]\s+', '', latex_content, flags=re.MULTILINE)  # 删除列表符号
+            latex_content = re.sub(r'^\s*>\s+', '', latex_content, flags=re.MULTILINE)      # 删除引用符号
+            latex_content = re.sub(r'`(.*?)`', r'\1', latex_content)            # 删除 ` 代码块符号
+            latex_content = re.sub(r'```.*?```', '', latex_content, flags=re.DOTALL)  # 删除 ``` 代码块符号
+            latex_content = re.sub(r'\[(.*?)\]\(.*?\)', r'\1', latex_content)   # 删除链接符号
+            latex_content = re.sub(r'\|.*?\|', '', latex_content)               # 删除表格符号
+            latex_content = re.sub(r'^\s*---+\s*$', '', latex_content, flags=re.MULTILINE)  # 删除分隔线符号
+            
+            # 5. 清理所有编号
+            latex_content = re.sub(r'^[一二三四五六七八九十]+[、.．。]', '', latex_content, flags=re.MULTILINE)  # 删除中文数字编号
+            latex_content = re.sub(r'^[（(][一二三四五六七八九十]+[）)]', '', latex_content, flags=re.MULTILINE)  # 删除带括号的中文数字编号
+            latex_content = re.sub(r'^\d+[、.．。]', '', latex_content, flags=re.MULTILINE)  # 删除阿拉伯数字编号
+            latex_content = re.sub(r'^[（(]\d+[）)]', '', latex_content, flags=re.MULTILINE)  # 删除带括号的阿拉伯数字编号
+            latex_content = re.sub(r'^\d+\.\d+[、.．。]', '', latex_content, flags=re.MULTILINE)  # 删除带点的编号
+            
+            # 6. 清理非LaTeX命令中的反斜杠
+            # 保留LaTeX命令中的反斜杠
+            latex_content = re.sub(r'(?<!\\)\\(?![\w{])', '', latex_content)  # 删除非LaTeX命令中的反斜杠
+            
+            # 7. 清理特定的非LaTeX语法的反斜杠
+            non_latex_patterns = [
+                r'\\Minecraft', r'\\CS', r'\\Windows', r'\\Linux',
+                r'\\Python', r'\\Java', r'\\AI', r'\\ML',
+                r'\\URL', r'\\HTTP', r'\\CPU', r'\\GPU',
+                r'\\API', r'\\SDK', r'\\PDF', r'\\HTML',
+                r'\\USB', r'\\HDMI', r'\\WiFi', r'\\4G'
+            ]
+            for pattern in non_latex_patterns:
+                latex_content = re.sub(pattern, lambda m: m.group(0)[1:], latex_content)  # 删除反斜杠，保留文本
+            
+            return latex_content.strip()
+        except Exception as e:
+            logging.error(f"转换失败: {e}")
+            if raise_on_error:
+                raise
+            # 如果转换失败，返回一个基本的LaTeX表示
+            return self._fallback_latex(markdown_content, section_type)
+
+    def extract_section_content(self, content: str, section_name: str, index: Optional[MdSectionIndex] = None) -> str:
+        """提取特定章节的内容：文中有对应标题时直接截取，否则使用大模型提取"""
+        index = index or MdSectionIndex(content)
+        section_text = index.section_text(SECTION_TITLES.get(section_name, [section_name]), include_heading=False).strip()
+        if section_text:
+            logging.info(f"✓ 按标题直接截取 {section_name} 章节")
+            return self.clean_markdown_numbering(section_text)
+        
+        # 截断内容以避免超出模型限制
+        truncated_content = self.truncate_content(content, 80000)
+        
+        prompt_text = f"""
+从以下文本中提取与"{section_name}"相关的内容。请只返回相关的段落内容，保持原有的Markdown格式。
+
+如果文本中有明确的章节标题，请优先提取对应章节的内容。如果没有明确的章节标题，请根据内容含义提取相关段落。
+"""
+        if section_name == "总结":
+            prompt_text += """
+特别注意：
+1. 当提取"总结"部分时，请确保内容主要对应研究的最终结论、成果总结、未来展望。
+2. 只提取明确标记为"总结"、"结论"、"展望"、"最终总结"等末尾章节的内容。
+3. 不要包含研究内容、研究方法等主体部分的详细内容。
+4. 如果原文包含以下子标题，请按以下优先级提取：
+   - "最终总结"或"结论"（最高优先级）
+   - "研究展望"或"未来展望"
+   - "预期成果"
+5. 如果发现内容与研究内容部分重复，请只保留总结性的表述。
+6. 确保提取的内容是总结性的，而不是详细的研究过程描述。
+"""
+        elif section_name == "研究内容":
+            prompt_text += """
+特别注意：当提取"研究内容"部分时，请确保内容主要对应研究方法、研究设计、数据来源、分析工具等具体的研究实施方案。
+请重点查找标题为"研究设计"、"研究方法"、"数据和来源"、"方法和分析"、"活动和工作流程"等章节的内容。
+不要包含引言、文献综述等前文内容，只提取与具体研究实施相关的部分。
+"""
+        elif section_name == "引言":
+            prompt_text += """
+特别注意：当提取"引言"部分时，请确保只提取 Markdown 文件中以 `# 引言` (或类似的一级标题，如 `# Introduction`) 开头的章节内容。
+你需要完整地提取该章节下的所有文本，直到遇到下一个一级或二级标题为止。
+不要包含摘要、目录、文献综述或研究计划的其他部分。
+"""
+        
+        prompt_text += f"""
+要求：
+1. 保持原有的Markdown格式
+2. 包含完整的段落，不要截断句子
+3. 如果有多个相关段落，都要包含
+4. 最多返回1000字的内容
+5. **避免重复的章节编号，如果原文中有数字编号，请在提取时清理**
+
+文本内容：
+{truncated_content}
+"""
+        
+        try:
+            from langchain_core.messages import HumanMessage, SystemMessage
+            
+            response = self.llm.invoke([
+                SystemMessage(content=f"你是一个内容提取助手，专门从学术文本中提取{section_name}相关的内容。请保持内容的完整性和准确性，同时避免重复编号。"),
+                HumanMessage(content=prompt_text)
+            ])
+            
+            # 清理可能的重复编号
+            extracted_content = response.content.strip()
+            extracted_content = self.clean_markdown_numbering(extracted_content)
+            
+            return extracted_content
+        except Exception as e:
+            logging.error(f"提取{section_name}内容失败: {e}")
+            # 使用简单的文本匹配作为备用方案
+            return self.simple_section_extraction(content, section_name)
+
+    def simple_section_extraction(self, content: str, section_name: str) -> str:
+        """简单的章节内容提取（备用方案）"""
+        lines = content.split('\n')
+        
+        # 定义章节关键词映射
+        section_keywords = {
+            '引言': ['引言', '介绍', '背景', '研究背景', '问题提出', '研究主题', '第一部分'],
+            '文献综述': ['文献综述', '相关工作', '研究现状', '理论基础', '文献回顾', '第二部分'],
+            '研究内容': ['研究设计', '研究方法', '方法论', '技术路线', '实验设计', '数据和来源', '方法和分析', '活动和工作流程', '第三部分'],
+            '总结': ['总结', '结论', '展望', '预期成果', '时间安排', '结论与展望', '第四部分', '第4部分']
+        }
+        
+        keywords = section_keywords.get(section_name, [section_name])
+        
+        # 查找匹配的章节
+        section_lines = []
+        in_section = False
+        found_start = False
+        
+        for i, line in enumerate(lines):
+            # 对于"研究内容"，特别处理以确保找到正确的起始点
+            if section_name == "研究内容":
+                # 查找"# 研究设计"标题行
+                if line.strip().startswith('#') and '研究设计' in line:
+                    in_section = True
+                    found_start = True
+                    section_lines.append(line)
+                    continue
+                # 如果已经开始，检查是否到了下一个主要章节
+                elif in_section and line.strip().startswith('#') and not any(keyword in line for keyword in keywords):
+                    # 如果遇到不相关的主要章节标题，结束提取
+                    if '参考文献' in line or '附录' in line or len(line.strip()) < 10:
+                        break
+                    # 检查是否是文档末尾的章节
+                    break
+                elif in_section:
+                    section_lines.append(line)
+            else:
+                # 原有逻辑保持不变
+                if any(keyword in line for keyword in keywords) and ('##' in line or '#' in line):
+                    in_section = True
+                    section_lines.append(line)
+                    continue
+                
+                # 检查是否到了下一个章节
+                if in_section and line.strip().startswith('#') and not any(keyword in line for keyword in keywords):
+                    break
+                
+                if in_section:
+                    section_lines.append(line)
+        
+        result = '\n'.join(section_lines).strip()
+        
+        # 如果没有找到特定章节，尝试智能匹配内容
+        if not result and content:
+            # 根据关键词搜索相关段落
+            content_lines = content.split('\n')
+            relevant_paragraphs = []
+            
+            for i, line in enumerate(content_lines):
+                if any(keyword in line.lower() for keyword in [kw.lower() for kw in keywords]):
+                    # 找到关键词，收集该段落及其前后几行
+                    start = max(0, i-2)
+                    end = min(len(content_lines), i+10)
+                    paragraph = '\n'.join(content_lines[start:end])
+                    relevant_paragraphs.append(paragraph)
+            
+            if relevant_paragraphs:
+                result = '\n\n'.join(relevant_paragraphs[:2])  # 最多取前两个段落
+            else:
+                # 最后的备用方案：返回部分内容
+                result = content[:1000] + "..." if len(content) > 1000 else content
+        
+        return result
+
+    def extract_content_by_type(self, md_files: Dict[str, str]) -> Dict[str, str]:
+        """
+        根据文件名或内容推断并提取对应的章节内容
+        """
+        content_map = {
+            'title': '',
+            '引言': '',
+            '文献综述': '',
+            '研究内容': '',
+            '总结': '',
+            '参考文献内容': '', # New placeholder for bibliography
+            'time': datetime.now().strftime('%Y年%m月')
+        }
+        
+        # 合并所有Markdown内容
+        all_content = '\n\n'.join(md_files.values())
+        logging.info(f"总内容长度: {len(all_content)} 字符")
+        
+        # 提取标题
+        title_content = self.extract_title(all_content)
+        if title_content:
+            content_map['title'] = title_content
+            logging.info(f"✓ 提取标题: {title_content}")
+        
+        # 使用大模型分析和提取内容（Markdown），各章节并发提取，LaTeX转换统一在fill_template中进行
+        logging.info(f"正在并发提取各章节内容，并发上限: {self.max_concurrency}")
+        index = MdSectionIndex(all_content)
+        extracted = self._map_sections_concurrently(
+            lambda section: self.extract_section_content(all_content, section, index), SECTION_ORDER
+        )
+        for section in SECTION_ORDER:
+            section_content = extracted[section]
+            if section_content:
+                content_map[section] = section_content
+                logging.info(f"✓ 提取到 {section} 内容，长度: {len(section_content)} 字符")
+            else:
+                logging.warning(f"⚠️ 未找到 {section} 相关内容")
+        
+        # Generate LaTeX bibliography
+        logging.info("正在生成参考文献部分...")
+        bibliography_latex = self._generate_latex_bibliography()
+        if bibliography_latex:
+            content_map['参考文献内容'] = bibliography_latex
+            logging.info(f"✓ 参考文献部分生成完成, 长度: {len(bibliography_latex)} 字符")
+        else:
+            logging.info("ℹ️ 未生成参考文献部分 (无数据或错误)")
+            
+        return content_map
+    
+    def _map_sections_concurrently(self, func: Callable[[str], str], sections: List[str]) -> Dict[str, str]:
+        """
+        对各章节并发执行同一个LLM任务，并发数不超过max_concurrency
+        结果按传入的章节顺序返回，总耗时约为最慢的一个章节而不是各章节之和
+        """
+        if not sections:
+            return {}
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(sections))) as executor:
+            results = list(executor.map(func, sections))
+        logging.info(f"✓ {len(sections)} 个章节处理完成，耗时 {time.time() - start_time:.2f}s")
+        return dict(zip(sections, results))
+
+    def _process_all_mermaid_diagrams(self, markdown_content: str, report_filename_base: str) -> List[Optional[str]]:
+        """
+        处理所有mermaid图表：按源码哈希复用已渲染的图片，未命中的图表合并为一次mmdc调用渲染
+        输出文件名带内容哈希（<base>_diagram_<序号>_<哈希>.png），不会误用以前同名导出留下的旧图；
+        返回与图表一一对应的文件名（渲染失败为None）
+        """
+        try:
+            # 查找所有mermaid代码块
+            mermaid_pattern = r"```mermaid\n(.*?)\n```"
+            mermaid_blocks = list(re.finditer(mermaid_pattern, markdown_content, re.DOTALL))
+            if not mermaid_blocks:
+                return []
+
+            rendered_paths = MermaidUtil.render_all([match.group(1) for match in mermaid_blocks], self.mermaid_cache_dir)
+            diagram_filenames: List[Optional[str]] = []
+            for i, rendered_path in enumerate(rendered_paths):
+                if rendered_path is None:
+                    logging.error(f"❌ 生成图表失败: {report_filename_base} 第{i+1}个图表")
+                    diagram_filenames.append(None)
+                    continue
+                content_hash = os.path.splitext(os.path.basename(rendered_path))[0][:16]
+                diagram_filename = f"{report_filename_base}_diagram_{i+1}_{content_hash}.png"
+                try:
+                    shutil.copyfile(rendered_path, os.path.join(self.output_dir, diagram_filename))
+                    logging.info(f"✅ 成功生成图表: {diagram_filename}")
+                    diagram_filenames.append(diagram_filename)
+                except Exception as e:
+                    logging.error(f"❌ 处理图表时发生错误: {e}")
+                    diagram_filenames.append(None)
+
+            # 删除本文档以前导出留下、内容已变化的图表
+            current = set(diagram_filenames)
+            for stale_path in glob.glob(os.path.join(self.output_dir, f"{glob.escape(report_filename_base)}_diagram_*.png")):
+                if os.path.basename(stale_path) not in current:
+                    try:
+                        os.remove(stale_path)
+                    except OSError:
+                        pass
+            return diagram_filenames
+        except Exception as e:
+            logging.error(f"❌ 处理mermaid图表时发生错误: {e}")
+            return []
+
+    def fill_template(self, template: str, content_map: Dict[str, str], md_content_for_mermaid: str, report_filename_base: str,
+                      timings: Optional[Dict[str, float]] = None, diagram_paths: Optional[List[str]] = None) -> str:
+        """
+        填充LaTeX模板，传入timings时记录图表（mermaid）和章节转换（convert）的耗时，
+        传入diagram_paths时追加本次生成的图表文件路径
+        """
+        timings = timings if timings is not None else {}
+        diagram_filenames: List[Optional[str]] = []
+        try:
+            # 甘特图直接转换为pgfgantt，只有无法解析时才调用mmdc渲染mermaid图表
+            stage_start = time.perf_counter()
+            gantt_chart = GanttUtil.find_first_chart(md_content_for_mermaid)
+            if gantt_chart is None:
+                diagram_filenames = self._process_all_mermaid_diagrams(md_content_for_mermaid, report_filename_base)
+                if diagram_paths is not None:
+                    diagram_paths.extend(os.path.join(self.output_dir, name) for name in diagram_filenames if name)
+            timings["mermaid"] = time.perf_counter() - stage_start
+            
+            # 并发将各正文章节转换为LaTeX格式（标题、时间和参考文献已是最终格式，无需转换）
+            stage_start = time.perf_counter()
+            sections = [section for section in SECTION_ORDER if content_map.get(section)]
+            logging.info(f"正在并发转换 {len(sections)} 个章节为LaTeX格式，并发上限: {self.max_concurrency}")
+            latex_sections = self._map_sections_concurrently(
+                lambda section: self.convert_md_to_latex(content_map[section], section), sections
+            )
+            timings["convert"] = time.perf_counter() - stage_start
+            
+            # 按占位符填充模板（模板本身含有大量LaTeX花括号，不能使用str.format）
+            filled_template = template
+            filled_template = filled_template.replace('[title]', content_map.get('title') or '研究计划')
+            filled_template = filled_template.replace('[time]', content_map.get('time') or datetime.now().strftime('%Y年%m月'))
+            for section in SECTION_ORDER:
+                filled_template = filled_template.replace(f'[{section}]', latex_sections.get(section, ''))
+            filled_template = filled_template.replace('[参考文献内容]', content_map.get('参考文献内容', ''))
+            
+            # 插入第一个mermaid图表（甘特图）
+            gantt_figure_code = ''
+            diagram_filename = diagram_filenames[0] if diagram_filenames else None
+            if gantt_chart is not None:
+                gantt_figure_code = GanttUtil.to_figure(gantt_chart)
+                logging.info(f"✅ 甘特图已转换为pgfgantt，共 {len(gantt_chart.tasks)} 个任务")
+            elif diagram_filename:
+                gantt_figure_code = (
+                    f"\n\n\\begin{{figure}}[htbp]\n"
+                    f"\\centering\n"
+                    f"\\includegraphics[width=0.9\\textwidth]{{{diagram_filename}}}\n"
+                    f"\\caption{{项目时间规划甘特图}}\n"
+                    f"\\label{{fig:gantt}}\n"
+                    f"\\end{{figure}}\n\n"
+                )
+            filled_template = filled_template.replace('[Mermaid Image]', gantt_figure_code)
+            
+            return filled_template
+            
+        except Exception as e:
+            logging.error(f"❌ 填充模板时发生错误: {e}")
+            raise
+
+    def compile_with_xelatex(self, tex_filename: str, output_dir: str = None) -> bool:
+        """
+        使用xelatex编译LaTeX文件生成PDF
+        在独立的临时构建目录中编译，可与其他导出并发进行；文档类和Logo经TEXINPUTS从exporter目录读取，
+        导言区使用缓存的预编译格式，辅助文件收敛后不再重复编译
+        :param tex_filename: LaTeX文件名 (仅文件名部分，如 'proposal.tex')
+        :param output_dir: 输出目录 (如 'exporter/pdf_output')
+        :return: 编译是否成功
+        """
+        if output_dir is None:
+            output_dir = self.output_dir
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        tex_basename = os.path.basename(tex_filename) # 确保只取文件名
+        tex_name_without_ext = os.path.splitext(tex_basename)[0]
+        # tex_full_path 是指在 output_dir 中的路径
+        tex_full_path = os.path.join(output_dir, tex_basename)
+
+        logging.info(f"正在使用xelatex编译: {tex_full_path}")
+        self.send_progress_message("编译LaTeX", f"🔄 正在编译LaTeX文件: {tex_basename}")
+
+        # 检查源文件是否存在
+        if not os.path.exists(tex_full_path):
+            error_msg = f"❌ 找不到源文件: {tex_full_path}"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+
+        if not os.path.exists(os.path.join(self.exporter_dir, "phdproposal.cls")):
+            error_msg = f"❌ 找不到类文件: {os.path.join(self.exporter_dir, 'phdproposal.cls')}"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+
+        if not LatexUtil.is_available():
+            error_msg = "❌ 未找到xelatex命令，请确保已安装LaTeX环境\nUbuntu/Debian: sudo apt-get install texlive-full\nCentOS/RHEL: sudo yum install texlive-scheme-full"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+
+        def on_pass(pass_number: int):
+            if pass_number == 1:
+                self.send_progress_message("编译LaTeX", "🔄 正在进行第一次编译...")
+            else:
+                self.send_progress_message("编译LaTeX", f"🔄 交叉引用有变化，正在进行第{pass_number}次编译...")
+
+        try:
+            result = LatexUtil.compile_isolated(tex_full_path, self.exporter_dir, self.latex_cache_dir, on_pass=on_pass)
+        except subprocess.TimeoutExpired:
+            error_msg = "❌ xelatex编译超时"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+        except Exception as e:
+            error_msg = f"❌ 编译过程中发生错误: {e}"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+
+        if not result.success:
+            error_msg = f"❌ {result.error}"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+
+        pdf_path = os.path.join(output_dir, f"{tex_name_without_ext}.pdf")
+        if not os.path.exists(pdf_path):
+            error_msg = "❌ PDF文件未能生成"
+            logging.error(error_msg)
+            self.send_progress_message("错误", error_msg)
+            return False
+
+        success_msg = f"✅ PDF文件生成成功: {os.path.abspath(pdf_path)}（编译{result.passes}遍）"
+        logging.info(success_msg)
+        self.send_progress_message("完成", success_msg)
+        return True
+
+    def send_progress_message(self, title: str, content: str, step: int = None, is_finish: bool = False):
+        """发送进度消息到前端"""
+        if step is None:
+            step = self.export_step
+            self.export_step += 1  # 每次发送消息后增加step值
+        
+        # 确保content以\n\n开头
+        if not content.startswith("\n\n"):
+            content = "\n\n" + content
+            
+        message = {
+            "proposal_id": self.proposal_id,
+            "step": step,
+            "title": title,
+            "content": content,
+            "is_finish": is_finish
+        }
+        
+        if self.progress_callback is not None:
+            self.progress_callback(message)
+            return
+
+        # 使用json.dumps确保消息格式正确
+        print(f"QUEUE_MESSAGE:{json.dumps(message)}", flush=True)
+
+
+    def export_proposal(self, output_filename: str = "generated_proposal.tex", compile_pdf: bool = True, specific_file: str = None):
+        """
+        导出Markdown文件（默认为output目录中最新的文件），参考文献从同名的 References_<id>.json 加载
+        """
+        try:
+            # 读取Markdown文件
+            try:
+                md_files = self.read_markdown_files(specific_file)
+                md_filepath = specific_file if specific_file in md_files else max(md_files, key=os.path.getmtime)
+                logging.info("✅ 成功读取Markdown文件")
+                logging.info(f"文件为: {md_filepath}")
+            except FileNotFoundError as e:
+                logging.error(f"❌ 未找到Markdown文件: {e}")
+                self.send_progress_message("错误", f"❌ 未找到Markdown文件: {e}")
+                raise
+            
+            # 加载参考文献（需在提取内容之前，参考文献列表和引用编号都依赖它）
+            self._load_references_json(md_filepath)
+            if self.references_data:
+                logging.info("✅ 成功加载参考文献")
+            else:
+                logging.warning("⚠️ 未找到参考文献数据")
+            
+            report_filename_base = os.path.splitext(os.path.basename(md_filepath))[0]
+            self.export_markdown(md_files[md_filepath], report_filename_base, compile_pdf=compile_pdf)
+            return True
+            
+        except Exception as e:
+            logging.error(f"❌ 导出过程中发生错误: {e}")
+            self.send_progress_message("错误", f"❌ 导出过程中发生错误: {e}")
+            raise
+
+    def export_markdown(self, markdown_content: str, report_filename_base: str, compile_pdf: bool = True) -> ExportArtifacts:
+        """
+        导出一份Markdown，参考文献取自 self.references_data
+        :param markdown_content: 研究计划书Markdown内容
+        :param report_filename_base: 输出文件名（不含扩展名）
+        :param compile_pdf: 是否编译PDF
+        :return: 生成的文件路径和各阶段（extract、mermaid、convert、compile）耗时
+        """
+        export_start = time.perf_counter()
+        # 重置导出步骤计数器，使用更高的初始值
+        self.export_step = 100
+        tex_path = os.path.join(self.output_dir, f"{report_filename_base}.tex")
+        artifacts = ExportArtifacts(tex_path=tex_path)
+        
+        self.send_progress_message("开始导出", "🔄 开始导出研究计划...")
+        logging.info("开始导出")
+        
+        # 读取模板
+        try:
+            template = self.read_template()
+            logging.info("✅ 成功读取LaTeX模板")
+            self.send_progress_message("读取模板", "📄 读取LaTeX模板...")
+        except Exception as e:
+            logging.error(f"❌ 读取LaTeX模板时发生错误: {e}")
+            self.send_progress_message("错误", f"❌ 读取LaTeX模板时发生错误: {e}")
+            raise
+        
+        # 提取内容
+        try:
+            stage_start = time.perf_counter()
+            content_map = self.extract_content_by_type({report_filename_base: markdown_content})
+            artifacts.timings["extract"] = time.perf_counter() - stage_start
+            logging.info("✅ 成功提取各部分内容")
+            self.send_progress_message("提取内容", "🔍 提取各部分内容...")
+        except Exception as e:
+            logging.error(f"❌ 提取内容时发生错误: {e}")
+            self.send_progress_message("错误", f"❌ 提取内容时发生错误: {e}")
+            raise
+        
+        # 填充模板
+        try:
+            filled_template = self.fill_template(template, content_map, markdown_content, report_filename_base,
+                                                 artifacts.timings, artifacts.diagram_paths)
+            logging.info("✅ 成功填充模板")
+            self.send_progress_message("填充模板", "📝 填充LaTeX模板...")
+        except Exception as e:
+            logging.error(f"❌ 填充模板时发生错误: {e}")
+            self.send_progress_message("错误", f"❌ 填充模板时发生错误: {e}")
+            raise
+        
+        # 保存LaTeX文件
+        try:
+            with open(tex_path, 'w', encoding='utf-8') as f:
+                f.write(filled_template)
+            logging.info(f"✅ 成功保存LaTeX文件: {tex_path}")
+            self.send_progress_message("保存文件", "💾 保存LaTeX文件...")
+        except Exception as e:
+            logging.error(f"❌ 保存LaTeX文件时发生错误: {e}")
+            self.send_progress_message("错误", f"❌ 保存LaTeX文件时发生错误: {e}")
+            raise
+        
+        # 编译PDF
+        if compile_pdf:
+            stage_start = time.perf_counter()
+            pdf_filename = f"{report_filename_base}.pdf"
+            pdf_path = os.path.join(self.output_dir, pdf_filename)
+            cached_pdf_path = self._get_cached_pdf_path(filled_template)
+            if self.use_cache and os.path.exists(cached_pdf_path):
+                shutil.copyfile(cached_pdf_path, pdf_path)
+                FileCacheUtil.touch(cached_pdf_path)
+                artifacts.pdf_from_cache = True
+                logging.info(f"✅ LaTeX内容未变化，复用已编译的PDF: {pdf_filename}")
+            elif self.compile_with_xelatex(os.path.basename(tex_path)):
+                if self.use_cache and os.path.exists(pdf_path):
+                    # 先写临时文件再原子替换，避免并发导出读到不完整的PDF
+                    temp_cache_path = f"{cached_pdf_path}.{os.getpid()}.tmp"
+                    shutil.copyfile(pdf_path, temp_cache_path)
+                    os.replace(temp_cache_path, cached_pdf_path)
+                    FileCacheUtil.prune(self.pdf_cache_dir)
+            else:
+                error_msg = "❌ PDF编译失败"
+                logging.error(error_msg)
+                self.send_progress_message("错误", error_msg)
+                raise Exception(error_msg)
+            artifacts.pdf_path = pdf_path
+            artifacts.timings["compile"] = time.perf_counter() - stage_start
+            logging.info(f"✅ 成功生成PDF文件: {pdf_filename}")
+            self.send_progress_message("完成", f"✅ 成功生成PDF文件: {pdf_filename}")
+        
+        artifacts.timings["total"] = time.perf_counter() - export_start
+        logging.info("⏱️ 导出耗时: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in artifacts.timings.items()))
+        return artifacts
+
+    def _get_cached_pdf_path(self, filled_template: str) -> str:
+        """
+        PDF缓存路径：由填充后的模板、文档类文件和模板实际引用的插图内容共同决定
+        """
+        digest = hashlib.sha256(filled_template.encode('utf-8'))
+        cls_path = os.path.join(self.exporter_dir, "phdproposal.cls")
+        dependencies = [cls_path] + [os.path.join(self.output_dir, relative)
+                                     for relative in LatexUtil.referenced_files(filled_template, self.output_dir)]
+        for dependency in dependencies:
+            if os.path.exists(dependency):
+                with open(dependency, 'rb') as f:
+                    digest.update(f.read())
+        return os.path.join(self.pdf_cache_dir, f"{digest.hexdigest()}.pdf")
+
+    def _read_file(self, filepath: str) -> str:
+        """读取文件内容"""
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                content = f.read()
+            return content
+        except Exception as e:
+            logging.error(f"❌ 读取文件失败 {filepath}: {str(e)}")
+            raise
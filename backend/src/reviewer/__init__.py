@@ -1,2 +1,2 @@
-from .reviewer import ReviewerAgent
-from .prompts import GENERAL_REVIEW_PROMPT, SECTION_REVIEW_PROMPT, REVISION_GUIDANCE_PROMPT
\ No newline at end of file
+from .reviewer import ReviewerAgent, get_reviewer
+from .prompts import GENERAL_REVIEW_PROMPT, SECTION_REVIEW_PROMPT, COHERENCE_REVIEW_PROMPT, REVISION_GUIDANCE_PROMPT
\ No newline at end of file
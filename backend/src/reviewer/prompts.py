@@ -170,4 +170,60 @@ FIELD_SPECIFIC_RUBRICS = {
         "criterion": "领域价值",
         "description": "评估研究在该特定领域的学术价值和实际应用前景"
     }
-}
\ No newline at end of file
+}
+COHERENCE_REVIEW_PROMPT = """
+你是一位专业的研究计划评审专家。各章节的细节由其他评审专家分别评审，你只需根据下面的提纲、各章开头和统计信息，
+从全局评估这份研究计划书的整体连贯性。
+
+研究主题：{research_field}
+
+## 章节提纲
+{outline}
+
+## 各章开头
+{section_openings}
+
+## 统计信息
+{metadata_summary}
+
+## 评审要求
+请对以下维度评分（1-10分）：
+1. **结构完整性**：章节是否齐全、比例是否恰当、各章之间的逻辑是否衔接
+2. **创新价值**：研究问题和思路是否新颖、有实际或理论价值
+3. **可行性**：整体计划、时间安排和资源需求是否切实可行
+4. **{field_specific_criterion}**：{field_specific_description}
+
+## 输出格式要求
+请提供JSON格式的评审结果，包含以下字段：
+```json
+{{
+  "scores": {{
+    "结构完整性": 分数,
+    "创新价值": 分数,
+    "可行性": 分数,
+    "{field_specific_criterion}": 分数
+  }},
+  "strengths": ["全局优势1", ...],
+  "weaknesses": ["全局不足1", ...],
+  "improvement_suggestions": [
+    {{
+      "section": "具体章节或“整体”",
+      "issue": "问题描述",
+      "suggestion": "改进建议",
+      "priority": "高/中/低"
+    }},
+    ...
+  ],
+  "overall_comments": "总体评审意见"
+}}
+```
+"""
+
+# 结构化输出缺少字段时的补问提示（接在原对话之后，只要求补充缺失的字段）
+JSON_REPAIR_PROMPT = """
+你上面的JSON输出缺少以下字段，或字段格式不正确：
+{missing_fields}
+
+请只输出一个JSON对象，仅包含上述字段（嵌套字段保持原有的层级结构，例如 scores.可行性 写作 {{"scores": {{"可行性": 分数}}}}），
+分数使用1-10的数字，不要重复其他字段，也不要输出任何解释。
+"""
@@ -1,29 +1,55 @@
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
 import logging
 import json
 import os
+import contextvars
+import hashlib
+import threading
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union, Tuple
-import re
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv  # 添加dotenv导入
 
 from .prompts import (
     GENERAL_REVIEW_PROMPT, 
     SECTION_REVIEW_PROMPT, 
+    COHERENCE_REVIEW_PROMPT,
     REVISION_GUIDANCE_PROMPT,
+    JSON_REPAIR_PROMPT,
     FIELD_SPECIFIC_RUBRICS
 )
 from .scoring import (
+    CRITERIA_ORDER,
+    GLOBAL_CRITERIA,
+    RUBRIC_VERSION,
+    SECTION_TITLES,
     determine_research_field_category,
     extract_section_content,
-    calculate_metadata_scores
+    calculate_metadata_scores,
+    aggregate_review_scores
 )
+from ..services.cache_service import get_from_cache, set_to_cache
+from ..utils.json_stream_util import JsonStreamUtil, NUMBER
+from ..utils.md_section_util import MdSectionIndex
+from ..utils.metrics_util import token_usage_callback
 
 # 加载环境变量
 load_dotenv()
 DASHSCOPE_API_KEY = os.environ.get("DASHSCOPE_API_KEY")
 base_url = os.environ.get("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+# 评审模式：sections 为各章节并发评审 + 一次全局连贯性评审，full 为整篇一次评审
+REVIEW_MODE = os.environ.get("REVIEW_MODE", "sections")
+# 分章节评审时同时进行的LLM请求数上限
+REVIEW_CONCURRENCY = int(os.environ.get("REVIEW_CONCURRENCY", "5"))
+# 全局连贯性评审中每章保留的开头字数
+SECTION_OPENING_CHARS = 600
+# 结构化输出缺少必需字段时的补问轮数（每轮只补问缺失的字段）
+JSON_REPAIR_ROUNDS = int(os.environ.get("REVIEW_JSON_REPAIR_ROUNDS", "1"))
+
+# 各提示要求的必需字段；评分维度随研究领域变化，由 _scores_schema 生成
+SECTION_REVIEW_SCHEMA = {"section_score": NUMBER}
+REVISION_GUIDANCE_SCHEMA = {"revision_focus": str, "revision_instructions": list}
 
 class ReviewerAgent:
     """研究计划书评审代理，负责评估ProposalAgent生成的研究计划书并提供改进建议"""
@@ -34,72 +60,94 @@ class ReviewerAgent:
         Args:
             model: 使用的模型名称
         """
+        self.model = model
         # 直接使用从环境变量获取的API密钥
         self.llm = ChatOpenAI(
             api_key=DASHSCOPE_API_KEY,
             model=model,
             base_url=base_url,
-            temperature=0
+            temperature=0,
+            stream_usage=True,  # 流式输出时返回token用量，用于指标统计
+            callbacks=[token_usage_callback],
         )
         
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
         
-    def _parse_json_from_response(self, response_text: str) -> Dict:
-        """从LLM响应中解析JSON数据"""
-        try:
-            # 尝试提取JSON部分（如果被包含在代码块中）
-            json_pattern = r"```json\s*([\s\S]*?)\s*```"
-            json_match = re.search(json_pattern, response_text)
-            
-            if json_match:
-                json_content = json_match.group(1)
-                return json.loads(json_content)
-            
-            # 如果没有JSON代码块，尝试直接解析整个响应
-            return json.loads(response_text)
-            
-        except json.JSONDecodeError:
-            self.logger.error(f"无法解析JSON响应: {response_text[:500]}...")
-            self.logger.error("尝试使用正则表达式提取JSON内容...")
-            
-            try:
-                # 尝试找到类似JSON的结构并修复常见错误
-                # 去掉可能的解释性文本，只保留{}之间的部分
-                json_content_match = re.search(r"({[\s\S]*})", response_text)
-                if json_content_match:
-                    json_content = json_content_match.group(1)
-                    # 修复一些常见JSON格式错误
-                    # 1. 修复未引用的键
-                    json_content = re.sub(r'([{,])\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:', r'\1"\2":', json_content)
-                    # 2. 修复末尾多余的逗号
-                    json_content = re.sub(r',\s*}', '}', json_content)
-                    json_content = re.sub(r',\s*]', ']', json_content)
-                    
-                    return json.loads(json_content)
-            except Exception as e:
-                self.logger.error(f"修复JSON失败: {str(e)}")
-            
-            # 如果所有尝试都失败，返回一个基本的错误对象
+    def _invoke_for_json(self, prompt: str, schema: Dict[str, Any]) -> Dict:
+        """流式调用LLM并增量解析JSON；缺少必需字段时只补问缺失的字段，而不是重新生成整份结果"""
+        messages = [HumanMessage(content=prompt)]
+        data, raw_response = self._stream_json(messages)
+        for _ in range(JSON_REPAIR_ROUNDS):
+            missing = JsonStreamUtil.find_missing(data or {}, schema)
+            if not missing:
+                break
+            self.logger.warning(f"LLM输出缺少字段 {missing}，仅补问这些字段...")
+            repair_prompt = JSON_REPAIR_PROMPT.format(missing_fields="\n".join(f"- {field}" for field in missing))
+            patch, _ = self._stream_json(messages + [AIMessage(content=raw_response), HumanMessage(content=repair_prompt)])
+            if patch:
+                data = JsonStreamUtil.merge(data or {}, patch)
+        
+        if data is None:
+            self.logger.error(f"无法解析JSON响应: {raw_response[:500]}...")
             return {
                 "error": "无法解析响应为JSON",
-                "raw_response": response_text[:1000] + ("..." if len(response_text) > 1000 else "")
+                "raw_response": raw_response[:1000] + ("..." if len(raw_response) > 1000 else "")
             }
+        missing = JsonStreamUtil.find_missing(data, schema)
+        if missing:
+            self.logger.warning(f"补问后仍缺少字段: {missing}")
+        return data
+    
+    def _stream_json(self, messages: List) -> Tuple[Optional[Dict], str]:
+        """顶层JSON对象闭合后立即停止接收，不再等待模型输出后续的说明文字"""
+        return JsonStreamUtil.parse(chunk.content for chunk in self.llm.stream(messages))
     
-    def review_proposal(self, proposal_content: str, research_field: str) -> Dict[str, Any]:
+    @staticmethod
+    def _scores_schema(criteria: List[str]) -> Dict[str, Any]:
+        return {"scores": {criterion: NUMBER for criterion in criteria}}
+    
+    def review_proposal(self, proposal_content: str, research_field: str, mode: str = None,
+                        use_cache: bool = True) -> Dict[str, Any]:
         """评审完整的研究计划书
         
         Args:
             proposal_content: 研究计划书全文内容
             research_field: 研究领域
+            mode: 评审模式，sections（默认，各章节并发评审 + 全局连贯性评审）或 full（整篇一次评审），
+                  未指定时取环境变量 REVIEW_MODE
+            use_cache: 是否复用相同内容、研究领域和评分标准版本的评审结果（图流程、review.py、improve.py共用）
             
         Returns:
-            评审结果字典，包含评分、优缺点和改进建议
+            评审结果字典，包含评分、优缺点和改进建议；sections 模式还包含各章节的得分和评审结果
         """
+        mode = mode or REVIEW_MODE
+        cache_key = self._review_cache_key(proposal_content, research_field, mode)
+        if use_cache:
+            cached = get_from_cache(cache_key)
+            if cached is not None:
+                self.logger.info(f"评审内容未变化，复用已有评审结果，总体评分: {cached.get('llm_scores', {}).get('总体评分', '未知')}")
+                return cached
+        
+        result = self._review(proposal_content, research_field, mode)
+        if result.get("partial"):
+            # 有章节评审失败时不缓存，下次评审重新评审这些章节
+            failed = ", ".join(result.get("failed_sections", []))
+            self.logger.warning(f"章节评审不完整（失败: {failed}），本次结果不缓存")
+        elif use_cache and result.get("success"):
+            set_to_cache(cache_key, result)
+        return result
+    
+    def _review_cache_key(self, proposal_content: str, research_field: str, mode: str) -> str:
+        payload = json.dumps([mode, self.model, research_field, proposal_content], ensure_ascii=False)
+        return f"review:v{RUBRIC_VERSION}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+    
+    def _review(self, proposal_content: str, research_field: str, mode: str) -> Dict[str, Any]:
         self.logger.info(f"开始评审研究计划书: {research_field}")
         
         # 首先计算一些基于元数据的初步评分
-        metadata_scores = calculate_metadata_scores(proposal_content)
+        index = MdSectionIndex(proposal_content)
+        metadata_scores = calculate_metadata_scores(proposal_content, index)
         self.logger.info(f"元数据分析完成: 引用次数={metadata_scores.get('citation_count')}, " 
                         f"参考文献数={metadata_scores.get('reference_count')}")
         
@@ -107,6 +155,14 @@ class ReviewerAgent:
         field_category = determine_research_field_category(research_field)
         field_specific = FIELD_SPECIFIC_RUBRICS.get(field_category, FIELD_SPECIFIC_RUBRICS["default"])
         
+        if mode == "full":
+            return self._review_full(proposal_content, research_field, metadata_scores, field_category, field_specific)
+        return self._review_by_sections(proposal_content, research_field, index, metadata_scores,
+                                        field_category, field_specific)
+    
+    def _review_full(self, proposal_content: str, research_field: str, metadata_scores: Dict[str, Any],
+                     field_category: str, field_specific: Dict[str, str]) -> Dict[str, Any]:
+        """整篇研究计划书一次评审"""
         # 准备评审提示
         review_prompt = GENERAL_REVIEW_PROMPT.format(
             research_field=research_field,
@@ -117,10 +173,8 @@ class ReviewerAgent:
         
         # 调用LLM进行评审
         self.logger.info("正在使用LLM评估研究计划书...")
-        response = self.llm.invoke([HumanMessage(content=review_prompt)])
-        
-        # 解析评审结果
-        review_result = self._parse_json_from_response(response.content)
+        criteria = CRITERIA_ORDER + [field_specific["criterion"]]
+        review_result = self._invoke_for_json(review_prompt, self._scores_schema(criteria))
         
         # 确保评审结果包含必要的字段
         if "error" in review_result:
@@ -131,6 +185,14 @@ class ReviewerAgent:
                 "metadata_scores": metadata_scores
             }
         
+        # 总体评分缺失时取各维度的平均值，避免因缺一个字段而触发整轮改进
+        scores = review_result.get("scores") if isinstance(review_result.get("scores"), dict) else {}
+        review_result["scores"] = scores
+        if not isinstance(scores.get("总体评分"), NUMBER):
+            values = [scores[criterion] for criterion in criteria if isinstance(scores.get(criterion), NUMBER)]
+            if values:
+                scores["总体评分"] = round(sum(values) / len(values), 1)
+        
         # 合并元数据评分和LLM评分
         final_result = {
             "success": True,
@@ -148,6 +210,142 @@ class ReviewerAgent:
         self.logger.info(f"评审完成，总体评分: {review_result.get('scores', {}).get('总体评分', '未知')}")
         return final_result
     
+    def _review_by_sections(self, proposal_content: str, research_field: str, index: MdSectionIndex,
+                            metadata_scores: Dict[str, Any], field_category: str,
+                            field_specific: Dict[str, str]) -> Dict[str, Any]:
+        """各章节并发评审，同时进行一次只看提纲和各章开头的全局连贯性评审，再按固定规则合并得分"""
+        section_contents = {
+            section: extract_section_content(proposal_content, section, index) for section in SECTION_TITLES
+        }
+        present_sections = [section for section, content in section_contents.items() if content]
+        missing_sections = [section for section in SECTION_TITLES if section not in present_sections]
+        if missing_sections:
+            self.logger.warning(f"未找到以下章节，按缺失计分: {', '.join(missing_sections)}")
+        
+        coherence_prompt = COHERENCE_REVIEW_PROMPT.format(
+            research_field=research_field,
+            outline=self._build_outline(index),
+            section_openings=self._build_section_openings(section_contents),
+            metadata_summary=self._build_metadata_summary(metadata_scores),
+            field_specific_criterion=field_specific["criterion"],
+            field_specific_description=field_specific["description"]
+        )
+        
+        self.logger.info(f"正在并发评审 {len(present_sections)} 个章节和全局连贯性，并发上限: {REVIEW_CONCURRENCY}")
+        # 每个任务在调用方上下文的副本中执行，token用量归属到当前节点
+        with ThreadPoolExecutor(max_workers=max(1, min(REVIEW_CONCURRENCY, len(present_sections) + 1))) as executor:
+            coherence_future = executor.submit(
+                contextvars.copy_context().run, self._invoke_for_json, coherence_prompt,
+                self._scores_schema(GLOBAL_CRITERIA + [field_specific["criterion"]])
+            )
+            section_futures = {
+                section: executor.submit(contextvars.copy_context().run, self.review_section,
+                                         section_contents[section], section, research_field)
+                for section in present_sections
+            }
+            coherence_result = coherence_future.result()
+            section_reviews = {}
+            for section, future in section_futures.items():
+                try:
+                    section_reviews[section] = future.result()
+                except Exception as e:
+                    self.logger.error(f"'{section}'章节评审出错: {e}")
+                    section_reviews[section] = {"success": False, "error": str(e)}
+        
+        if "error" in coherence_result:
+            self.logger.error(f"全局连贯性评审出错: {coherence_result['error']}")
+            return {
+                "success": False,
+                "error": coherence_result['error'],
+                "metadata_scores": metadata_scores
+            }
+        
+        # 评审失败的章节不参与计分，缺失的章节按最低档计分
+        section_scores = {section: None for section in missing_sections}
+        failed_sections = []
+        for section, review in section_reviews.items():
+            if review.get("success") and review.get("section_score") is not None:
+                section_scores[section] = review["section_score"]
+            else:
+                failed_sections.append(section)
+                self.logger.warning(f"'{section}'章节评审失败，不计入得分")
+        llm_scores = aggregate_review_scores(section_scores, coherence_result.get("scores", {}), field_specific["criterion"])
+        
+        strengths = list(coherence_result.get("strengths", []))
+        weaknesses = list(coherence_result.get("weaknesses", []))
+        improvement_suggestions = list(coherence_result.get("improvement_suggestions", []))
+        weaknesses += [f"{section}章节缺失" for section in missing_sections]
+        for section in SECTION_TITLES:
+            review = section_reviews.get(section)
+            if not review or not review.get("success"):
+                continue
+            strengths += [f"[{section}] {item}" for item in review.get("strengths", [])]
+            weaknesses += [f"[{section}] {item}" for item in review.get("weaknesses", [])]
+            priority = self._suggestion_priority(review.get("section_score"))
+            for suggestion in review.get("specific_suggestions", []):
+                if isinstance(suggestion, dict):
+                    improvement_suggestions.append({
+                        "section": section,
+                        "issue": suggestion.get("issue", ""),
+                        "suggestion": suggestion.get("suggestion", ""),
+                        "priority": priority
+                    })
+        
+        final_result = {
+            "success": True,
+            "partial": bool(failed_sections),  # 有章节评审失败，得分未包含这些章节
+            "failed_sections": failed_sections,
+            "review_mode": "sections",
+            "review_timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "research_field": research_field,
+            "field_category": field_category,
+            "llm_scores": llm_scores,
+            "metadata_scores": metadata_scores,
+            "section_scores": {section: section_scores[section] for section in SECTION_TITLES if section in section_scores},
+            "section_reviews": section_reviews,
+            "strengths": strengths,
+            "weaknesses": weaknesses,
+            "improvement_suggestions": improvement_suggestions,
+            "overall_comments": coherence_result.get("overall_comments", "")
+        }
+        
+        self.logger.info(f"评审完成，总体评分: {llm_scores.get('总体评分', '未知')}，章节得分: {final_result['section_scores']}")
+        return final_result
+    
+    @staticmethod
+    def _build_outline(index: MdSectionIndex) -> str:
+        """标题提纲，按层级缩进"""
+        return "\n".join(f"{'  ' * (section.level - 1)}- {section.raw_title}" for section in index.sections) or "（无标题）"
+    
+    @staticmethod
+    def _build_section_openings(section_contents: Dict[str, str]) -> str:
+        openings = []
+        for section, content in section_contents.items():
+            if not content:
+                openings.append(f"### {section}\n（缺失）")
+                continue
+            opening = content[:SECTION_OPENING_CHARS] + ("..." if len(content) > SECTION_OPENING_CHARS else "")
+            openings.append(f"### {section}（共{len(content)}字）\n{opening}")
+        return "\n\n".join(openings)
+    
+    @staticmethod
+    def _build_metadata_summary(metadata_scores: Dict[str, Any]) -> str:
+        proportions = "，".join(f"{section} {value}%" for section, value in metadata_scores.get("section_proportions", {}).items())
+        return (f"- 章节比例：{proportions or '无法识别'}\n"
+                f"- 引用次数：{metadata_scores.get('citation_count', 0)}\n"
+                f"- 参考文献数：{metadata_scores.get('reference_count', 0)}")
+    
+    @staticmethod
+    def _suggestion_priority(section_score: Any) -> str:
+        """章节得分越低，其修改建议的优先级越高"""
+        try:
+            score = float(section_score)
+        except (TypeError, ValueError):
+            return "中"
+        if score < 6:
+            return "高"
+        return "中" if score < 8 else "低"
+    
     def review_section(self, section_content: str, section_name: str, research_field: str, section_requirements: str = None) -> Dict[str, Any]:
         """评审研究计划书的特定章节
         
@@ -180,10 +378,7 @@ class ReviewerAgent:
         
         # 调用LLM评审章节
         self.logger.info(f"正在评估'{section_name}'章节...")
-        response = self.llm.invoke([HumanMessage(content=review_prompt)])
-        
-        # 解析评审结果
-        review_result = self._parse_json_from_response(response.content)
+        review_result = self._invoke_for_json(review_prompt, SECTION_REVIEW_SCHEMA)
         
         # 确保评审结果包含必要的字段
         if "error" in review_result:
@@ -226,6 +421,10 @@ class ReviewerAgent:
             scores = review_result.get("llm_scores", {})
             lowest_scores = sorted([(k, v) for k, v in scores.items() if k != "总体评分"], key=lambda x: x[1])[:2]
             focus_areas = [f"{item[0]} (得分: {item[1]})" for item in lowest_scores]
+            # 分章节评审时，同时指出得分最低的章节
+            section_scores = review_result.get("section_scores", {})
+            lowest_sections = sorted(section_scores.items(), key=lambda x: -1 if x[1] is None else x[1])[:2]
+            focus_areas += [f"{section}章节 (得分: {'缺失' if score is None else score})" for section, score in lowest_sections]
         
         specific_focus = "特别关注以下方面：\n" + "\n".join([f"- {area}" for area in focus_areas])
         
@@ -238,10 +437,7 @@ class ReviewerAgent:
         
         # 调用LLM生成修订指导
         self.logger.info("正在生成修订指导...")
-        response = self.llm.invoke([HumanMessage(content=guidance_prompt)])
-        
-        # 解析修订指导结果
-        guidance_result = self._parse_json_from_response(response.content)
+        guidance_result = self._invoke_for_json(guidance_prompt, REVISION_GUIDANCE_SCHEMA)
         
         # 确保结果包含必要的字段
         if "error" in guidance_result:
@@ -260,4 +456,18 @@ class ReviewerAgent:
         }
         
         self.logger.info("修订指导生成完成")
-        return final_guidance
\ No newline at end of file
+        return final_guidance
+
+
+_shared_reviewer: Optional[ReviewerAgent] = None
+_shared_reviewer_lock = threading.Lock()
+
+
+def get_reviewer() -> ReviewerAgent:
+    """进程内共享的ReviewerAgent，LLM客户端只创建一次"""
+    global _shared_reviewer
+    if _shared_reviewer is None:
+        with _shared_reviewer_lock:
+            if _shared_reviewer is None:
+                _shared_reviewer = ReviewerAgent()
+    return _shared_reviewer
@@ -2,9 +2,14 @@
 ReviewerAgent 的评分标准和评分逻辑
 """
 
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 import re
 
+from ..utils.md_section_util import MdSectionIndex
+
+# 评分标准版本，评审提示、评分标准或得分合并规则变化时递增（用于评审缓存失效）
+RUBRIC_VERSION = "2"
+
 # 定义各维度的评分标准
 SCORING_RUBRICS = {
     "结构完整性": {
@@ -118,55 +123,29 @@ def determine_research_field_category(research_field: str) -> str:
     # 如果没有匹配到任何类别，返回默认类别
     return "default"
 
-def extract_section_content(full_content: str, section_name: str) -> str:
-    """从完整内容中提取特定章节的内容"""
-    
-    # 常见章节标题模式
-    section_patterns = {
-        "引言": [r"#\s*引言", r"#\s*1[\.\s]+\s*引言", r"#\s*绪论", r"#\s*Introduction", r"#\s*1[\.\s]+\s*Introduction"],
-        "文献综述": [r"#\s*文献综述", r"#\s*2[\.\s]+\s*文献综述", r"#\s*Literature Review", r"#\s*2[\.\s]+\s*Literature Review"],
-        "研究设计": [r"#\s*研究设计", r"#\s*3[\.\s]+\s*研究设计", r"#\s*研究方法", r"#\s*Research Design", r"#\s*Research Method"],
-        "结论": [r"#\s*结论", r"#\s*4[\.\s]+\s*结论", r"#\s*Conclusion", r"#\s*总结与展望"]
-    }
-    
-    # 尝试查找章节开始位置
-    start_pos = -1
-    end_pos = len(full_content)
-    
-    # 如果没有预定义的模式，尝试直接查找章节名
-    if section_name not in section_patterns:
-        section_patterns[section_name] = [rf"#\s*{section_name}"]
-    
-    # 尝试使用预定义模式查找章节起始位置
-    for pattern in section_patterns[section_name]:
-        match = re.search(pattern, full_content, re.IGNORECASE)
-        if match:
-            start_pos = match.start()
-            break
-    
-    # 如果没找到，返回空字符串
-    if start_pos == -1:
-        return ""
-    
-    # 查找下一个章节，确定当前章节结束位置
-    next_section_pattern = r"#\s*[1-9]?[\.\s]*[^#]+"
-    next_matches = list(re.finditer(next_section_pattern, full_content[start_pos+1:]))
-    if next_matches:
-        # 第一个匹配的就是下一节的开始
-        end_pos = start_pos + 1 + next_matches[0].start()
-    
-    # 提取并返回章节内容
-    return full_content[start_pos:end_pos].strip()
+# 各章节的常见标题（匹配时忽略编号和大小写，标题以其中之一开头即可）
+SECTION_TITLES = {
+    "引言": ["引言", "绪论", "Introduction"],
+    "文献综述": ["文献综述", "Literature Review"],
+    "研究设计": ["研究设计", "研究方法", "Research Design", "Research Method"],
+    "结论": ["结论", "总结与展望", "Conclusion"],
+}
+
+def extract_section_content(full_content: str, section_name: str, index: Optional[MdSectionIndex] = None) -> str:
+    """从完整内容中提取特定章节的内容（含标题和子章节），可传入已建好的章节索引避免重复扫描"""
+    index = index or MdSectionIndex(full_content)
+    return index.section_text(SECTION_TITLES.get(section_name, [section_name])).strip()
 
-def analyze_section_proportions(full_content: str) -> Dict[str, float]:
+def analyze_section_proportions(full_content: str, index: Optional[MdSectionIndex] = None) -> Dict[str, float]:
     """分析各个章节的内容比例"""
+    index = index or MdSectionIndex(full_content)
     sections = ["引言", "文献综述", "研究设计", "结论"]
     section_contents = {}
     section_proportions = {}
     
     # 提取各章节内容
     for section in sections:
-        content = extract_section_content(full_content, section)
+        content = extract_section_content(full_content, section, index)
         section_contents[section] = content
     
     # 计算总内容长度
@@ -187,10 +166,10 @@ def count_citations(full_content: str) -> int:
     citations = re.findall(citation_pattern, full_content)
     return len(citations)
 
-def extract_reference_count(full_content: str) -> int:
+def extract_reference_count(full_content: str, index: Optional[MdSectionIndex] = None) -> int:
     """提取参考文献数量"""
     # 尝试找到参考文献部分
-    ref_section = extract_section_content(full_content, "参考文献")
+    ref_section = extract_section_content(full_content, "参考文献", index)
     if not ref_section:
         # 如果找不到独立的参考文献部分，尝试在全文中寻找
         ref_pattern = r"参考文献\s*\n([\s\S]*?)(?=\n#|\Z)"
@@ -206,12 +185,14 @@ def extract_reference_count(full_content: str) -> int:
     
     return 0
 
-def calculate_metadata_scores(proposal_content: str) -> Dict[str, Any]:
+def calculate_metadata_scores(proposal_content: str, index: Optional[MdSectionIndex] = None) -> Dict[str, Any]:
     """基于元数据计算一些初步评分指标"""
     metadata_scores = {}
+    # 章节索引只建一次，供章节比例和参考文献统计共用
+    index = index or MdSectionIndex(proposal_content)
     
     # 分析章节比例
-    section_proportions = analyze_section_proportions(proposal_content)
+    section_proportions = analyze_section_proportions(proposal_content, index)
     metadata_scores["section_proportions"] = section_proportions
     
     # 理想的章节比例(%)：引言15-20%，文献综述25-35%，研究设计30-40%，结论10-15%
@@ -256,7 +237,7 @@ def calculate_metadata_scores(proposal_content: str) -> Dict[str, Any]:
     metadata_scores["citation_count"] = citation_count
     
     # 提取参考文献数量
-    reference_count = extract_reference_count(proposal_content)
+    reference_count = extract_reference_count(proposal_content, index)
     metadata_scores["reference_count"] = reference_count
     
     # 计算引用/参考文献比率（引用密度）
@@ -276,4 +257,50 @@ def calculate_metadata_scores(proposal_content: str) -> Dict[str, Any]:
         excess = metadata_scores.get("citation_density", 0) - 4
         metadata_scores["citation_score"] = max(5, round(10 - excess, 1))
     
-    return metadata_scores
\ No newline at end of file
+    return metadata_scores
+
+
+# 分章节评审时，由章节得分决定的维度及其依据的章节；其余维度（结构完整性、创新价值、可行性、领域维度）由全局连贯性评审给出
+SECTION_CRITERIA = {
+    "学术严谨性": ["引言", "文献综述", "研究设计", "结论"],
+    "方法适当性": ["研究设计"],
+    "文献整合": ["文献综述"],
+}
+# 与整篇评审（GENERAL_REVIEW_PROMPT）相同的维度顺序，领域特定维度排在最后
+CRITERIA_ORDER = ["结构完整性", "学术严谨性", "方法适当性", "创新价值", "可行性", "文献整合"]
+# 由全局连贯性评审给出的维度（另加领域特定维度）
+GLOBAL_CRITERIA = [criterion for criterion in CRITERIA_ORDER if criterion not in SECTION_CRITERIA]
+# 章节缺失时的得分（对应评分标准中"缺失"的档位）
+MISSING_SECTION_SCORE = 1
+
+def _to_score(value: Any) -> Optional[float]:
+    """把LLM返回的分数规范为1-10之间的数值，无法识别时返回None"""
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return min(10.0, max(1.0, score))
+
+def aggregate_review_scores(section_scores: Dict[str, Any], global_scores: Dict[str, Any],
+                            field_criterion: str) -> Dict[str, float]:
+    """
+    合并分章节评审和全局评审的得分，输出与整篇评审相同的维度（含总体评分）
+    结果只取决于输入的分数：章节维度取相关章节得分的平均值，总体评分取各维度的平均值，均保留一位小数
+    :param section_scores: 章节名 -> 章节得分（章节缺失时为None，评审失败的章节不应出现在其中）
+    :param global_scores: 全局连贯性评审返回的scores
+    :param field_criterion: 领域特定维度的名称
+    """
+    scores = {}
+    for criterion in CRITERIA_ORDER + [field_criterion]:
+        if criterion in SECTION_CRITERIA:
+            values = [_to_score(MISSING_SECTION_SCORE if section_scores[section] is None else section_scores[section])
+                      for section in SECTION_CRITERIA[criterion] if section in section_scores]
+            values = [value for value in values if value is not None]
+            score = sum(values) / len(values) if values else None
+        else:
+            score = _to_score(global_scores.get(criterion))
+        if score is not None:
+            scores[criterion] = round(score, 1)
+    if scores:
+        scores["总体评分"] = round(sum(scores.values()) / len(scores), 1)
+    return scores
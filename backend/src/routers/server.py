@@ -6,10 +6,13 @@ from pathlib import Path
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi import HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from src.services.agent_service import agent_service
+from src.services.export_service import shutdown_export_pool
+from src.services.memory_service import flush_memory
 from src.entity.r import R
 from src.utils.queue_util import QueueUtil
+from src.utils.metrics_util import MetricsUtil
 from src.entity.stream_mes import StreamMes
 import asyncio
 
@@ -27,6 +30,13 @@ app.add_middleware(
 thread_pool = ThreadPoolExecutor(max_workers=5)
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    """关闭导出进程池，写完排队中的长期记忆"""
+    shutdown_export_pool()
+    flush_memory()
+
+
 @app.post("/sendQuery")
 async def send_query(data: dict):
     """
@@ -128,3 +138,11 @@ async def download(data: dict):
     if not os.path.exists(file_path):
         raise HTTPException(status_code=500, detail="File not found")
     return FileResponse(path=file_path, filename=file_name)
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    以Prometheus文本格式导出工作流节点、LLM token和工具调用的指标
+    """
+    return PlainTextResponse(MetricsUtil.render_prometheus(), media_type="text/plain; version=0.0.4")
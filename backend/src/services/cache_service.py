@@ -1,5 +1,6 @@
 import sqlite3
 import json
+import threading
 import time
 import os
 import logging
@@ -9,6 +10,9 @@ CACHE_DB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'cache
 # Set a default Time-To-Live for cache entries to 7 days
 DEFAULT_TTL = 86400 * 7  # 7 days in seconds
 
+_db_initialized = False
+_db_init_lock = threading.Lock()
+
 def init_cache_db():
     """Initializes the SQLite database and creates the cache table if it doesn't exist."""
     try:
@@ -21,13 +25,25 @@ def init_cache_db():
                     timestamp REAL NOT NULL
                 )
             """)
+            # Expired rows are otherwise only removed when their key is read again
+            cursor.execute("DELETE FROM cache WHERE timestamp < ?", (time.time() - DEFAULT_TTL,))
             conn.commit()
         logging.info(f"Cache database initialized at {CACHE_DB_PATH}")
     except sqlite3.Error as e:
         logging.error(f"Database error during cache initialization: {e}")
 
+def _ensure_cache_db():
+    """Creates the cache table on first use instead of at import time."""
+    global _db_initialized
+    if not _db_initialized:
+        with _db_init_lock:
+            if not _db_initialized:
+                init_cache_db()
+                _db_initialized = True
+
 def get_from_cache(key: str) -> any:
     """Retrieves a value from the cache if the key exists and has not expired."""
+    _ensure_cache_db()
     try:
         with sqlite3.connect(CACHE_DB_PATH) as conn:
             cursor = conn.cursor()
@@ -51,6 +67,7 @@ def get_from_cache(key: str) -> any:
 
 def set_to_cache(key: str, value: any):
     """Sets a key-value pair in the cache with the current timestamp."""
+    _ensure_cache_db()
     try:
         value_json = json.dumps(value)
         with sqlite3.connect(CACHE_DB_PATH) as conn:
@@ -64,7 +81,3 @@ def set_to_cache(key: str, value: any):
         logging.info(f"CACHE SET for key: {key[:50]}...")
     except (sqlite3.Error, TypeError) as e:
         logging.error(f"Error setting cache for key {key}: {e}")
-
-# Initialize the database when the module is first imported.
-# This ensures it's ready before any function is called.
-init_cache_db() 
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+研究计划书的LaTeX/PDF导出服务
+导出在常驻的进程池中执行：每个工作进程只导入一次导出器（backend.src.exporter）和 langchain，
+并复用同一个 ProposalExporter（及其LLM客户端）；进度消息经进程间队列回传，由监听线程直接写入 QueueUtil
+"""
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from ..entity.stream_mes import StreamAnswerMes
+from ..utils.latex_util import COMPILE_WORKERS
+from ..utils.queue_util import QueueUtil
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
+# 导出进程池大小；每次导出在独立的构建目录中编译，可以并发进行；
+# xelatex吃CPU，所有工作进程共用一个跨进程信号量，同时编译数不超过 LATEX_COMPILE_WORKERS
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", str(os.cpu_count() or 2)))
+
+
+class ExportJobError(Exception):
+    """导出任务在工作进程中执行失败（此时工作进程已发送结束消息）"""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_progress_queue = None
+_forward_thread: Optional[threading.Thread] = None
+_pool_lock = threading.Lock()
+
+# 工作进程内的全局状态
+_worker_exporter = None
+_worker_progress_queue = None
+
+
+def _init_worker(root_dir: str, progress_queue, compile_slots):
+    """工作进程初始化：让 backend.src.* 可导入，记录进度队列，使用进程池共享的编译信号量"""
+    global _worker_progress_queue
+    if root_dir not in sys.path:
+        sys.path.insert(0, root_dir)
+    _worker_progress_queue = progress_queue
+    from ..utils.latex_util import LatexUtil
+    LatexUtil.use_compile_slots(compile_slots)
+
+
+def _export_job(md_path: str, proposal_id: str) -> bool:
+    """
+    在工作进程中执行一次导出，ProposalExporter在进程内只创建一次
+    结束消息也经进度队列发送，保证它排在本次导出的所有进度消息之后
+    """
+    global _worker_exporter
+    try:
+        if _worker_exporter is None:
+            from ..exporter import ProposalExporter
+            _worker_exporter = ProposalExporter(progress_callback=_worker_progress_queue.put)
+        _worker_exporter.proposal_id = proposal_id
+        success = _worker_exporter.export_proposal(compile_pdf=True, specific_file=md_path)
+    except Exception as e:
+        _worker_progress_queue.put(_finish_message(proposal_id, f"\n\n❌ 导出失败: {e}", "错误"))
+        raise
+    _worker_progress_queue.put(_finish_message(proposal_id, "\n\n✅ 成功导出pdf", "导出pdf"))
+    return success
+
+
+def _finish_message(proposal_id: str, content: str, title: str) -> Dict:
+    return {"proposal_id": proposal_id, "step": 1000, "title": title, "content": content, "is_finish": True}
+
+
+def _forward_progress(progress_queue):
+    """监听线程：把工作进程的进度消息推送到对应提案的消息队列"""
+    while True:
+        message: Dict = progress_queue.get()
+        if message is None:
+            break
+        try:
+            QueueUtil.push_mes(StreamAnswerMes(
+                proposal_id=message["proposal_id"],
+                step=message["step"],
+                title=message["title"],
+                content=message["content"],
+                is_finish=message["is_finish"]
+            ))
+        except Exception as e:
+            logging.error(f"转发导出进度消息失败: {e}, 原始消息: {message}")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """懒加载进程池；使用spawn避免在多线程的服务进程中fork"""
+    global _pool, _progress_queue, _forward_thread
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("spawn")
+            _progress_queue = context.Queue()
+            _pool = ProcessPoolExecutor(
+                max_workers=EXPORT_WORKERS,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(ROOT_DIR, _progress_queue, context.BoundedSemaphore(COMPILE_WORKERS)),
+            )
+            _forward_thread = threading.Thread(target=_forward_progress, args=(_progress_queue,),
+                                               name="export-progress", daemon=True)
+            _forward_thread.start()
+            logging.info(f"导出进程池已启动，工作进程数: {EXPORT_WORKERS}")
+        return _pool
+
+
+def shutdown_export_pool():
+    """关闭进程池和监听线程"""
+    global _pool, _progress_queue, _forward_thread
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _progress_queue.put(None)  # 先转发完剩余消息再退出监听线程
+            _forward_thread.join()
+            _pool, _progress_queue, _forward_thread = None, None, None
+
+
+def export_proposal_pdf(proposal_id: str, md_path: Optional[str] = None) -> bool:
+    """
+    导出指定提案的PDF，阻塞直到完成
+    :param proposal_id: 提案ID
+    :param md_path: Markdown文件路径，默认为 output/Research_Proposal_<proposal_id>.md
+    """
+    md_path = md_path or os.path.join(OUTPUT_DIR, f"Research_Proposal_{proposal_id}.md")
+    if not os.path.exists(md_path):
+        raise FileNotFoundError(f"找不到要导出的Markdown文件: {md_path}")
+
+    logging.info(f"开始导出PDF: {md_path}")
+    future = _get_pool().submit(_export_job, md_path, proposal_id)
+    try:
+        success = future.result()
+    except BrokenProcessPool:
+        # 工作进程异常退出后进程池不可再用，丢弃以便下次重建
+        shutdown_export_pool()
+        raise
+    except Exception as e:
+        raise ExportJobError(str(e)) from e
+    logging.info(f"PDF导出完成: {md_path}")
+    return success
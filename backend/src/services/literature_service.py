@@ -0,0 +1,402 @@
+"""
+跨计划书复用的本地文献库
+- 来源：Papers/ 下已下载的PDF（提取全文）、output/References_<id>.json 中的arXiv和CrossRef文献，
+  以及检索和PDF总结过程中在线写入的论文与详细摘要
+- 元数据、全文和摘要存放在SQLite（literature.db），标题+摘要的向量存放在长期记忆目录下的独立Chroma集合
+- 每次检索前按文件修改时间增量同步来源，只对新增或摘要有变化的论文重新嵌入（批量）
+- search_local_papers 把进程内BM25倒排索引（标题、摘要和正文开头）与向量检索的排序做倒数排名融合，
+  向量库不可用时只用BM25，全程不访问外部检索接口
+规划和执行检索步骤时先查这里，只为本地没有覆盖的部分调用外部接口
+"""
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from ..agent.references import normalize_arxiv_id, normalize_doi, normalize_title
+from ..utils.bm25_util import Bm25Index, reciprocal_rank_fusion
+from ..utils.metrics_util import MetricsUtil
+from .memory_service import open_collection
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+PAPERS_DIR = os.path.join(ROOT_DIR, "Papers")
+OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
+LITERATURE_DB_PATH = os.path.abspath(os.environ.get("LITERATURE_DB_PATH", os.path.join(ROOT_DIR, "literature.db")))
+LITERATURE_COLLECTION = "proposal_agent_literature"
+# 检索返回的论文数和相关度阈值（0~1）
+LITERATURE_TOP_K = int(os.environ.get("LITERATURE_TOP_K", "8"))
+LITERATURE_RELEVANCE_THRESHOLD = float(os.environ.get("LITERATURE_RELEVANCE_THRESHOLD", "0.45"))
+# 单篇论文保存的全文字符上限，以及没有摘要时用于嵌入的正文字符数
+LITERATURE_TEXT_CHARS = int(os.environ.get("LITERATURE_TEXT_CHARS", "200000"))
+EMBED_TEXT_CHARS = 1500
+EMBED_BATCH_SIZE = 64
+# 参与BM25索引的正文字符数（全文太长，倒排表会占用大量内存）
+BM25_TEXT_CHARS = int(os.environ.get("LOCAL_SEARCH_TEXT_CHARS", "3000"))
+# 只来自检索结果（没有本地PDF）的论文最多保留的篇数，超出时淘汰最久未更新的
+LITERATURE_MAX_PAPERS = int(os.environ.get("LITERATURE_MAX_PAPERS", "20000"))
+# 混合检索时每一路取的候选数
+HYBRID_FETCH_K = 50
+# 混合检索中BM25一路的最低得分比例（得分 / 查询词idf加权上界），与向量一路的相关度阈值一起过滤无关论文
+BM25_MIN_SCORE_RATIO = float(os.environ.get("LOCAL_SEARCH_BM25_MIN_RATIO", "0.15"))
+
+# Papers目录下的文件名为 <arxiv_id>_<标题>.pdf
+_PDF_NAME_PATTERN = re.compile(r'^([^_]+)_(.*)\.pdf$', re.IGNORECASE)
+
+_db_initialized = False
+_sync_lock = threading.Lock()
+_store = None
+_bm25 = Bm25Index()
+_bm25_watermark = 0.0  # 已加入BM25索引的最大updated_at
+_bm25_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    global _db_initialized
+    conn = sqlite3.connect(LITERATURE_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not _db_initialized:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers (
+                paper_id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                authors TEXT NOT NULL DEFAULT '[]',
+                published TEXT NOT NULL DEFAULT '',
+                categories TEXT NOT NULL DEFAULT '[]',
+                arxiv_id TEXT NOT NULL DEFAULT '',
+                doi TEXT NOT NULL DEFAULT '',
+                journal TEXT NOT NULL DEFAULT '',
+                url TEXT NOT NULL DEFAULT '',
+                summary TEXT NOT NULL DEFAULT '',
+                detailed_summary TEXT NOT NULL DEFAULT '',
+                pdf_path TEXT NOT NULL DEFAULT '',
+                text TEXT NOT NULL DEFAULT '',
+                embedded_digest TEXT NOT NULL DEFAULT '',
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS papers_pdf_path ON papers (pdf_path);
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL
+            );
+        """)
+        _db_initialized = True
+    return conn
+
+
+def paper_key(paper: Dict) -> str:
+    """论文的唯一标识：优先arXiv ID，其次DOI，最后标准化标题"""
+    arxiv_id = normalize_arxiv_id(paper.get("arxiv_id", ""))
+    if arxiv_id:
+        return f"arxiv:{arxiv_id}"
+    doi = normalize_doi(paper.get("doi", ""))
+    if doi:
+        return f"doi:{doi}"
+    title = normalize_title(paper.get("title", ""))
+    return f"title:{title}" if title else ""
+
+
+def _upsert(conn: sqlite3.Connection, paper: Dict) -> bool:
+    """写入一篇论文，已存在时只用非空的新字段覆盖，返回是否写入"""
+    paper_id = paper_key(paper)
+    if not paper_id:
+        return False
+    row = conn.execute("SELECT * FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+    record = dict(row) if row else {"paper_id": paper_id, "type": paper.get("type") or "ArXiv", "title": "",
+                                    "authors": "[]", "published": "", "categories": "[]", "arxiv_id": "",
+                                    "doi": "", "journal": "", "url": "", "summary": "", "detailed_summary": "",
+                                    "pdf_path": "", "text": "", "embedded_digest": ""}
+    for field in ("title", "published", "arxiv_id", "doi", "journal", "url", "summary",
+                  "detailed_summary", "pdf_path", "text"):
+        value = paper.get(field)
+        if value:
+            record[field] = str(value)
+    for field in ("authors", "categories"):
+        if paper.get(field):
+            record[field] = json.dumps(list(paper[field]), ensure_ascii=False)
+    if paper.get("type") == "ArXiv" or record["arxiv_id"]:
+        record["type"] = "ArXiv"
+    if row is None or _embed_text(record) != _embed_text(row):
+        record["embedded_digest"] = ""  # 标题或摘要有变化，需要重新嵌入
+    record["updated_at"] = time.time()
+    columns = list(record)
+    conn.execute(f"INSERT OR REPLACE INTO papers ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                 [record[column] for column in columns])
+    return True
+
+
+def upsert_papers(papers: Iterable[Dict], paper_type: str = "ArXiv") -> int:
+    """登记检索得到的论文（search_arxiv_papers/search_crossref_papers的结果），返回写入数量"""
+    count = 0
+    with _connect() as conn:
+        for paper in papers:
+            if not isinstance(paper, dict) or "error" in paper:
+                continue
+            count += _upsert(conn, {**paper, "type": paper_type,
+                                    "pdf_path": paper.get("local_pdf_path") or "",
+                                    "detailed_summary": paper.get("detailed_summary") or ""})
+        if count:
+            _evict_excess(conn)
+    return count
+
+
+def _evict_excess(conn: sqlite3.Connection):
+    """
+    只来自检索结果的论文超过LITERATURE_MAX_PAPERS时，删除最久未更新的论文及其向量和BM25文档；
+    有本地PDF的论文随Papers目录增减，不参与淘汰
+    """
+    excess = conn.execute("SELECT COUNT(*) FROM papers WHERE pdf_path = ''").fetchone()[0] - LITERATURE_MAX_PAPERS
+    if excess <= 0:
+        return
+    paper_ids = [row["paper_id"] for row in conn.execute(
+        "SELECT paper_id FROM papers WHERE pdf_path = '' ORDER BY updated_at LIMIT ?", (excess,))]
+    conn.executemany("DELETE FROM papers WHERE paper_id = ?", [(paper_id,) for paper_id in paper_ids])
+    with _bm25_lock:
+        for paper_id in paper_ids:
+            _bm25.remove(paper_id)
+    try:
+        _get_store().delete(ids=paper_ids)
+    except Exception as e:
+        logging.warning(f"⚠️ 删除淘汰论文的向量失败: {e}")
+    logging.info(f"📚 文献库超过 {LITERATURE_MAX_PAPERS} 篇，淘汰最久未更新的 {len(paper_ids)} 篇")
+
+
+def record_summary(pdf_path: str, summary: str):
+    """保存PDF的详细摘要，之后同一篇论文不再重复总结"""
+    if not summary:
+        return
+    paper = {"pdf_path": os.path.abspath(pdf_path), "detailed_summary": summary}
+    match = _PDF_NAME_PATTERN.match(os.path.basename(pdf_path))
+    if match:
+        paper["arxiv_id"] = match.group(1)
+    with _connect() as conn:
+        row = conn.execute("SELECT paper_id FROM papers WHERE pdf_path = ?", (paper["pdf_path"],)).fetchone()
+        if row:
+            conn.execute("UPDATE papers SET detailed_summary = ?, embedded_digest = '', updated_at = ? "
+                         "WHERE paper_id = ?",
+                         (summary, time.time(), row["paper_id"]))
+        else:
+            _upsert(conn, paper)
+
+
+def find_summary(pdf_path: str) -> str:
+    """返回已保存的PDF详细摘要，没有时返回空字符串"""
+    pdf_path = os.path.abspath(pdf_path)
+    arxiv_match = _PDF_NAME_PATTERN.match(os.path.basename(pdf_path))
+    with _connect() as conn:
+        row = conn.execute("SELECT detailed_summary FROM papers WHERE pdf_path = ? AND detailed_summary != ''",
+                           (pdf_path,)).fetchone()
+        if row is None and arxiv_match:
+            row = conn.execute("SELECT detailed_summary FROM papers WHERE paper_id = ?",
+                               (paper_key({"arxiv_id": arxiv_match.group(1)}),)).fetchone()
+    return row["detailed_summary"] if row else ""
+
+
+def _source_changed(conn: sqlite3.Connection, path: str) -> Optional[float]:
+    """文件自上次同步后有变化时返回新的修改时间"""
+    mtime = os.path.getmtime(path)
+    row = conn.execute("SELECT mtime FROM sources WHERE path = ?", (path,)).fetchone()
+    return mtime if row is None or row["mtime"] != mtime else None
+
+
+def _extract_pdf_text(path: str) -> str:
+    try:
+        import fitz
+        with fitz.open(path) as doc:
+            parts, length = [], 0
+            for page in doc:
+                text = page.get_text()
+                parts.append(text)
+                length += len(text)
+                if length >= LITERATURE_TEXT_CHARS:
+                    break
+        return "".join(parts)[:LITERATURE_TEXT_CHARS]
+    except Exception as e:
+        logging.warning(f"⚠️ 提取PDF文本失败: {path} - {e}")
+        return ""
+
+
+def sync_local_sources() -> int:
+    """增量同步Papers目录和历史参考文献文件，返回新增或更新的论文数"""
+    updated = 0
+    with _connect() as conn:
+        for path in sorted(glob.glob(os.path.join(OUTPUT_DIR, "References_*.json"))):
+            mtime = _source_changed(conn, path)
+            if mtime is None:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    references = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"⚠️ 读取参考文献文件失败: {path} - {e}")
+                references = []
+            for ref in references if isinstance(references, list) else []:
+                if isinstance(ref, dict) and ref.get("type") in ("ArXiv", "CrossRef"):
+                    updated += _upsert(conn, ref)
+            conn.execute("INSERT OR REPLACE INTO sources (path, mtime) VALUES (?, ?)", (path, mtime))
+
+        for path in sorted(glob.glob(os.path.join(PAPERS_DIR, "*.pdf"))):
+            path = os.path.abspath(path)
+            mtime = _source_changed(conn, path)
+            if mtime is None:
+                continue
+            match = _PDF_NAME_PATTERN.match(os.path.basename(path))
+            paper = {"type": "ArXiv", "pdf_path": path, "text": _extract_pdf_text(path)}
+            if match:
+                paper["arxiv_id"] = match.group(1)
+                paper["title"] = match.group(2).replace("-", " ")
+            else:
+                paper["title"] = os.path.splitext(os.path.basename(path))[0]
+            # 已有完整元数据时不用文件名里截短的标题覆盖
+            if match and conn.execute("SELECT 1 FROM papers WHERE paper_id = ? AND title != ''",
+                                      (paper_key(paper),)).fetchone():
+                paper.pop("title")
+            updated += _upsert(conn, paper)
+            conn.execute("INSERT OR REPLACE INTO sources (path, mtime) VALUES (?, ?)", (path, mtime))
+    return updated
+
+
+def _embed_text(row) -> str:
+    """用于嵌入的文本：标题加最好的摘要，没有摘要时用正文开头（通常是摘要和引言）"""
+    summary = row["detailed_summary"] or row["summary"] or row["text"][:EMBED_TEXT_CHARS]
+    return f"{row['title']}\n{summary}".strip()
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = open_collection(LITERATURE_COLLECTION)
+    return _store
+
+
+def _embed_pending() -> int:
+    """为新增或嵌入文本有变化（embedded_digest被清空）的论文批量计算向量，返回嵌入数量"""
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT paper_id, type, title, summary, detailed_summary, substr(text, 1, ?) AS text FROM papers "
+            "WHERE embedded_digest = ''", (EMBED_TEXT_CHARS,)).fetchall()
+        pending = [(row, text, hashlib.sha1(text.encode("utf-8")).hexdigest())
+                   for row, text in ((row, _embed_text(row)) for row in rows) if text]
+        if not pending:
+            return 0
+        start_time = time.time()
+        store = _get_store()
+        for offset in range(0, len(pending), EMBED_BATCH_SIZE):
+            batch = pending[offset:offset + EMBED_BATCH_SIZE]
+            store.add_texts(
+                texts=[text for _, text, _ in batch],
+                metadatas=[{"paper_id": row["paper_id"], "title": row["title"], "type": row["type"]}
+                           for row, _, _ in batch],
+                ids=[row["paper_id"] for row, _, _ in batch],
+            )
+            conn.executemany("UPDATE papers SET embedded_digest = ? WHERE paper_id = ?",
+                             [(digest, row["paper_id"]) for row, _, digest in batch])
+        logging.info(f"📚 文献库新嵌入 {len(pending)} 篇论文，耗时 {time.time() - start_time:.2f}s")
+    return len(pending)
+
+
+def refresh_literature_index():
+    """同步来源并补齐向量；多个计划书并发检索时只有一个线程执行"""
+    with _sync_lock:
+        start_time = time.time()
+        updated = sync_local_sources()
+        embedded = _embed_pending()
+        if updated or embedded:
+            logging.info(f"📚 文献库同步完成：更新 {updated} 篇，嵌入 {embedded} 篇，耗时 {time.time() - start_time:.2f}s")
+
+
+def _row_to_paper(row: sqlite3.Row, relevance: float) -> Dict:
+    """转换为与检索工具结果相同的结构"""
+    paper = {
+        "type": row["type"],
+        "title": row["title"],
+        "authors": json.loads(row["authors"]),
+        "summary": row["summary"] or row["detailed_summary"][:300],
+        "published": row["published"],
+        "categories": json.loads(row["categories"]),
+        "arxiv_id": row["arxiv_id"],
+        "local_pdf_path": row["pdf_path"] if row["pdf_path"] and os.path.exists(row["pdf_path"]) else None,
+        "from_local_index": True,
+        "relevance": round(relevance, 4),
+    }
+    if row["detailed_summary"]:
+        paper["detailed_summary"] = row["detailed_summary"]
+    if row["doi"]:
+        paper.update({"doi": row["doi"], "journal": row["journal"], "url": row["url"]})
+    return paper
+
+
+def search_literature(query: str, k: int = LITERATURE_TOP_K,
+                      score_threshold: float = LITERATURE_RELEVANCE_THRESHOLD) -> List[Dict]:
+    """检索本地文献库，返回相关度不低于阈值的至多k篇论文"""
+    refresh_literature_index()
+    scored = [(doc.metadata.get("paper_id"), score)
+              for doc, score in _get_store().similarity_search_with_relevance_scores(query, k=k)
+              if score >= score_threshold]
+    papers = []
+    with _connect() as conn:
+        for paper_id, score in scored:
+            row = conn.execute("SELECT * FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row is not None:
+                papers.append(_row_to_paper(row, score))
+    MetricsUtil.inc("proposal_literature_index_queries_total", {"hit": str(bool(papers)).lower()},
+                    help_text="本地文献库检索次数")
+    logging.info(f"📚 本地文献库检索 '{query}'：命中 {len(papers)} 篇")
+    return papers
+
+
+def _refresh_bm25():
+    """把上次之后新增或更新的论文加入BM25索引（更新的论文替换旧文档）"""
+    global _bm25_watermark
+    with _bm25_lock, _connect() as conn:
+        rows = conn.execute(
+            "SELECT paper_id, title, summary, detailed_summary, substr(text, 1, ?) AS text, updated_at FROM papers "
+            "WHERE updated_at > ? ORDER BY updated_at", (BM25_TEXT_CHARS, _bm25_watermark)).fetchall()
+        for row in rows:
+            # 标题重复一次以提高标题命中的权重
+            _bm25.add(row["paper_id"], "\n".join((row["title"], row["title"], row["summary"],
+                                                   row["detailed_summary"], row["text"])))
+        if rows:
+            _bm25_watermark = rows[-1]["updated_at"]
+            logging.info(f"📚 BM25索引更新 {len(rows)} 篇，共 {len(_bm25)} 篇")
+
+
+def search_local_papers(query: str, k: int = 10) -> List[Dict]:
+    """
+    混合检索本地文献库：BM25和向量相似度各取候选，按倒数排名融合后返回前k篇
+    每一路只保留过了各自阈值的候选（BM25_MIN_SCORE_RATIO、LITERATURE_RELEVANCE_THRESHOLD），
+    库中没有相关论文时返回空列表；relevance为融合得分（只用于排序）
+    """
+    with _sync_lock:
+        sync_local_sources()
+    _refresh_bm25()
+    fetch_k = max(k * 3, HYBRID_FETCH_K)
+    bm25_ranking = [paper_id for paper_id, _ in _bm25.search(query, fetch_k, min_ratio=BM25_MIN_SCORE_RATIO)]
+    vector_ranking = []
+    try:
+        with _sync_lock:
+            _embed_pending()
+        vector_ranking = [doc.metadata.get("paper_id")
+                          for doc, score in _get_store().similarity_search_with_relevance_scores(query, k=fetch_k)
+                          if score >= LITERATURE_RELEVANCE_THRESHOLD]
+    except Exception as e:
+        logging.warning(f"⚠️ 向量检索不可用，只使用BM25: {e}")
+    fused = reciprocal_rank_fusion([bm25_ranking, vector_ranking])[:k]
+
+    papers = []
+    with _connect() as conn:
+        for paper_id, score in fused:
+            row = conn.execute("SELECT * FROM papers WHERE paper_id = ?", (paper_id,)).fetchone()
+            if row is not None:
+                papers.append(_row_to_paper(row, score))
+    MetricsUtil.inc("proposal_local_search_queries_total", {"hit": str(bool(papers)).lower()},
+                    help_text="本地混合检索次数")
+    logging.info(f"📚 本地混合检索 '{query}'：BM25候选 {len(bm25_ranking)} 篇，向量候选 {len(vector_ranking)} 篇，"
+                 f"返回 {len(papers)} 篇")
+    return papers
@@ -0,0 +1,241 @@
+"""
+长期记忆服务（Chroma向量库）
+- 进程内共享一个向量库实例，首次检索或写入时才导入chromadb并打开集合，路径为绝对路径，与启动目录无关
+- 查询向量按文本缓存（LRU），同一研究领域的重复检索不再调用嵌入接口
+- 写入进入后台队列，由写入线程攒批后一次嵌入并写入，工作流的最后一个节点无需等待嵌入完成；
+  进程退出或服务关闭时会先写完队列中的记录
+- 每份计划书按章节切成若干段分别嵌入（带研究领域、章节、日期、评审得分等元数据），
+  检索时在超过相关度阈值的片段中做MMR选取，只把少量相关片段放进规划prompt
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from ..utils.metrics_util import MetricsUtil, TOKEN_BUCKETS
+from ..utils.token_util import TokenUtil
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+# 默认使用项目根目录下的 vector_store（不纳入git），无论从哪个目录启动都读写同一个库；
+# 仓库自带的 chroma_db 受版本控制，运行时不写入，需要沿用其中的记忆时可设置 MEMORY_PERSIST_DIR=chroma_db
+MEMORY_PERSIST_DIR = os.path.abspath(os.environ.get("MEMORY_PERSIST_DIR", os.path.join(ROOT_DIR, "vector_store")))
+MEMORY_COLLECTION = "proposal_agent_memory"
+EMBEDDING_MODEL = "text-embedding-v4"
+# 缓存的查询向量个数
+QUERY_EMBEDDING_CACHE_SIZE = int(os.environ.get("MEMORY_QUERY_CACHE_SIZE", "256"))
+# 每批最多写入的记录数，以及收到第一条记录后等待凑批的时间（秒）
+MEMORY_WRITE_BATCH_SIZE = int(os.environ.get("MEMORY_WRITE_BATCH_SIZE", "32"))
+MEMORY_WRITE_BATCH_WAIT = float(os.environ.get("MEMORY_WRITE_BATCH_WAIT", "0.5"))
+# 记忆片段的最大字符数，以及每个章节最多保存的片段数（章节开头信息最集中，也限制了每份计划书的嵌入量）
+MEMORY_CHUNK_CHARS = int(os.environ.get("MEMORY_CHUNK_CHARS", "800"))
+MEMORY_MAX_CHUNKS_PER_SECTION = int(os.environ.get("MEMORY_MAX_CHUNKS_PER_SECTION", "3"))
+# 检索：候选片段数、返回片段数、相关度阈值（0~1）和MMR的相关性权重（越小越偏向多样性）
+MEMORY_FETCH_K = int(os.environ.get("MEMORY_FETCH_K", "20"))
+MEMORY_TOP_K = int(os.environ.get("MEMORY_TOP_K", "4"))
+MEMORY_RELEVANCE_THRESHOLD = float(os.environ.get("MEMORY_RELEVANCE_THRESHOLD", "0.4"))
+MEMORY_MMR_LAMBDA = float(os.environ.get("MEMORY_MMR_LAMBDA", "0.5"))
+
+
+class CachedQueryEmbeddings:
+    """包装嵌入模型：查询向量按文本做LRU缓存，文档向量直接透传（批量调用）"""
+
+    def __init__(self, embeddings, max_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                self.hits += 1
+                return vector
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self.misses += 1
+            self._cache[text] = vector
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return vector
+
+
+_embeddings = None
+_store = None
+_store_lock = threading.RLock()  # 打开集合时会在持锁状态下创建嵌入模型
+_write_queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def get_embeddings() -> CachedQueryEmbeddings:
+    """进程内共享的嵌入模型（带查询向量缓存），长期记忆和文献库共用"""
+    global _embeddings
+    if _embeddings is None:
+        with _store_lock:
+            if _embeddings is None:
+                from langchain_dashscope import DashScopeEmbeddings
+                _embeddings = CachedQueryEmbeddings(DashScopeEmbeddings(model=EMBEDDING_MODEL))
+    return _embeddings
+
+
+def open_collection(collection_name: str):
+    """在长期记忆目录下打开一个Chroma集合"""
+    from langchain_chroma import Chroma
+    logging.info(f"💾 打开向量库集合 {collection_name}: {MEMORY_PERSIST_DIR}")
+    return Chroma(
+        collection_name=collection_name,
+        embedding_function=get_embeddings(),
+        persist_directory=MEMORY_PERSIST_DIR,
+    )
+
+
+def get_memory_store():
+    """懒加载共享的向量库"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = open_collection(MEMORY_COLLECTION)
+    return _store
+
+
+def search_memory(query: str, k: int = MEMORY_TOP_K, fetch_k: int = MEMORY_FETCH_K,
+                  score_threshold: float = MEMORY_RELEVANCE_THRESHOLD, lambda_mult: float = MEMORY_MMR_LAMBDA) -> List:
+    """
+    检索与query相关的记忆片段（Document列表，metadata中附带relevance）
+    先取fetch_k个候选并按相关度阈值过滤，再用MMR从中选出至多k个互不重复的片段；
+    两次检索使用同一个查询向量（缓存命中），只调用一次嵌入接口
+    """
+    store = get_memory_store()
+    relevant = {doc.page_content: score
+                for doc, score in store.similarity_search_with_relevance_scores(query, k=fetch_k)
+                if score >= score_threshold}
+    if not relevant:
+        return []
+    selected = []
+    for doc in store.max_marginal_relevance_search(query, k=min(k, len(relevant)), fetch_k=fetch_k,
+                                                   lambda_mult=lambda_mult):
+        if doc.page_content in relevant:
+            doc.metadata = {**(doc.metadata or {}), "relevance": round(relevant[doc.page_content], 3)}
+            selected.append(doc)
+    return selected
+
+
+def build_memory_chunks(proposal_id: str, research_field: str, sections: Dict[str, str],
+                        metadata: Dict) -> Tuple[List[str], List[Dict], List[str]]:
+    """
+    把计划书各章节切成片段，返回 (texts, metadatas, ids)
+    片段在段落边界处切分，开头带上研究课题和章节名，使单个片段的向量也包含上下文
+    """
+    texts, metadatas, ids = [], [], []
+    for section, content in sections.items():
+        for index, chunk in enumerate(_split_paragraphs(content or "")[:MEMORY_MAX_CHUNKS_PER_SECTION]):
+            texts.append(f"研究课题: {research_field}\n章节: {section}\n{chunk}")
+            metadatas.append({**metadata, "proposal_id": proposal_id, "research_field": research_field,
+                              "section": section, "chunk": index})
+            ids.append(f"{proposal_id}:{section}:{index}")
+    return texts, metadatas, ids
+
+
+def _split_paragraphs(text: str, max_chars: int = MEMORY_CHUNK_CHARS) -> List[str]:
+    """按段落累积到max_chars为一段，超长的单个段落按字符硬切"""
+    chunks, current = [], ""
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def save_memory(texts: List[str], metadatas: List[Dict], ids: List[str]):
+    """提交记忆写入请求，立即返回；相同id的记录会被覆盖"""
+    _ensure_writer()
+    tokens = sum(TokenUtil.count_tokens(text) for text in texts)
+    MetricsUtil.observe("proposal_memory_embedding_tokens", tokens, buckets=TOKEN_BUCKETS,
+                        help_text="每次保存长期记忆需要嵌入的token数")
+    logging.info(f"💾 提交长期记忆 {len(texts)} 个片段，共 {sum(len(text) for text in texts)} 字符，约 {tokens} token")
+    for text, metadata, record_id in zip(texts, metadatas, ids):
+        _write_queue.put({"text": text, "metadata": metadata, "id": record_id})
+
+
+def flush_memory(timeout: float = 60) -> bool:
+    """等待队列中的记忆全部写入，超时返回False"""
+    if _writer_thread is None:
+        return True
+    deadline = time.time() + timeout
+    while _write_queue.unfinished_tasks:
+        if time.time() > deadline:
+            logging.warning(f"⚠️ 等待长期记忆写入超时，仍有 {_write_queue.unfinished_tasks} 条未写入")
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _ensure_writer():
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_write_loop, name="memory-writer", daemon=True)
+            _writer_thread.start()
+            atexit.register(flush_memory)
+
+
+def _next_batch() -> List[Dict]:
+    """阻塞等待第一条记录，再在等待窗口内凑满一批"""
+    batch = [_write_queue.get()]
+    deadline = time.time() + MEMORY_WRITE_BATCH_WAIT
+    while len(batch) < MEMORY_WRITE_BATCH_SIZE:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_write_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write_loop():
+    while True:
+        batch = _next_batch()
+        # 同一批中id重复时只保留最后一条
+        records = list({record["id"]: record for record in batch}.values())
+        start_time = time.time()
+        try:
+            get_memory_store().add_texts(
+                texts=[record["text"] for record in records],
+                metadatas=[record["metadata"] for record in records],
+                ids=[record["id"] for record in records],
+            )
+            duration = time.time() - start_time
+            MetricsUtil.observe("proposal_memory_write_duration_seconds", duration,
+                                help_text="长期记忆每批嵌入并写入的耗时")
+            MetricsUtil.inc("proposal_memory_chunks_total", value=len(records), help_text="写入长期记忆的片段数")
+            logging.info(f"✅ 已写入长期记忆 {len(records)} 个片段，耗时 {duration:.2f}s")
+        except Exception as e:
+            logging.error(f"❌ 写入长期记忆失败（{len(records)} 条）: {e}")
+        finally:
+            for _ in batch:
+                _write_queue.task_done()
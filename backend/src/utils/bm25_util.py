@@ -0,0 +1,124 @@
+"""
+BM25倒排索引
+- 分词：英文/数字按词切分并转小写（连字符复合词另外拆出各部分），中日韩文字按连续片段切成二元组（单字片段保留单字），无需中文分词词典
+- 倒排表为 词 -> {文档序号: 词频}，支持增量添加和按键替换文档；idf和平均文档长度在查询时计算
+- 查询可指定最低得分比例：得分除以查询各词idf × (k1 + 1)之和（单文档得分的上界），用于过滤只命中个别常见词的文档
+- 提供倒数排名融合（RRF），用于把BM25与向量检索的排序合并
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:[._-][a-z0-9]+)*|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+')
+_CJK_START = '\u3040'
+# 不参与检索的高频英文词
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to with we our via using based".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按词、中文按二元组切分"""
+    tokens = []
+    for piece in _TOKEN_PATTERN.findall(text.lower()):
+        if piece[0] < _CJK_START:
+            if piece not in STOP_WORDS:
+                tokens.append(piece)
+            if '-' in piece:
+                # 连字符复合词同时按各部分索引，"retrieval-augmented" 也能被 "retrieval augmented" 命中
+                tokens.extend(part for part in piece.split('-') if part and part not in STOP_WORDS)
+        elif len(piece) == 1:
+            tokens.append(piece)
+        else:
+            tokens.extend(piece[i:i + 2] for i in range(len(piece) - 1))
+    return tokens
+
+
+class Bm25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_keys: List[Optional[str]] = []  # 文档序号 -> 键，被替换的文档为None
+        self.doc_lengths: List[int] = []
+        self.doc_terms: List[Tuple[str, ...]] = []
+        self.positions: Dict[str, int] = {}  # 键 -> 当前文档序号
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add(self, key: str, text: str):
+        """添加文档，键已存在时替换旧文档"""
+        self.remove(key)
+        counts = Counter(tokenize(text))
+        position = len(self.doc_keys)
+        for term, tf in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                self.postings[term] = {position: tf}
+            else:
+                postings[position] = tf
+        length = sum(counts.values())
+        self.doc_keys.append(key)
+        self.doc_lengths.append(length)
+        self.doc_terms.append(tuple(counts))
+        self.positions[key] = position
+        self.total_length += length
+
+    def remove(self, key: str):
+        position = self.positions.pop(key, None)
+        if position is None:
+            return
+        for term in self.doc_terms[position]:
+            postings = self.postings[term]
+            del postings[position]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths[position]
+        self.doc_keys[position] = None
+        self.doc_terms[position] = ()
+
+    def search(self, query: str, k: int = 10, min_ratio: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        返回得分最高的k个 (键, BM25得分)
+        :param min_ratio: 得分占上界的最低比例，查询词在语料中不存在时也计入上界，库中没有相关文档时返回空
+        """
+        doc_count = len(self.positions)
+        if not doc_count:
+            return []
+        k1, b = self.k1, self.b
+        average_length = self.total_length / doc_count or 1
+        doc_lengths = self.doc_lengths
+        base = k1 * (1 - b)
+        length_factor = k1 * b / average_length
+        scores: Dict[int, float] = {}
+        get_score = scores.get
+        upper_bound = 0.0
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term) or {}
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            # tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+            weight = idf * (k1 + 1)
+            upper_bound += weight
+            for position, tf in postings.items():
+                scores[position] = get_score(position, 0.0) + \
+                    weight * tf / (tf + base + length_factor * doc_lengths[position])
+        if min_ratio > 0:
+            floor = min_ratio * upper_bound
+            scores = {position: score for position, score in scores.items() if score >= floor}
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_keys[position], score) for position, score in top]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """倒数排名融合：每个排序中第r名（从1开始）贡献 weight / (k + r)，按融合得分降序返回"""
+    scores: Dict[str, float] = {}
+    for index, ranking in enumerate(rankings):
+        weight = weights[index] if weights else 1.0
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
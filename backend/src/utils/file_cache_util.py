@@ -0,0 +1,66 @@
+"""
+磁盘缓存目录的淘汰（PDF缓存、辅助文件种子、Mermaid图片等按内容哈希命名的文件）
+- 以修改时间作为最近使用时间：命中缓存时用 touch 刷新，常用的条目不会被淘汰
+- prune：删除超过最长保留时间的文件；总大小仍超过上限时从最久未用的文件开始删除
+"""
+import logging
+import os
+import time
+from typing import Optional
+
+# 缓存目录的默认大小上限和最长保留时间
+FILE_CACHE_MAX_BYTES = int(os.environ.get("FILE_CACHE_MAX_MB", "200")) * 1024 * 1024
+FILE_CACHE_MAX_AGE = int(os.environ.get("FILE_CACHE_MAX_AGE_DAYS", "30")) * 86400
+# 写入中的临时文件（*.tmp）超过该时间仍未被替换，视为进程异常退出留下的残留
+_STALE_TEMP_AGE = 3600
+
+
+class FileCacheUtil:
+    @staticmethod
+    def touch(path: str):
+        """命中缓存时刷新修改时间"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def prune(cache_dir: str, max_bytes: Optional[int] = None, max_age: Optional[int] = None) -> int:
+        """按保留时间和总大小淘汰缓存目录中的文件（不递归），返回删除的文件数"""
+        max_bytes = FILE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        max_age = FILE_CACHE_MAX_AGE if max_age is None else max_age
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(cache_dir) as iterator:
+                for entry in iterator:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return 0
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        # 最久未用的在前
+        for mtime, size, path in sorted(entries):
+            age = now - mtime
+            if path.endswith(".tmp"):
+                expired = age > _STALE_TEMP_AGE
+            else:
+                expired = age > max_age or total > max_bytes
+            if not expired:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logging.info(f"🧹 缓存目录 {cache_dir} 淘汰 {removed} 个文件，剩余 {total / 1024 / 1024:.1f}MB")
+        return removed
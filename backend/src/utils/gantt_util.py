@@ -0,0 +1,372 @@
+"""
+Mermaid甘特图到pgfgantt的转换
+覆盖generate_gantt_chart_tool生成的语法子集（dateFormat YYYY-MM-DD、title、section、任务的done/active/crit/milestone状态、
+起止日期、天/周时长、after依赖），直接输出xelatex可编译的TikZ代码，无需Node、mermaid-cli和无头浏览器；
+遇到子集之外的写法时抛出 GanttParseError，由调用方退回mmdc渲染；
+同时负责校验LLM生成的结构化排期（JSON），按字段路径报告错误，并从排期生成mermaid代码
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .md_latex_util import MdLatexUtil
+
+_MERMAID_BLOCK_PATTERN = re.compile(r"```mermaid\s*\n(.*?)```", re.DOTALL)
+_DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*([dw])$")
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{1,2}-\d{1,2}$")
+_STATUS_TAGS = ("done", "active", "crit", "milestone")
+# 只影响mermaid自身显示、与排期无关的指令
+_IGNORED_DIRECTIVES = ("axisFormat", "tickInterval", "todayMarker", "weekday", "displayMode")
+_PATH_TOKEN_PATTERN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+# 结构化排期中任务状态的取值（空字符串表示未开始）
+SCHEDULE_STATUSES = ("done", "active", "crit", "milestone", "")
+MAX_TASK_DURATION_DAYS = 1500
+
+# 甘特图条形区域的总宽度（cm），按总天数折算每天的宽度
+CHART_WIDTH_CM = 9.0
+BAR_STYLES = {
+    "done": "fill=gray!40",
+    "active": "fill=blue!45",
+    "crit": "fill=red!45",
+    "": "fill=blue!15",
+}
+
+
+class GanttParseError(ValueError):
+    """甘特图使用了不支持的语法"""
+
+
+@dataclass
+class GanttTask:
+    name: str
+    start: date
+    end: date  # 不含当天，与mermaid一致
+    status: str = ""
+    milestone: bool = False
+    task_id: Optional[str] = None
+
+
+@dataclass
+class GanttSection:
+    name: str
+    tasks: List[GanttTask] = field(default_factory=list)
+
+
+@dataclass
+class GanttChart:
+    title: str = ""
+    sections: List[GanttSection] = field(default_factory=list)
+
+    @property
+    def tasks(self) -> List[GanttTask]:
+        return [task for section in self.sections for task in section.tasks]
+
+
+class GanttUtil:
+    @staticmethod
+    def _parse_date(text: str) -> date:
+        if not _DATE_PATTERN.match(text):
+            raise GanttParseError(f"不支持的日期: {text}")
+        try:
+            return datetime.strptime(text, "%Y-%m-%d").date()
+        except ValueError as e:
+            raise GanttParseError(f"无效的日期: {text}") from e
+
+    @classmethod
+    def _parse_start(cls, text: str, tasks_by_id: Dict[str, GanttTask]) -> date:
+        if text.startswith("after "):
+            ids = text[len("after "):].split()
+            if not ids or any(task_id not in tasks_by_id for task_id in ids):
+                raise GanttParseError(f"找不到依赖的任务: {text}")
+            return max(tasks_by_id[task_id].end for task_id in ids)
+        return cls._parse_date(text)
+
+    @classmethod
+    def _parse_end(cls, text: str, start: date) -> date:
+        match = _DURATION_PATTERN.match(text)
+        if match:
+            days = float(match.group(1)) * (7 if match.group(2) == "w" else 1)
+            return start + timedelta(days=max(round(days), 0))
+        end = cls._parse_date(text)
+        if end < start:
+            raise GanttParseError(f"结束日期早于开始日期: {text}")
+        return end
+
+    @classmethod
+    def parse(cls, code: str) -> GanttChart:
+        """解析mermaid甘特图代码"""
+        lines = [line.strip() for line in code.strip().splitlines()]
+        lines = [line for line in lines if line and not line.startswith("%%")]
+        if not lines or lines[0] != "gantt":
+            raise GanttParseError("不是甘特图")
+
+        chart = GanttChart()
+        tasks_by_id: Dict[str, GanttTask] = {}
+        previous: Optional[GanttTask] = None
+        for line in lines[1:]:
+            keyword, _, rest = line.partition(" ")
+            rest = rest.strip()
+            if keyword == "dateFormat":
+                if rest != "YYYY-MM-DD":
+                    raise GanttParseError(f"不支持的日期格式: {rest}")
+                continue
+            if keyword == "title":
+                chart.title = rest
+                continue
+            if keyword == "section":
+                chart.sections.append(GanttSection(rest))
+                continue
+            if keyword in _IGNORED_DIRECTIVES:
+                continue
+            if ":" not in line:
+                # excludes、click等会改变排期或无法静态表示的写法交给mmdc
+                raise GanttParseError(f"不支持的语句: {line}")
+
+            name, _, metadata = line.partition(":")
+            tokens = [token.strip() for token in metadata.split(",") if token.strip()]
+            tags = []
+            while tokens and tokens[0] in _STATUS_TAGS:
+                tags.append(tokens.pop(0))
+
+            task_id = None
+            if len(tokens) == 3:
+                task_id = tokens.pop(0)
+            if len(tokens) == 2:
+                start = cls._parse_start(tokens[0], tasks_by_id)
+                end_text = tokens[1]
+            elif len(tokens) == 1:
+                # 只有时长（或结束日期）时紧接上一个任务
+                if previous is None:
+                    raise GanttParseError(f"第一个任务缺少开始日期: {line}")
+                start = previous.end
+                end_text = tokens[0]
+            else:
+                raise GanttParseError(f"无法解析的任务: {line}")
+
+            status = next((tag for tag in ("crit", "active", "done") if tag in tags), "")
+            task = GanttTask(name.strip(), start, cls._parse_end(end_text, start), status,
+                             "milestone" in tags, task_id)
+            if not chart.sections:
+                chart.sections.append(GanttSection(""))
+            chart.sections[-1].tasks.append(task)
+            if task_id:
+                tasks_by_id[task_id] = task
+            previous = task
+
+        if not chart.tasks:
+            raise GanttParseError("甘特图中没有任务")
+        return chart
+
+    @staticmethod
+    def _last_day(task: GanttTask) -> date:
+        """pgfgantt的结束日期包含当天"""
+        return max(task.start, task.end - timedelta(days=1))
+
+    @classmethod
+    def to_pgfgantt(cls, chart: GanttChart) -> str:
+        """生成ganttchart环境"""
+        tasks = chart.tasks
+        chart_start = min(task.start for task in tasks)
+        chart_end = max(cls._last_day(task) for task in tasks)
+        total_days = (chart_end - chart_start).days + 1
+        x_unit = CHART_WIDTH_CM / total_days
+        calendar = "year, month" if total_days <= 730 else "year"
+
+        rows = [f"\\gantttitlecalendar{{{calendar}}}"]
+        for section in chart.sections:
+            if not section.tasks:
+                continue
+            if section.name:
+                section_start = min(task.start for task in section.tasks)
+                section_end = max(cls._last_day(task) for task in section.tasks)
+                rows.append(f"\\ganttgroup{{{MdLatexUtil.escape(section.name)}}}"
+                            f"{{{section_start.isoformat()}}}{{{section_end.isoformat()}}}")
+            for task in section.tasks:
+                label = MdLatexUtil.escape(task.name)
+                if task.milestone:
+                    rows.append(f"\\ganttmilestone{{{label}}}{{{task.start.isoformat()}}}")
+                else:
+                    rows.append(f"\\ganttbar[bar/.append style={{{BAR_STYLES[task.status]}}}]{{{label}}}"
+                                f"{{{task.start.isoformat()}}}{{{cls._last_day(task).isoformat()}}}")
+
+        return (
+            "\\begin{ganttchart}[\n"
+            "    time slot format=isodate,\n"
+            f"    x unit={x_unit:.4f}cm,\n"
+            "    y unit chart=0.55cm,\n"
+            "    y unit title=0.5cm,\n"
+            "    title label font=\\scriptsize,\n"
+            "    bar label font=\\small,\n"
+            "    group label font=\\small\\bfseries,\n"
+            "    milestone label font=\\small\\itshape,\n"
+            "    bar height=0.6,\n"
+            "    group/.append style={fill=black!70},\n"
+            "    canvas/.append style={draw=black!30}\n"
+            f"]{{{chart_start.isoformat()}}}{{{chart_end.isoformat()}}}\n"
+            + " \\\\\n".join(rows) + "\n"
+            "\\end{ganttchart}"
+        )
+
+    @classmethod
+    def to_figure(cls, chart: GanttChart, caption: str = "项目时间规划甘特图", label: str = "fig:gantt") -> str:
+        """生成包含甘特图的figure环境，宽度超出版心时整体缩放"""
+        return (
+            f"\n\n\\begin{{figure}}[htbp]\n"
+            f"\\centering\n"
+            f"\\resizebox{{\\ifdim\\width>\\textwidth\\textwidth\\else\\width\\fi}}{{!}}{{%\n"
+            f"{cls.to_pgfgantt(chart)}%\n"
+            f"}}\n"
+            f"\\caption{{{caption}}}\n"
+            f"\\label{{{label}}}\n"
+            f"\\end{{figure}}\n\n"
+        )
+
+    @classmethod
+    def find_first_chart(cls, markdown_content: str) -> Optional[GanttChart]:
+        """返回Markdown中第一个mermaid代码块解析出的甘特图，第一个图表不是支持的甘特图时返回None"""
+        match = _MERMAID_BLOCK_PATTERN.search(markdown_content)
+        if not match:
+            return None
+        try:
+            return cls.parse(match.group(1))
+        except GanttParseError:
+            return None
+
+    @classmethod
+    def from_schedule(cls, schedule: Any) -> Tuple[Optional[GanttChart], Dict[str, str]]:
+        """
+        校验结构化排期并构建甘特图
+        排期格式: {"title": str, "phases": [{"name": str, "tasks": [{"name": str, "start": "YYYY-MM-DD"或空（紧接上一个任务）,
+                  "duration_days": int, "status": "done|active|crit|milestone|"}]}]}
+        :return: (由合法任务构成的甘特图，没有合法任务时为None, {字段路径: 错误说明})
+        """
+        errors: Dict[str, str] = {}
+        if not isinstance(schedule, dict):
+            return None, {"": "排期必须是JSON对象"}
+        phases = schedule.get("phases")
+        if not isinstance(phases, list) or not phases:
+            return None, {"phases": "必须是非空数组"}
+
+        chart = GanttChart(title=str(schedule.get("title") or "").strip())
+        previous: Optional[GanttTask] = None
+        for i, phase in enumerate(phases):
+            path = f"phases[{i}]"
+            if not isinstance(phase, dict):
+                errors[path] = "必须是包含name和tasks的对象"
+                continue
+            name = phase.get("name")
+            if not isinstance(name, str) or not name.strip():
+                errors[f"{path}.name"] = "必须是非空字符串"
+                continue
+            tasks = phase.get("tasks")
+            if not isinstance(tasks, list) or not tasks:
+                errors[f"{path}.tasks"] = "必须是非空数组"
+                continue
+            section = GanttSection(name.strip())
+            for j, task in enumerate(tasks):
+                task_path = f"{path}.tasks[{j}]"
+                parsed, task_errors = cls._task_from_schedule(task, task_path, previous)
+                errors.update(task_errors)
+                if parsed is not None:
+                    section.tasks.append(parsed)
+                    previous = parsed
+            if section.tasks:
+                chart.sections.append(section)
+
+        return (chart if chart.tasks else None), errors
+
+    @classmethod
+    def _task_from_schedule(cls, task: Any, path: str,
+                            previous: Optional[GanttTask]) -> Tuple[Optional[GanttTask], Dict[str, str]]:
+        if not isinstance(task, dict):
+            return None, {path: "必须是包含name、start、duration_days的对象"}
+        errors = {}
+        name = task.get("name")
+        if not isinstance(name, str) or not name.strip():
+            errors[f"{path}.name"] = "必须是非空字符串"
+
+        start = None
+        start_text = task.get("start")
+        if start_text in (None, ""):
+            if previous is None:
+                errors[f"{path}.start"] = "第一个任务必须给出开始日期（YYYY-MM-DD）"
+            else:
+                start = previous.end
+        else:
+            try:
+                start = cls._parse_date(str(start_text).strip())
+            except GanttParseError:
+                errors[f"{path}.start"] = f"必须是YYYY-MM-DD格式的有效日期，当前为 {start_text!r}"
+
+        duration = task.get("duration_days")
+        if isinstance(duration, str) and duration.strip().isdigit():
+            duration = int(duration.strip())
+        if isinstance(duration, bool) or not isinstance(duration, int) or not 0 <= duration <= MAX_TASK_DURATION_DAYS:
+            errors[f"{path}.duration_days"] = f"必须是0到{MAX_TASK_DURATION_DAYS}之间的整数天数，当前为 {duration!r}"
+
+        status = str(task.get("status") or "").strip().lower()
+        if status not in SCHEDULE_STATUSES:
+            errors[f"{path}.status"] = f"必须是 done、active、crit、milestone 或空字符串，当前为 {status!r}"
+
+        if errors:
+            return None, errors
+        return GanttTask(name.strip(), start, start + timedelta(days=duration),
+                         "" if status == "milestone" else status, status == "milestone"), {}
+
+    @staticmethod
+    def set_path(data: Any, path: str, value: Any) -> bool:
+        """按字段路径（如 phases[0].tasks[1].start）写入修正后的值，路径无效时返回False"""
+        tokens = [key if key else int(index) for key, index in _PATH_TOKEN_PATTERN.findall(path)]
+        if not tokens:
+            return False
+        target = data
+        for token in tokens[:-1]:
+            try:
+                target = target[token]
+            except (KeyError, IndexError, TypeError):
+                return False
+        last = tokens[-1]
+        if isinstance(last, int):
+            if not isinstance(target, list) or last >= len(target):
+                return False
+        elif not isinstance(target, dict):
+            return False
+        target[last] = value
+        return True
+
+    @staticmethod
+    def _mermaid_text(text: str) -> str:
+        """冒号、逗号和换行在mermaid任务行中有语法含义"""
+        return re.sub(r"\s+", " ", text.replace(":", "：").replace(",", "，").replace(";", "；")).strip()
+
+    @classmethod
+    def to_mermaid(cls, chart: GanttChart) -> str:
+        """生成mermaid甘特图代码（与 parse 支持的子集一致）"""
+        lines = ["gantt", "    dateFormat  YYYY-MM-DD"]
+        if chart.title:
+            lines.append(f"    title       {cls._mermaid_text(chart.title)}")
+        for section in chart.sections:
+            if section.name:
+                lines.append(f"    section {cls._mermaid_text(section.name)}")
+            for task in section.tasks:
+                tags = [tag for tag in (task.status, "milestone" if task.milestone else "") if tag]
+                metadata = ", ".join(tags + [task.start.isoformat(), f"{(task.end - task.start).days}d"])
+                lines.append(f"    {cls._mermaid_text(task.name)}    :{metadata}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def to_schedule(chart: GanttChart) -> Dict:
+        """把甘特图转换回结构化排期"""
+        return {
+            "title": chart.title,
+            "phases": [{
+                "name": section.name,
+                "tasks": [{
+                    "name": task.name,
+                    "start": task.start.isoformat(),
+                    "duration_days": (task.end - task.start).days,
+                    "status": "milestone" if task.milestone else task.status,
+                } for task in section.tasks],
+            } for section in chart.sections],
+        }
@@ -0,0 +1,140 @@
+"""
+大模型JSON输出的流式解析和校验
+- JsonStreamParser 随流式输出逐块扫描（跳过代码块标记和说明文字），顶层对象闭合后即可停止接收；
+  输出被截断时回退到最近一个完整的元素并补齐括号，尽量保留已生成的字段
+- JsonStreamUtil 按简单的字段模式校验结果，列出缺失或类型不符的字段，供调用方只补问这些字段
+模式写法：{"字段": 类型或嵌套模式}，类型为 list / str / dict / NUMBER
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+NUMBER = (int, float)
+
+_UNQUOTED_KEY_PATTERN = re.compile(r'([{,])\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:')
+_TRAILING_COMMA_PATTERN = re.compile(r',\s*([}\]])')
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class JsonStreamParser:
+    def __init__(self):
+        self.buffer = ""
+        self.complete = False  # 顶层对象是否已闭合
+        self._position = 0
+        self._start = -1
+        self._end = -1
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # 截断时可回退的位置：(缓冲区位置, 当时未闭合的括号)
+        self._checkpoints: List[Tuple[int, str]] = []
+
+    def feed(self, chunk: str) -> bool:
+        """追加一段输出，返回顶层对象是否已闭合（闭合后的内容会被忽略）"""
+        if self.complete:
+            return True
+        self.buffer += chunk
+        buffer = self.buffer
+        for position in range(self._position, len(buffer)):
+            char = buffer[position]
+            if self._start < 0:
+                if char == '{':
+                    self._start = position
+                    self._stack.append('{')
+                    self._checkpoints.append((position + 1, '{'))
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+                self._checkpoints.append((position + 1, ''.join(self._stack)))
+            elif char in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._end = position + 1
+                    self.complete = True
+                    self._position = position + 1
+                    return True
+                self._checkpoints.append((position + 1, ''.join(self._stack)))
+            elif char == ',':
+                self._checkpoints.append((position, ''.join(self._stack)))
+        self._position = len(buffer)
+        return False
+
+    def result(self) -> Optional[Dict]:
+        """解析已接收的内容；未闭合时补齐括号，失败则逐个回退到更早的完整位置，都失败时返回None"""
+        if self._start < 0:
+            return None
+        if self.complete:
+            return self._loads(self.buffer[self._start:self._end])
+        candidates = [(len(self.buffer), ''.join(self._stack), self._in_string)]
+        candidates += [(position, stack, False) for position, stack in reversed(self._checkpoints)]
+        for position, stack, in_string in candidates:
+            text = self.buffer[self._start:position] + ('"' if in_string else '')
+            text = text.rstrip().rstrip(',')
+            data = self._loads(text + ''.join(_CLOSERS[bracket] for bracket in reversed(stack)))
+            if data is not None:
+                return data
+        return None
+
+    @staticmethod
+    def _loads(text: str) -> Optional[Dict]:
+        for candidate in (text, _TRAILING_COMMA_PATTERN.sub(r'\1', _UNQUOTED_KEY_PATTERN.sub(r'\1"\2":', text))):
+            try:
+                data = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            return data if isinstance(data, dict) else None
+        return None
+
+
+class JsonStreamUtil:
+    @staticmethod
+    def parse(chunks: Iterable[str]) -> Tuple[Optional[Dict], str]:
+        """消费输出块直到顶层对象闭合，返回解析结果和已接收的原文"""
+        parser = JsonStreamParser()
+        for chunk in chunks:
+            if parser.feed(chunk):
+                break
+        return parser.result(), parser.buffer
+
+    @classmethod
+    def find_missing(cls, data: Dict, schema: Dict, prefix: str = "") -> List[str]:
+        """返回缺失或类型不符的字段路径（如 scores.可行性），可转换为数值的字符串会被就地转换"""
+        missing = []
+        for key, expected in schema.items():
+            path = f"{prefix}{key}"
+            value = data.get(key)
+            if isinstance(expected, dict):
+                if isinstance(value, dict):
+                    missing += cls.find_missing(value, expected, f"{path}.")
+                else:
+                    missing += [f"{path}.{sub_key}" for sub_key in expected] if expected else [path]
+                continue
+            if expected is NUMBER and isinstance(value, str):
+                try:
+                    value = data[key] = float(value.strip().split('/')[0])
+                except ValueError:
+                    pass
+            if value is None or not isinstance(value, expected) or (expected is NUMBER and isinstance(value, bool)):
+                missing.append(path)
+        return missing
+
+    @classmethod
+    def merge(cls, data: Dict, patch: Dict) -> Dict:
+        """把补充的字段深度合并进已有结果"""
+        for key, value in patch.items():
+            if isinstance(value, dict) and isinstance(data.get(key), dict):
+                cls.merge(data[key], value)
+            else:
+                data[key] = value
+        return data
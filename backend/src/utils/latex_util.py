@@ -0,0 +1,199 @@
+"""
+xelatex编译工具
+- 静态资源（文档类、Logo）通过TEXINPUTS直接从exporter目录查找，不再每次导出都复制到输出目录
+- 类似latexmk的收敛检测：沿用上次编译留下的.aux/.toc/.out作为种子，只有辅助文件变化时才再编译一遍
+- 每次编译在独立的临时构建目录中进行（子进程显式指定cwd，不切换进程工作目录），并发编译数不超过CPU核数；
+  导出进程池通过 use_compile_slots 传入跨进程信号量，限制对所有工作进程生效
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from .file_cache_util import FileCacheUtil
+
+# 影响下一遍编译结果的辅助文件
+AUX_EXTENSIONS = (".aux", ".toc", ".out")
+# 最多编译遍数，超过仍未收敛时使用最后一遍的结果
+MAX_PASSES = int(os.environ.get("LATEX_MAX_PASSES", "3"))
+COMPILE_TIMEOUT = int(os.environ.get("LATEX_COMPILE_TIMEOUT", "120"))
+# 同时运行的xelatex编译数上限，默认与CPU核数一致
+COMPILE_WORKERS = int(os.environ.get("LATEX_COMPILE_WORKERS", str(os.cpu_count() or 2)))
+
+_RERUN_PATTERN = re.compile(r"Rerun to get|Label\(s\) may have changed")
+_INCLUDEGRAPHICS_PATTERN = re.compile(r"\\includegraphics\s*(?:\[[^\]]*\])?\s*\{([^}]+)\}")
+
+# 默认只在本进程内限流；导出进程池的各工作进程共用同一个跨进程信号量
+_compile_slots = threading.BoundedSemaphore(COMPILE_WORKERS)
+
+
+@dataclass
+class LatexCompileResult:
+    success: bool
+    passes: int = 0
+    error: str = ""
+
+
+@lru_cache(maxsize=1)
+def _xelatex_version() -> Optional[str]:
+    """xelatex版本，不可用时返回None"""
+    try:
+        result = subprocess.run(["xelatex", "--version"], capture_output=True, text=True, check=True)
+        return result.stdout.splitlines()[0] if result.stdout else "unknown"
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+class LatexUtil:
+    @staticmethod
+    def is_available() -> bool:
+        return _xelatex_version() is not None
+
+    @staticmethod
+    def use_compile_slots(slots):
+        """替换编译并发限制，如导出进程池初始化时传入的 multiprocessing 信号量"""
+        global _compile_slots
+        _compile_slots = slots
+
+    @staticmethod
+    def build_env(asset_dir: str) -> Dict[str, str]:
+        """
+        编译环境：把资源目录加入TEXINPUTS（末尾的分隔符保留系统默认路径），
+        \\IfFileExists{figures/Logo.png} 等相对路径也会在该目录下查找
+        """
+        env = os.environ.copy()
+        env["TEXINPUTS"] = f"{os.path.abspath(asset_dir)}{os.pathsep}{env.get('TEXINPUTS', '')}"
+        return env
+
+    @staticmethod
+    def _aux_digest(build_dir: str, jobname: str) -> str:
+        digest = hashlib.sha256()
+        for ext in AUX_EXTENSIONS:
+            path = os.path.join(build_dir, f"{jobname}{ext}")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest.update(ext.encode("ascii") + f.read())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _copy_aux(src_dir: str, dst_dir: str, jobname: str):
+        """复制辅助文件；先写同目录的临时文件再原子替换，并发编译不会读到写了一半的种子"""
+        os.makedirs(dst_dir, exist_ok=True)
+        for ext in AUX_EXTENSIONS:
+            src = os.path.join(src_dir, f"{jobname}{ext}")
+            if os.path.exists(src):
+                dst = os.path.join(dst_dir, f"{jobname}{ext}")
+                temp_path = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+                shutil.copyfile(src, temp_path)
+                os.replace(temp_path, dst)
+
+    @classmethod
+    def compile(cls, tex_path: str, asset_dir: str, cache_dir: str,
+                on_pass: Optional[Callable[[int], None]] = None) -> LatexCompileResult:
+        """
+        在tex文件所在目录编译PDF（子进程显式指定cwd），并发调用请使用 compile_isolated
+        :param tex_path: tex文件路径
+        :param asset_dir: 文档类、Logo等静态资源所在目录
+        :param cache_dir: 辅助文件种子的缓存目录
+        :param on_pass: 每遍编译开始前的回调，参数为遍数（从1开始）
+        """
+        if not cls.is_available():
+            return LatexCompileResult(False, error="未找到xelatex命令，请确保已安装LaTeX环境")
+
+        build_dir = os.path.dirname(os.path.abspath(tex_path))
+        tex_basename = os.path.basename(tex_path)
+        jobname = os.path.splitext(tex_basename)[0]
+        seed_dir = os.path.join(cache_dir, "aux")
+        env = cls.build_env(asset_dir)
+        command = ["xelatex", "-interaction=nonstopmode", "-halt-on-error", tex_basename]
+
+        # 构建目录中没有辅助文件时，用上次同名文档的辅助文件作为种子
+        if not any(os.path.exists(os.path.join(build_dir, f"{jobname}{ext}")) for ext in AUX_EXTENSIONS):
+            cls._copy_aux(seed_dir, build_dir, jobname)
+
+        passes = 0
+        while passes < MAX_PASSES:
+            passes += 1
+            if on_pass:
+                on_pass(passes)
+            before = cls._aux_digest(build_dir, jobname)
+            result = subprocess.run(command, cwd=build_dir, env=env, capture_output=True, text=True,
+                                    timeout=COMPILE_TIMEOUT)
+            if result.returncode != 0:
+                log_tail = ""
+                log_path = os.path.join(build_dir, f"{jobname}.log")
+                if os.path.exists(log_path):
+                    with open(log_path, "r", encoding="utf-8", errors="ignore") as f:
+                        log_tail = f.read()[-2000:]
+                return LatexCompileResult(False, passes,
+                                          f"第{passes}次xelatex编译失败:\n标准输出: {result.stdout[-2000:]}\n"
+                                          f"错误输出: {result.stderr}\nLog文件内容:\n{log_tail}")
+            if cls._aux_digest(build_dir, jobname) == before and not _RERUN_PATTERN.search(result.stdout):
+                break
+        else:
+            logging.warning(f"⚠️ {jobname} 编译{MAX_PASSES}遍后辅助文件仍在变化，使用最后一遍的结果")
+
+        cls._copy_aux(build_dir, seed_dir, jobname)
+        FileCacheUtil.prune(seed_dir)
+        logging.info(f"✓ xelatex编译完成: {jobname}，共{passes}遍")
+        return LatexCompileResult(True, passes)
+
+    @staticmethod
+    def referenced_files(tex_content: str, source_dir: str) -> List[str]:
+        """tex中通过 \\includegraphics 引用、且位于源目录下的文件（相对路径）"""
+        files = []
+        for match in _INCLUDEGRAPHICS_PATTERN.finditer(tex_content):
+            relative = os.path.normpath(match.group(1).strip())
+            if os.path.isabs(relative) or relative.startswith(os.pardir):
+                continue
+            if os.path.isfile(os.path.join(source_dir, relative)) and relative not in files:
+                files.append(relative)
+        return files
+
+    @classmethod
+    def compile_isolated(cls, tex_path: str, asset_dir: str, cache_dir: str,
+                         on_pass: Optional[Callable[[int], None]] = None) -> LatexCompileResult:
+        """
+        在独立的临时构建目录中编译tex文件，成功后把PDF原子地放回tex所在目录
+        构建目录只包含tex和它引用的插图，静态资源经TEXINPUTS读取，多个导出可以安全地并发编译；
+        失败时把.log复制回tex所在目录便于排查
+        """
+        source_dir = os.path.dirname(os.path.abspath(tex_path))
+        tex_basename = os.path.basename(tex_path)
+        jobname = os.path.splitext(tex_basename)[0]
+        with open(tex_path, "r", encoding="utf-8") as f:
+            tex_content = f.read()
+
+        with _compile_slots:
+            with tempfile.TemporaryDirectory(prefix=f"latex_{jobname}_") as build_dir:
+                with open(os.path.join(build_dir, tex_basename), "w", encoding="utf-8") as f:
+                    f.write(tex_content)
+                for relative in cls.referenced_files(tex_content, source_dir):
+                    target = os.path.join(build_dir, relative)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copy2(os.path.join(source_dir, relative), target)
+
+                result = cls.compile(os.path.join(build_dir, tex_basename), asset_dir, cache_dir,
+                                     on_pass=on_pass)
+
+                built_pdf = os.path.join(build_dir, f"{jobname}.pdf")
+                if result.success and os.path.exists(built_pdf):
+                    # 临时目录可能与输出目录不在同一文件系统，先复制到输出目录再原子替换
+                    pdf_path = os.path.join(source_dir, f"{jobname}.pdf")
+                    temp_path = f"{pdf_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    shutil.copyfile(built_pdf, temp_path)
+                    os.replace(temp_path, pdf_path)
+                elif result.success:
+                    result = LatexCompileResult(False, result.passes, "PDF文件未能生成")
+                else:
+                    build_log = os.path.join(build_dir, f"{jobname}.log")
+                    if os.path.exists(build_log):
+                        shutil.copyfile(build_log, os.path.join(source_dir, f"{jobname}.log"))
+        return result
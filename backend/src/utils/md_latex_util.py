@@ -0,0 +1,382 @@
+"""
+Markdown到LaTeX的确定性转换
+先把Markdown解析为块级语法树（标题、段落、列表、表格、代码块、引用、公式），再逐节点渲染为LaTeX，
+覆盖Agent实际生成的写法；无法识别的块交给调用方提供的fallback（如LLM）处理
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# 转换器版本，渲染规则变化时递增（用于缓存失效）
+CONVERTER_VERSION = "2"
+
+_LATEX_SPECIAL = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+}
+_LATEX_SPECIAL_PATTERN = re.compile(r'[\\&%$#_{}~^]')
+
+_HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_LIST_ITEM_PATTERN = re.compile(r'^(\s*)([-*+]|\d+[.)])\s+(.*)$')
+_TABLE_SEPARATOR_PATTERN = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+_FENCE_PATTERN = re.compile(r'^\s*(`{3,}|~{3,})\s*([\w+-]*)')
+_HR_PATTERN = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_HTML_BLOCK_PATTERN = re.compile(r'^\s*</?[a-zA-Z][^>]*>')
+_FOOTNOTE_PATTERN = re.compile(r'^\[\^[^\]]+\]:')
+# 标题中的编号，如 "3.2 "、"（二）"、"一、"
+_HEADING_NUMBER_PATTERN = re.compile(
+    r'^(?:\d+(?:\.\d+)*[.、．]?\s+|[（(][一二三四五六七八九十]+[）)]\s*|[一二三四五六七八九十]+[、.．]\s*)'
+)
+
+# 行内语法，按优先级排列
+_INLINE_PATTERN = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?P=code)'
+    r'|\$\$(?P<display_math>[^$]+?)\$\$'
+    r'|(?P<math>(?<![\\$])\$(?=\S)(?P<math_text>[^$\n]+?)(?<=\S)\$(?!\d))'
+    r'|!\[(?P<image_alt>[^\]]*)\]\((?P<image_src>[^)\s]+)[^)]*\)'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)[^)]*\)'
+    r'|\[(?P<cite>\d+(?:\s*[,，\-–]\s*\d+)*)\]'
+    r'|\*\*\*(?P<bold_italic>.+?)\*\*\*'
+    r'|\*\*(?P<bold>.+?)\*\*'
+    r'|__(?P<bold_underscore>.+?)__'
+    r'|(?<![*\\0-9A-Za-z])\*(?P<italic>[^*\s](?:[^*]*?[^*\s])?)\*(?![*0-9A-Za-z])'
+    r'|(?P<url>https?://[^\s<>()\[\]，。；）]+)'
+)
+
+
+@dataclass
+class MdBlock:
+    """块级语法树节点"""
+    kind: str  # heading / paragraph / list / table / code / quote / math / hr / unknown
+    text: str = ""
+    level: int = 0
+    ordered: bool = False
+    language: str = ""
+    rows: List[List[str]] = field(default_factory=list)
+    children: List["MdBlock"] = field(default_factory=list)  # quote的内容
+    items: List[Tuple[str, List["MdBlock"]]] = field(default_factory=list)  # list: (该项文本, 嵌套块)
+
+
+class MdLatexUtil:
+    @staticmethod
+    def _is_math_block(stripped: str) -> bool:
+        """以$$开头，且$$不在行中间闭合（行中间闭合的是段落里的行内公式，如 "$$x$$ 为损失"）"""
+        if not stripped.startswith('$$'):
+            return False
+        rest = stripped[2:]
+        return '$$' not in rest or rest.endswith('$$') and rest.index('$$') == len(rest) - 2
+
+    @staticmethod
+    def escape(text: str) -> str:
+        return _LATEX_SPECIAL_PATTERN.sub(lambda m: _LATEX_SPECIAL[m.group()], text)
+
+    # ------------------------------------------------------------------ 解析
+
+    @classmethod
+    def parse(cls, markdown: str) -> List[MdBlock]:
+        """将Markdown解析为块级节点列表"""
+        lines = markdown.replace('\r\n', '\n').replace('\t', '    ').split('\n')
+        blocks: List[MdBlock] = []
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            stripped = line.strip()
+
+            if not stripped:
+                i += 1
+                continue
+
+            fence = _FENCE_PATTERN.match(line)
+            if fence:
+                marker, language = fence.group(1), fence.group(2).lower()
+                body = []
+                i += 1
+                while i < len(lines) and not lines[i].strip().startswith(marker):
+                    body.append(lines[i])
+                    i += 1
+                blocks.append(MdBlock(kind="code", text="\n".join(body), language=language))
+                i += 1
+                continue
+
+            if cls._is_math_block(stripped):
+                body = [stripped[2:]]
+                if stripped.endswith('$$') and len(stripped) > 2:
+                    body = [stripped[2:-2]]
+                    i += 1
+                else:
+                    i += 1
+                    while i < len(lines) and '$$' not in lines[i]:
+                        body.append(lines[i])
+                        i += 1
+                    if i < len(lines):
+                        body.append(lines[i].split('$$')[0])
+                    i += 1
+                blocks.append(MdBlock(kind="math", text="\n".join(b for b in body if b.strip())))
+                continue
+
+            heading = _HEADING_PATTERN.match(stripped)
+            if heading:
+                blocks.append(MdBlock(kind="heading", level=len(heading.group(1)), text=heading.group(2)))
+                i += 1
+                continue
+
+            if _HR_PATTERN.match(stripped):
+                blocks.append(MdBlock(kind="hr"))
+                i += 1
+                continue
+
+            if '|' in stripped and i + 1 < len(lines) and _TABLE_SEPARATOR_PATTERN.match(lines[i + 1]):
+                rows = [cls._split_row(stripped)]
+                i += 2
+                while i < len(lines) and '|' in lines[i] and lines[i].strip():
+                    rows.append(cls._split_row(lines[i].strip()))
+                    i += 1
+                blocks.append(MdBlock(kind="table", rows=rows))
+                continue
+
+            if stripped.startswith('>'):
+                body = []
+                while i < len(lines) and lines[i].strip().startswith('>'):
+                    body.append(re.sub(r'^\s*>\s?', '', lines[i]))
+                    i += 1
+                blocks.append(MdBlock(kind="quote", children=cls.parse("\n".join(body))))
+                continue
+
+            if _LIST_ITEM_PATTERN.match(line):
+                block, i = cls._parse_list(lines, i)
+                blocks.append(block)
+                continue
+
+            if _HTML_BLOCK_PATTERN.match(stripped) or _FOOTNOTE_PATTERN.match(stripped):
+                body = []
+                while i < len(lines) and lines[i].strip():
+                    body.append(lines[i])
+                    i += 1
+                blocks.append(MdBlock(kind="unknown", text="\n".join(body)))
+                continue
+
+            # 段落：连续的非空行，遇到其他块的起始标记时结束
+            body = []
+            while i < len(lines) and lines[i].strip():
+                current = lines[i]
+                if body and (_HEADING_PATTERN.match(current.strip()) or _FENCE_PATTERN.match(current)
+                             or _LIST_ITEM_PATTERN.match(current) or current.strip().startswith('>')
+                             or cls._is_math_block(current.strip())):
+                    break
+                body.append(current.strip())
+                i += 1
+            blocks.append(MdBlock(kind="paragraph", text="\n".join(body)))
+        return blocks
+
+    @staticmethod
+    def _split_row(line: str) -> List[str]:
+        line = line.strip()
+        if line.startswith('|'):
+            line = line[1:]
+        if line.endswith('|'):
+            line = line[:-1]
+        return [cell.strip() for cell in re.split(r'(?<!\\)\|', line)]
+
+    @classmethod
+    def _parse_list(cls, lines: List[str], start: int) -> Tuple[MdBlock, int]:
+        """解析一个列表（含按缩进嵌套的子列表和续行）"""
+        first = _LIST_ITEM_PATTERN.match(lines[start])
+        base_indent = len(first.group(1))
+        block = MdBlock(kind="list", ordered=first.group(2)[0].isdigit())
+        i = start
+        while i < len(lines):
+            line = lines[i]
+            if not line.strip():
+                # 空行后若仍是同级列表项则继续
+                if i + 1 < len(lines) and _LIST_ITEM_PATTERN.match(lines[i + 1]) \
+                        and len(_LIST_ITEM_PATTERN.match(lines[i + 1]).group(1)) >= base_indent:
+                    i += 1
+                    continue
+                break
+            match = _LIST_ITEM_PATTERN.match(line)
+            indent = len(line) - len(line.lstrip())
+            if match and indent == base_indent:
+                if match.group(2)[0].isdigit() != block.ordered:
+                    # 有序/无序切换时开始新的列表
+                    break
+                block.items.append((match.group(3), []))
+                i += 1
+            elif indent > base_indent and block.items:
+                # 嵌套内容：收集缩进更深的行递归解析
+                nested = []
+                while i < len(lines) and lines[i].strip() and len(lines[i]) - len(lines[i].lstrip()) > base_indent:
+                    nested.append(lines[i])
+                    i += 1
+                nested_text = "\n".join(nested)
+                if _LIST_ITEM_PATTERN.match(nested[0]):
+                    block.items[-1][1].extend(cls.parse(nested_text))
+                else:
+                    text, children = block.items[-1]
+                    block.items[-1] = (text + "\n" + nested_text.strip(), children)
+            elif match or indent < base_indent:
+                break
+            else:
+                # 不缩进的续行并入当前项
+                text, children = block.items[-1]
+                block.items[-1] = (text + "\n" + line.strip(), children)
+                i += 1
+        return block, i
+
+    # ------------------------------------------------------------------ 渲染
+
+    @classmethod
+    def render_inline(cls, text: str, citation_keys: Optional[Iterable[str]] = None) -> str:
+        """渲染行内元素：加粗、斜体、行内代码、公式、链接、图片和引用"""
+        keys = set(citation_keys) if citation_keys is not None else None
+        output = []
+        position = 0
+        for match in _INLINE_PATTERN.finditer(text):
+            output.append(cls.escape(text[position:match.start()]))
+            position = match.end()
+            groups = match.groupdict()
+            if groups["code_text"] is not None:
+                output.append(f"\\texttt{{{cls.escape(groups['code_text'].strip())}}}")
+            elif groups["display_math"] is not None:
+                output.append(f"\\[{groups['display_math'].strip()}\\]")
+            elif groups["math"] is not None:
+                output.append(groups["math"])
+            elif groups["image_src"] is not None:
+                output.append(cls._render_image(groups["image_alt"], groups["image_src"]))
+            elif groups["link_url"] is not None:
+                url = groups["link_url"].replace('%', r'\%').replace('#', r'\#')
+                output.append(f"\\href{{{url}}}{{{cls.render_inline(groups['link_text'], citation_keys)}}}")
+            elif groups["cite"] is not None:
+                output.append(cls._render_citation(groups["cite"], keys))
+            elif groups["bold_italic"] is not None:
+                output.append(f"\\textbf{{\\textit{{{cls.render_inline(groups['bold_italic'], citation_keys)}}}}}")
+            elif groups["bold"] is not None or groups["bold_underscore"] is not None:
+                inner = groups["bold"] if groups["bold"] is not None else groups["bold_underscore"]
+                output.append(f"\\textbf{{{cls.render_inline(inner, citation_keys)}}}")
+            elif groups["italic"] is not None:
+                output.append(f"\\textit{{{cls.render_inline(groups['italic'], citation_keys)}}}")
+            elif groups["url"] is not None:
+                output.append(f"\\url{{{groups['url']}}}")
+        output.append(cls.escape(text[position:]))
+        return "".join(output)
+
+    @staticmethod
+    def _render_citation(cite: str, keys: Optional[set]) -> str:
+        """[1,3] / [2-4] 形式的引用；文献编号都存在时生成 \\cite，否则保留原样"""
+        numbers = []
+        for part in re.split(r'\s*[,，]\s*', cite):
+            bounds = re.split(r'\s*[\-–]\s*', part)
+            if len(bounds) == 2 and int(bounds[1]) >= int(bounds[0]) and int(bounds[1]) - int(bounds[0]) < 50:
+                numbers.extend(str(n) for n in range(int(bounds[0]), int(bounds[1]) + 1))
+            else:
+                numbers.append(bounds[0])
+        if keys is not None and numbers and all(n in keys for n in numbers):
+            return f"\\cite{{{','.join(numbers)}}}"
+        return "{[}" + cite.replace('，', ',') + "{]}"
+
+    @staticmethod
+    def _render_image(alt: str, src: str) -> str:
+        return (f"\n\\begin{{figure}}[htbp]\n\\centering\n\\includegraphics[width=0.8\\textwidth]{{{src}}}\n"
+                f"\\caption{{{MdLatexUtil.escape(alt)}}}\n\\end{{figure}}\n")
+
+    @classmethod
+    def _render_table(cls, rows: List[List[str]], citation_keys) -> str:
+        columns = max(len(row) for row in rows)
+        if columns == 3:
+            # 三列表格：15% / 25% / 60%，tabularx要求各列\hsize系数之和等于列数
+            spec = " ".join(f">{{\\hsize={ratio * columns:.2f}\\hsize}}X" for ratio in (0.15, 0.25, 0.60))
+        else:
+            spec = " ".join(["X"] * columns)
+        lines = [f"\\begin{{tabularx}}{{\\textwidth}}{{{spec}}}", "\\hline"]
+        for index, row in enumerate(rows):
+            cells = [cls.render_inline(cell, citation_keys) for cell in row] + [""] * (columns - len(row))
+            if index == 0:
+                cells = [f"\\textbf{{{cell}}}" if cell else cell for cell in cells]
+            lines.append(" & ".join(cells) + " \\\\")
+            if index == 0:
+                lines.append("\\hline")
+        lines.extend(["\\hline", "\\end{tabularx}"])
+        return "\\begin{center}\n" + "\n".join(lines) + "\n\\end{center}"
+
+    @classmethod
+    def _render_list(cls, block: MdBlock, citation_keys, fallback, heading_base: int = 2) -> str:
+        environment = "enumerate" if block.ordered else "itemize"
+        lines = [f"\\begin{{{environment}}}"]
+        for text, children in block.items:
+            item = cls.render_inline(text.replace("\n", " "), citation_keys)
+            # 防止以[开头的内容被当作\item的可选参数
+            lines.append(f"\\item{{}} {item}" if item.startswith("[") or item.startswith("{[}") else f"\\item {item}")
+            if children:
+                lines.append(cls._render_blocks(children, citation_keys, fallback, heading_base))
+        lines.append(f"\\end{{{environment}}}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _heading_base(blocks: List[MdBlock]) -> int:
+        """本节最浅的二级及以下标题级别，映射为 \\subsection；没有标题时为2"""
+        levels = [block.level for block in blocks if block.kind == "heading" and block.level > 1]
+        return min(levels) if levels else 2
+
+    @classmethod
+    def _render_heading(cls, block: MdBlock, citation_keys, heading_base: int = 2) -> str:
+        title = _HEADING_NUMBER_PATTERN.sub('', block.text.strip()).strip()
+        if block.level == 1 or not title:
+            # 一级标题对应模板中已有的 \chapter/\section
+            return ""
+        # 按相对本节最浅标题的深度映射，避免只有###的章节跳过\subsection
+        command = {0: "subsection", 1: "subsubsection"}.get(block.level - heading_base, "paragraph")
+        return f"\\{command}{{{cls.render_inline(title, citation_keys)}}}"
+
+    @classmethod
+    def _render_blocks(cls, blocks: List[MdBlock], citation_keys, fallback, heading_base: int = 2) -> str:
+        rendered = []
+        for block in blocks:
+            if block.kind == "heading":
+                latex = cls._render_heading(block, citation_keys, heading_base)
+            elif block.kind == "paragraph":
+                latex = cls.render_inline(block.text, citation_keys)
+            elif block.kind == "list":
+                latex = cls._render_list(block, citation_keys, fallback, heading_base)
+            elif block.kind == "table":
+                latex = cls._render_table(block.rows, citation_keys)
+            elif block.kind == "quote":
+                latex = f"\\begin{{quote}}\n{cls._render_blocks(block.children, citation_keys, fallback, heading_base)}\n\\end{{quote}}"
+            elif block.kind == "math":
+                latex = f"\\[\n{block.text.strip()}\n\\]"
+            elif block.kind == "code":
+                if block.language == "mermaid":
+                    # mermaid图表单独渲染为图片插入模板
+                    latex = "% mermaid diagram rendered separately"
+                else:
+                    latex = f"\\begin{{verbatim}}\n{block.text}\n\\end{{verbatim}}"
+            elif block.kind == "hr":
+                latex = "\\medskip"
+            else:
+                latex = fallback(block.text) if fallback else cls.escape(block.text)
+            if latex:
+                rendered.append(latex)
+        return "\n\n".join(rendered)
+
+    @classmethod
+    def render(cls, markdown: str, citation_keys: Optional[Iterable[str]] = None,
+               fallback: Optional[Callable[[str], str]] = None) -> str:
+        """
+        将Markdown转换为LaTeX正文
+        :param citation_keys: 参考文献的\\bibitem键，[n]中的编号都存在时转换为\\cite，否则原样保留
+        :param fallback: 处理无法识别的块（如HTML、脚注）的函数，未提供时按普通文本转义
+        """
+        keys = [str(key) for key in citation_keys] if citation_keys is not None else None
+        blocks = cls.parse(markdown or "")
+        return cls._render_blocks(blocks, keys, fallback, cls._heading_base(blocks)).strip()
+
+    @classmethod
+    def find_unrecognized(cls, markdown: str) -> List[str]:
+        """返回无法由本地规则转换的块"""
+        return [block.text for block in cls.parse(markdown or "") if block.kind == "unknown"]
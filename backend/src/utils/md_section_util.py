@@ -0,0 +1,116 @@
+"""
+Markdown章节索引
+一次扫描把文档切分为章节树（标题层级 + 字符偏移），之后按标题查找章节只需遍历索引，不再对全文反复做正则匹配；
+代码块（```/~~~）中以#开头的行不视为标题
+供评审打分、修订指导和导出时的章节提取共用
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+# 只查找以 #、`、~ 开头（最多缩进3个空格）的行，正文由正则引擎按字面前缀快速跳过，命中后再解析整行
+_CANDIDATE_PATTERN = re.compile(r'\n {0,3}[#`~]')
+_HEADING_PATTERN = re.compile(r'(#{1,6})(?:[ \t]+(.*?))?[ \t]*#*[ \t]*\r?')
+_FENCE_PATTERN = re.compile(r'(`{3,}|~{3,})')
+# 标题前的编号和强调符号，如 "1. "、"3.2 "、"（二）"、"一、"、"**"
+_TITLE_PREFIX_PATTERN = re.compile(
+    r'^(?:[*_\s]+|\d+(?:\.\d+)*(?:[.、．]\s*|\s+)|[（(][一二三四五六七八九十\d]+[）)]\s*|[一二三四五六七八九十]+[、.．]\s*)+'
+)
+# 报告末尾追加的二级标题（参考文献、甘特图等），常被挂在最后一章之下，截取章节时默认不计入
+TRAILING_TITLES = ("参考文献", "References", "项目时间规划甘特图", "附录")
+
+
+@dataclass
+class MdSection:
+    """章节：start为标题行起点，body_start为标题行之后，end为下一个同级或更高级标题（含子章节）"""
+    level: int
+    title: str  # 去掉编号和强调符号后的标题
+    raw_title: str
+    start: int
+    body_start: int
+    end: int
+    children: List["MdSection"] = field(default_factory=list)
+
+    def content(self, text: str) -> str:
+        """包含标题行的完整章节"""
+        return text[self.start:self.end]
+
+    def body(self, text: str) -> str:
+        """不含标题行的章节正文（含子章节）"""
+        return text[self.body_start:self.end]
+
+
+class MdSectionIndex:
+    def __init__(self, text: str):
+        self.text = text
+        self.sections: List[MdSection] = []  # 按文档顺序排列的所有章节
+        self.roots: List[MdSection] = []  # 章节树的顶层
+        self._build()
+
+    def _build(self):
+        # 在文首补一个换行使第一行也能匹配；补位后换行符的下标正好是原文中该行的起点
+        padded = '\n' + self.text
+        stack: List[MdSection] = []
+        fence = None
+        for candidate in _CANDIDATE_PATTERN.finditer(padded):
+            line_start = candidate.start()
+            marker_start = candidate.end() - 1
+            line_end = padded.find('\n', marker_start)
+            if line_end == -1:
+                line_end = len(padded)
+            fence_match = _FENCE_PATTERN.match(padded, marker_start, line_end)
+            if fence_match:
+                marker = fence_match.group(1)
+                if fence is None:
+                    fence = marker
+                elif marker[0] == fence[0] and len(marker) >= len(fence):
+                    fence = None
+                continue
+            if fence is not None:
+                continue
+            match = _HEADING_PATTERN.fullmatch(padded, marker_start, line_end)
+            if not match:
+                continue
+            level = len(match.group(1))
+            raw_title = match.group(2) or ""
+            section = MdSection(level=level, title=_TITLE_PREFIX_PATTERN.sub('', raw_title).rstrip('*_ '),
+                                raw_title=raw_title, start=line_start, body_start=min(line_end, len(self.text)),
+                                end=len(self.text))
+            while stack and stack[-1].level >= level:
+                stack.pop().end = line_start
+            (stack[-1].children if stack else self.roots).append(section)
+            stack.append(section)
+            self.sections.append(section)
+
+    def find(self, titles: Iterable[str]) -> Optional[MdSection]:
+        """
+        返回标题以titles之一开头的章节（不区分大小写）
+        有多个时取层级最高的，同级取文档中靠前的，避免把某章下的"### 总结"小节当成"# 总结"章
+        """
+        prefixes = tuple(title.casefold() for title in titles)
+        found = None
+        for section in self.sections:
+            if (found is None or section.level < found.level) and section.title.casefold().startswith(prefixes):
+                found = section
+        return found
+
+    def section_text(self, titles: Iterable[str], include_heading: bool = True,
+                     stop_titles: Iterable[str] = TRAILING_TITLES) -> str:
+        """查找章节并返回其内容（截至第一个标题以stop_titles之一开头的子章节），未找到时返回空字符串"""
+        section = self.find(titles)
+        if section is None:
+            return ""
+        end = section.end
+        stop_prefixes = tuple(title.casefold() for title in stop_titles)
+        if stop_prefixes:
+            for child in self._descendants(section):
+                if child.title.casefold().startswith(stop_prefixes):
+                    end = child.start
+                    break
+        return self.text[section.start if include_heading else section.body_start:end]
+
+    @staticmethod
+    def _descendants(section: MdSection):
+        for child in section.children:
+            yield child
+            yield from MdSectionIndex._descendants(child)
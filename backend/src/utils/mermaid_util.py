@@ -0,0 +1,135 @@
+"""
+Mermaid图表渲染
+- 渲染结果按内容寻址缓存：键为规范化后的Mermaid源码和渲染参数的哈希，内容相同的图表（如各版本间未变的甘特图）只渲染一次
+- 未命中缓存的图表合并到一个Markdown文件中交给mmdc一次渲染，整批只启动一次无头浏览器；
+  批量渲染失败时再逐个渲染
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .file_cache_util import FileCacheUtil
+
+# 渲染器版本，渲染方式变化时递增（用于缓存失效）
+RENDERER_VERSION = "1"
+# 单个图表的渲染超时，批量渲染按图表数累加
+RENDER_TIMEOUT_PER_DIAGRAM = int(os.environ.get("MERMAID_RENDER_TIMEOUT", "60"))
+
+
+@lru_cache(maxsize=1)
+def _mmdc_path() -> Optional[str]:
+    path = shutil.which("mmdc")
+    if path is None:
+        logging.warning("⚠️ 未找到mmdc命令，Mermaid图表将不会被渲染（npm install -g @mermaid-js/mermaid-cli）")
+    return path
+
+
+class MermaidUtil:
+    @staticmethod
+    def normalize(code: str) -> str:
+        """去掉行尾空白和首尾空行，仅空白不同的图表共用缓存"""
+        return "\n".join(line.rstrip() for line in code.strip().splitlines())
+
+    @classmethod
+    def cache_key(cls, code: str, options: Dict) -> str:
+        payload = json.dumps({"code": cls.normalize(code), "options": options, "version": RENDERER_VERSION},
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _option_args(options: Dict) -> List[str]:
+        args = []
+        if options.get("width"):
+            args += ["-w", str(options["width"])]
+        if options.get("height"):
+            args += ["-H", str(options["height"])]
+        if options.get("background"):
+            args += ["-b", options["background"]]
+        if options.get("theme"):
+            args += ["-t", options["theme"]]
+        return args
+
+    @staticmethod
+    def _store(rendered_path: str, cache_path: str) -> bool:
+        """把渲染结果原子地放入缓存，避免并发导出读到不完整的文件"""
+        if not os.path.exists(rendered_path) or os.path.getsize(rendered_path) == 0:
+            return False
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(rendered_path, temp_path)
+        os.replace(temp_path, cache_path)
+        return True
+
+    @classmethod
+    def _render_batch(cls, codes: List[str], cache_paths: List[str], options: Dict) -> List[bool]:
+        """把多个图表写进同一个Markdown文件，由mmdc在一次浏览器会话中渲染（输出为 batch-1.png、batch-2.png ...）"""
+        output_format = options.get("format", "png")
+        with tempfile.TemporaryDirectory(prefix="mermaid_batch_") as work_dir:
+            with open(os.path.join(work_dir, "batch.md"), "w", encoding="utf-8") as f:
+                for code in codes:
+                    f.write(f"```mermaid\n{code}\n```\n\n")
+            command = [_mmdc_path(), "-i", "batch.md", "-o", "out.md", "-e", output_format] + cls._option_args(options)
+            try:
+                result = subprocess.run(command, cwd=work_dir, capture_output=True, text=True,
+                                        timeout=RENDER_TIMEOUT_PER_DIAGRAM * len(codes))
+                if result.returncode != 0:
+                    logging.warning(f"⚠️ Mermaid批量渲染失败，改为逐个渲染: {result.stderr[-500:]}")
+            except subprocess.TimeoutExpired:
+                logging.warning("⚠️ Mermaid批量渲染超时，改为逐个渲染")
+            return [cls._store(os.path.join(work_dir, f"out-{i + 1}.{output_format}"), cache_path)
+                    for i, cache_path in enumerate(cache_paths)]
+
+    @classmethod
+    def _render_single(cls, code: str, cache_path: str, options: Dict) -> bool:
+        output_format = options.get("format", "png")
+        with tempfile.TemporaryDirectory(prefix="mermaid_") as work_dir:
+            with open(os.path.join(work_dir, "diagram.mmd"), "w", encoding="utf-8") as f:
+                f.write(code)
+            command = [_mmdc_path(), "-i", "diagram.mmd", "-o", f"diagram.{output_format}"] + cls._option_args(options)
+            try:
+                result = subprocess.run(command, cwd=work_dir, capture_output=True, text=True,
+                                        timeout=RENDER_TIMEOUT_PER_DIAGRAM)
+            except subprocess.TimeoutExpired:
+                logging.error("❌ Mermaid图表渲染超时")
+                return False
+            if result.returncode != 0:
+                logging.error(f"❌ Mermaid图表渲染失败: {result.stderr[-500:]}")
+            return cls._store(os.path.join(work_dir, f"diagram.{output_format}"), cache_path)
+
+    @classmethod
+    def render_all(cls, codes: List[str], cache_dir: str, output_format: str = "png", width: int = None,
+                   height: int = None, background: str = None, theme: str = None) -> List[Optional[str]]:
+        """
+        渲染一组Mermaid图表，返回与输入一一对应的缓存文件路径（渲染失败为None）
+        调用方应把结果复制到自己的输出目录，不要修改缓存文件
+        """
+        options = {"format": output_format, "width": width, "height": height,
+                   "background": background, "theme": theme}
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_paths = [os.path.join(cache_dir, f"{cls.cache_key(code, options)}.{output_format}") for code in codes]
+
+        # 同一批中相同的图表只渲染一次；命中的缓存刷新使用时间
+        pending: Dict[str, str] = {}
+        for code, cache_path in zip(codes, cache_paths):
+            if os.path.exists(cache_path):
+                FileCacheUtil.touch(cache_path)
+            elif cache_path not in pending:
+                pending[cache_path] = cls.normalize(code)
+        hits = len(codes) - len(pending)
+        logging.info(f"🖼️ Mermaid图表 {len(codes)} 个，缓存命中 {hits} 个，需要渲染 {len(pending)} 个")
+
+        if pending and _mmdc_path() is not None:
+            pending_paths = list(pending)
+            rendered = cls._render_batch(list(pending.values()), pending_paths, options)
+            for cache_path, success in zip(pending_paths, rendered):
+                if not success:
+                    cls._render_single(pending[cache_path], cache_path, options)
+            FileCacheUtil.prune(cache_dir)
+
+        return [cache_path if os.path.exists(cache_path) else None for cache_path in cache_paths]
@@ -0,0 +1,247 @@
+"""
+工作流节点的追踪与指标统计
+进程内维护计数器和直方图，并以Prometheus文本格式导出（见 /metrics 接口）
+"""
+import logging
+import math
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from threading import Lock
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# 节点耗时的直方图分桶（秒），LLM流式节点通常在数秒到数分钟之间
+LATENCY_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# token数的直方图分桶
+TOKEN_BUCKETS = (100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+
+@dataclass
+class NodeSpan:
+    """一次节点执行的追踪记录"""
+    node: str
+    proposal_id: str
+    start_time: float
+    end_time: float = 0.0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    llm_calls: int = 0
+    tool_calls: int = 0
+    error: str = ""
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.time()) - self.start_time
+
+    def to_dict(self) -> dict:
+        return {
+            "node": self.node,
+            "proposal_id": self.proposal_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": round(self.duration, 3),
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "error": self.error,
+        }
+
+
+@dataclass
+class _Histogram:
+    buckets: Tuple[float, ...]
+    counts: List[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def observe(self, value: float):
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+# 当前线程/上下文中正在执行的节点
+_current_span: ContextVar[Optional[NodeSpan]] = ContextVar("current_span", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricsUtil:
+    _lock = Lock()  # 线程锁，节点运行在线程池中
+    counters: Dict[str, Dict[LabelKey, float]] = {}
+    histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+    help_texts: Dict[str, str] = {}
+    recent_spans: Deque[NodeSpan] = deque(maxlen=500)
+
+    @staticmethod
+    def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+    @classmethod
+    def inc(cls, name: str, labels: Dict[str, str] = None, value: float = 1, help_text: str = "") -> None:
+        """计数器加值"""
+        key = cls._label_key(labels)
+        with cls._lock:
+            series = cls.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            if help_text:
+                cls.help_texts.setdefault(name, help_text)
+
+    @classmethod
+    def observe(cls, name: str, value: float, labels: Dict[str, str] = None,
+                buckets: Tuple[float, ...] = LATENCY_BUCKETS, help_text: str = "") -> None:
+        """直方图记录一个观测值"""
+        key = cls._label_key(labels)
+        with cls._lock:
+            series = cls.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = _Histogram(buckets=buckets)
+            series[key].observe(value)
+            if help_text:
+                cls.help_texts.setdefault(name, help_text)
+
+    @classmethod
+    def current_span(cls) -> Optional[NodeSpan]:
+        return _current_span.get()
+
+    @classmethod
+    def record_llm_usage(cls, tokens_in: int, tokens_out: int) -> None:
+        """记录一次LLM调用的token用量，归属到当前节点"""
+        span = _current_span.get()
+        node = span.node if span else "unknown"
+        if span:
+            span.llm_calls += 1
+            span.tokens_in += tokens_in
+            span.tokens_out += tokens_out
+        cls.inc("proposal_llm_calls_total", {"node": node}, help_text="LLM调用次数")
+        cls.inc("proposal_llm_tokens_total", {"node": node, "direction": "in"}, tokens_in,
+                help_text="LLM消耗的token数")
+        cls.inc("proposal_llm_tokens_total", {"node": node, "direction": "out"}, tokens_out)
+
+    @classmethod
+    def record_tool_call(cls, tool: str, success: bool, duration: float) -> None:
+        """记录一次工具调用，归属到当前节点"""
+        span = _current_span.get()
+        if span:
+            span.tool_calls += 1
+        status = "success" if success else "error"
+        cls.inc("proposal_tool_calls_total", {"tool": tool, "status": status}, help_text="工具调用次数")
+        cls.observe("proposal_tool_duration_seconds", duration, {"tool": tool}, help_text="工具调用耗时")
+
+    @classmethod
+    def trace_node(cls, node_name: str, func: Callable) -> Callable:
+        """
+        包装LangGraph节点，记录耗时、token、工具调用和异常
+        proposal_id 只写入span日志，不作为指标标签，避免标签基数无限增长
+        """
+        @wraps(func)
+        def wrapper(state):
+            span = NodeSpan(node=node_name, proposal_id=state.get("proposal_id", ""), start_time=time.time())
+            token = _current_span.set(span)
+            try:
+                return func(state)
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                span.end_time = time.time()
+                _current_span.reset(token)
+                cls._finish_span(span)
+
+        return wrapper
+
+    @classmethod
+    def _finish_span(cls, span: NodeSpan) -> None:
+        status = "error" if span.error else "success"
+        cls.inc("proposal_node_runs_total", {"node": span.node, "status": status}, help_text="节点执行次数")
+        cls.observe("proposal_node_duration_seconds", span.duration, {"node": span.node},
+                    help_text="节点执行耗时")
+        if span.llm_calls:
+            cls.observe("proposal_node_tokens", span.tokens_in + span.tokens_out, {"node": span.node},
+                        buckets=TOKEN_BUCKETS, help_text="单次节点执行消耗的token数")
+        with cls._lock:
+            cls.recent_spans.append(span)
+        logging.info(f"📈 [trace] {span.to_dict()}")
+
+    @classmethod
+    def render_prometheus(cls) -> str:
+        """以Prometheus文本格式导出所有指标"""
+        def fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ""
+            escaped = [(k, v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for k, v in pairs]
+            return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+        def fmt_value(value: float) -> str:
+            if math.isinf(value):
+                return "+Inf"
+            return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+        lines = []
+        with cls._lock:
+            for name, series in sorted(cls.counters.items()):
+                if name in cls.help_texts:
+                    lines.append(f"# HELP {name} {cls.help_texts[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{fmt_labels(key)} {fmt_value(value)}")
+            for name, series in sorted(cls.histograms.items()):
+                if name in cls.help_texts:
+                    lines.append(f"# HELP {name} {cls.help_texts[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(series.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{name}_bucket{fmt_labels(key, (('le', fmt_value(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{fmt_labels(key, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{fmt_labels(key)} {fmt_value(hist.total)}")
+                    lines.append(f"{name}_count{fmt_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _build_token_usage_callback():
+    """langchain_core较重，回调类在首次使用时才定义（/metrics等接口不依赖它）"""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class TokenUsageCallback(BaseCallbackHandler):
+        """LangChain回调：在每次LLM调用结束时把token用量计入当前节点"""
+
+        def on_llm_end(self, response, **kwargs) -> None:
+            tokens_in, tokens_out = 0, 0
+            for generations in response.generations or []:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage:
+                        tokens_in += usage.get("input_tokens", 0)
+                        tokens_out += usage.get("output_tokens", 0)
+            if not (tokens_in or tokens_out):
+                # 非流式调用时用量在llm_output中
+                token_usage = (response.llm_output or {}).get("token_usage") or {}
+                tokens_in = token_usage.get("prompt_tokens", 0)
+                tokens_out = token_usage.get("completion_tokens", 0)
+            MetricsUtil.record_llm_usage(tokens_in, tokens_out)
+
+    return TokenUsageCallback
+
+
+_lazy_attributes: Dict[str, object] = {}
+_lazy_lock = Lock()
+
+
+def __getattr__(name: str):
+    """按需创建 TokenUsageCallback 和共享的 token_usage_callback 实例"""
+    if name not in ("TokenUsageCallback", "token_usage_callback"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if not _lazy_attributes:
+            callback_class = _build_token_usage_callback()
+            _lazy_attributes["TokenUsageCallback"] = callback_class
+            _lazy_attributes["token_usage_callback"] = callback_class()
+    return _lazy_attributes[name]
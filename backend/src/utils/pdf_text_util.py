@@ -0,0 +1,111 @@
+"""
+论文PDF文本的章节切分
+从PyMuPDF提取的纯文本中按常见标题（Abstract、1 Introduction、II. METHOD、一、引言 等）切分章节，
+参考文献及之后的内容丢弃；再把章节合并或拆分为大小相近的片段，供分段总结（map-reduce）使用
+"""
+import re
+from typing import List, Tuple
+
+from .token_util import TokenUtil
+
+_NAMED_HEADINGS = (
+    r"abstract|introduction|related\s+work|background|preliminaries|method(?:s|ology)?|approach|"
+    r"model|experiments?|experimental\s+(?:setup|results)|evaluation|results?|analysis|discussion|"
+    r"conclusions?(?:\s+and\s+future\s+work)?|limitations|future\s+work|"
+    r"摘\s*要|引\s*言|绪论|相关工作|研究方法|方法|实验|实验结果|讨论|结论|总结与展望"
+)
+_HEADING_PATTERN = re.compile(
+    r"^(?:"
+    r"(?:\d{1,2}(?:\.\d{1,2}){0,2}\.?|[IVX]{1,5}\.|[A-H]\.)\s+\S.{0,70}"  # 1 Introduction / 3.2 Setup / II. METHOD
+    r"|(?:" + _NAMED_HEADINGS + r")\s*[:：]?"                            # Abstract / 结论
+    r"|第[一二三四五六七八九十]+[章节]\s*\S.{0,30}|[一二三四五六七八九十]+[、.]\s*\S.{0,30}"
+    r")$",
+    re.IGNORECASE,
+)
+_STOP_PATTERN = re.compile(r"^(?:\d{1,2}\.?\s+|[IVX]{1,5}\.\s+)?(?:references|bibliography|参考文献)\s*$",
+                           re.IGNORECASE)
+
+
+class PdfTextUtil:
+    @staticmethod
+    def _is_heading(line: str) -> bool:
+        # 以句号结尾或全是数字的行通常是正文或表格
+        return (len(line) <= 80 and not line.endswith(('.', '。', ',', '，'))
+                and not line.replace('.', '').replace(' ', '').isdigit()
+                and _HEADING_PATTERN.match(line) is not None)
+
+    @classmethod
+    def split_sections(cls, text: str) -> List[Tuple[str, str]]:
+        """返回 [(标题, 正文)]，标题前的内容（题目、作者等）归入标题为空的第一段"""
+        sections: List[Tuple[str, List[str]]] = [("", [])]
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            if _STOP_PATTERN.match(line):
+                break
+            if line and cls._is_heading(line):
+                sections.append((line, []))
+            else:
+                sections[-1][1].append(raw_line)
+        return [(title, "\n".join(lines).strip()) for title, lines in sections
+                if title or "".join(lines).strip()]
+
+    @staticmethod
+    def _split_long(text: str, max_tokens: int) -> List[str]:
+        """按空行（没有空行时按行）把超长文本切成不超过max_tokens的片段"""
+        separator = "\n\n" if "\n\n" in text else "\n"
+        pieces, current, current_tokens = [], [], 0
+        for block in text.split(separator):
+            block_tokens = TokenUtil.count_tokens(block)
+            if current and current_tokens + block_tokens > max_tokens:
+                pieces.append(separator.join(current))
+                current, current_tokens = [], 0
+            if block_tokens > max_tokens:
+                pieces.append(TokenUtil.truncate_to_tokens(block, max_tokens))
+                continue
+            current.append(block)
+            current_tokens += block_tokens
+        if current:
+            pieces.append(separator.join(current))
+        return pieces
+
+    @classmethod
+    def chunk_sections(cls, sections: List[Tuple[str, str]], max_tokens: int) -> List[str]:
+        """相邻的短章节合并、长章节拆分，每个片段不超过max_tokens（片段内保留章节标题）"""
+        chunks, current, current_tokens = [], [], 0
+        for title, body in sections:
+            section_text = f"{title}\n{body}".strip()
+            section_tokens = TokenUtil.count_tokens(section_text)
+            if section_tokens > max_tokens:
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_tokens = [], 0
+                pieces = cls._split_long(body, max_tokens - TokenUtil.count_tokens(title) - 10)
+                chunks.extend(f"{title}（续）\n{piece}" if i and title else f"{title}\n{piece}".strip()
+                              for i, piece in enumerate(pieces))
+                continue
+            if current and current_tokens + section_tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(section_text)
+            current_tokens += section_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    @staticmethod
+    def fit_budget(chunks: List[str], token_budget: int) -> List[str]:
+        """
+        总token数超出预算时按片段分配预算并截取每段开头，保证每个章节都有内容进入总结；
+        短片段用不完的份额留给长片段
+        """
+        counts = [TokenUtil.count_tokens(chunk) for chunk in chunks]
+        if sum(counts) <= token_budget:
+            return chunks
+        allowances = [0] * len(chunks)
+        remaining = token_budget
+        order = sorted(range(len(chunks)), key=lambda i: counts[i])
+        for done, i in enumerate(order):
+            allowances[i] = min(counts[i], remaining // (len(chunks) - done))
+            remaining -= allowances[i]
+        return [chunk if allowance >= count else TokenUtil.truncate_to_tokens(chunk, allowance)
+                for chunk, count, allowance in zip(chunks, counts, allowances)]
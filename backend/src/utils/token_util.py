@@ -0,0 +1,124 @@
+"""
+Prompt的token计数与预算管理
+在发送前统计每个prompt组成部分的token数，超出预算时优先裁剪价值最低的部分
+"""
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from .metrics_util import MetricsUtil, TOKEN_BUCKETS
+
+# 单个prompt的默认token预算，可通过环境变量覆盖
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "24000"))
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+TRUNCATED_MARK = "\n...(内容过长，已截断)"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """tiktoken为可选依赖（langchain-openai会带上），不可用时退化为估算"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.info(f"tiktoken不可用，使用字符数估算token: {e}")
+        return None
+
+
+class TokenUtil:
+    @staticmethod
+    def count_tokens(text: str) -> int:
+        """统计文本的token数"""
+        if not text:
+            return 0
+        encoding = _get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        # 估算：中文约每字1个token，其余约每4个字符1个token
+        cjk_count = len(_CJK_PATTERN.findall(text))
+        return cjk_count + (len(text) - cjk_count + 3) // 4
+
+    @staticmethod
+    def truncate_to_tokens(text: str, max_tokens: int) -> str:
+        """将文本截断到不超过max_tokens，尽量在换行处截断以保留完整条目"""
+        if max_tokens <= 0:
+            return ""
+        total = TokenUtil.count_tokens(text)
+        if total <= max_tokens:
+            return text
+        mark_tokens = TokenUtil.count_tokens(TRUNCATED_MARK)
+        # 按比例估算截断位置，再逐步收缩直到满足预算
+        end = int(len(text) * max(max_tokens - mark_tokens, 0) / total)
+        while end > 0:
+            cut = text[:end]
+            newline = cut.rfind("\n")
+            if newline > end * 0.8:
+                cut = cut[:newline]
+            if TokenUtil.count_tokens(cut) + mark_tokens <= max_tokens:
+                return cut + TRUNCATED_MARK
+            end = int(end * 0.9)
+        return ""
+
+
+class PromptBudget:
+    """
+    按组成部分管理一次prompt的token预算
+    priority越小表示价值越低，超出预算时越先被裁剪；trimmable=False的部分（如指令）不会被裁剪
+    """
+
+    def __init__(self, name: str, budget: Optional[int] = None):
+        self.name = name
+        self.budget = budget or DEFAULT_PROMPT_TOKEN_BUDGET
+        self.components: List[Dict] = []
+
+    def add(self, key: str, text: str, priority: int = 0, trimmable: bool = True, min_tokens: int = 0) -> "PromptBudget":
+        text = text or ""
+        self.components.append({
+            "key": key,
+            "text": text,
+            "priority": priority,
+            "trimmable": trimmable,
+            "min_tokens": min_tokens,
+            "tokens": TokenUtil.count_tokens(text),
+        })
+        return self
+
+    def fit(self) -> Dict[str, str]:
+        """返回裁剪后的各部分文本，并记录每个部分的token分布"""
+        original = {c["key"]: c["tokens"] for c in self.components}
+        total = sum(original.values())
+
+        if total > self.budget:
+            overflow = total - self.budget
+            for component in sorted(self.components, key=lambda c: c["priority"]):
+                if overflow <= 0:
+                    break
+                if not component["trimmable"]:
+                    continue
+                reducible = component["tokens"] - component["min_tokens"]
+                if reducible <= 0:
+                    continue
+                target = component["tokens"] - min(reducible, overflow)
+                component["text"] = TokenUtil.truncate_to_tokens(component["text"], target)
+                new_tokens = TokenUtil.count_tokens(component["text"])
+                overflow -= component["tokens"] - new_tokens
+                component["tokens"] = new_tokens
+
+        final_total = sum(c["tokens"] for c in self.components)
+        breakdown = ", ".join(
+            f"{c['key']}={c['tokens']}" + (f"(原{original[c['key']]})" if c["tokens"] != original[c["key"]] else "")
+            for c in self.components
+        )
+        logging.info(f"📏 [{self.name}] prompt token: {final_total}/{self.budget} (裁剪前 {total}) | {breakdown}")
+        if final_total > self.budget:
+            logging.warning(f"⚠️ [{self.name}] 不可裁剪部分已超出token预算: {final_total}/{self.budget}")
+
+        MetricsUtil.observe("proposal_prompt_tokens", final_total, {"prompt": self.name},
+                            buckets=TOKEN_BUCKETS, help_text="发送给LLM的prompt token数（裁剪后）")
+        if final_total < total:
+            MetricsUtil.inc("proposal_prompt_trimmed_tokens_total", {"prompt": self.name}, total - final_total,
+                            help_text="因超出预算被裁剪掉的prompt token数")
+        return {c["key"]: c["text"] for c in self.components}
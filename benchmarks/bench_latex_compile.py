@@ -0,0 +1,91 @@
+"""
+PDF编译耗时的基准测试
+用exporter/main.tex填充合成内容，对比：
+- legacy：复制文档类和Logo到构建目录，固定编译两遍（改造前的流程）
+- cold：LatexUtil首次编译（没有辅助文件种子，编译到辅助文件收敛为止）
+- warm：LatexUtil再次编译同一文档（命中辅助文件种子，通常只需一遍）
+
+用法: python benchmarks/bench_latex_compile.py [--runs 3]
+需要本机安装xelatex，否则直接退出
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+from src.utils.latex_util import LatexUtil  # noqa: E402
+
+EXPORTER_DIR = os.path.join(ROOT_DIR, "exporter")
+JOBNAME = "bench_proposal"
+
+PARAGRAPH = ("本研究围绕大规模语言模型在科研辅助中的应用展开，重点考察检索增强生成、长文档理解与多智能体协作，"
+             "并在公开数据集上系统评估其有效性与鲁棒性。")
+
+
+def build_document() -> str:
+    with open(os.path.join(EXPORTER_DIR, "main.tex"), "r", encoding="utf-8") as f:
+        template = f.read()
+    body = "\n\n".join(f"\\subsection{{小节{i}}}\n" + PARAGRAPH * 6 for i in range(1, 9))
+    template = template.replace("[title]", "基准测试研究计划").replace("[time]", "2024年6月")
+    for section in ["引言", "文献综述", "研究内容", "总结"]:
+        template = template.replace(f"[{section}]", body)
+    return template.replace("[参考文献内容]", "").replace("[Mermaid Image]", "")
+
+
+def legacy_compile(document: str) -> float:
+    """改造前的流程：复制静态资源，固定两遍编译"""
+    with tempfile.TemporaryDirectory(prefix="bench_legacy_") as build_dir:
+        with open(os.path.join(build_dir, f"{JOBNAME}.tex"), "w", encoding="utf-8") as f:
+            f.write(document)
+        start = time.perf_counter()
+        shutil.copy2(os.path.join(EXPORTER_DIR, "phdproposal.cls"), build_dir)
+        shutil.copytree(os.path.join(EXPORTER_DIR, "figures"), os.path.join(build_dir, "figures"))
+        for _ in range(2):
+            subprocess.run(["xelatex", "-interaction=nonstopmode", "-halt-on-error", f"{JOBNAME}.tex"],
+                           cwd=build_dir, capture_output=True, check=True, timeout=300)
+        return time.perf_counter() - start
+
+
+def util_compile(document: str, cache_dir: str):
+    with tempfile.TemporaryDirectory(prefix="bench_util_") as build_dir:
+        tex_path = os.path.join(build_dir, f"{JOBNAME}.tex")
+        with open(tex_path, "w", encoding="utf-8") as f:
+            f.write(document)
+        start = time.perf_counter()
+        result = LatexUtil.compile(tex_path, EXPORTER_DIR, cache_dir)
+        elapsed = time.perf_counter() - start
+        if not result.success:
+            raise RuntimeError(result.error)
+        return elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if not LatexUtil.is_available():
+        print("未找到xelatex，跳过PDF编译基准测试")
+        return
+
+    document = build_document()
+    print(f"{'mode':>7} | {'run':>3} | {'time(s)':>8} | {'passes':>6}")
+    for run in range(1, args.runs + 1):
+        print(f"{'legacy':>7} | {run:>3} | {legacy_compile(document):>8.2f} | {2:>6}")
+
+    with tempfile.TemporaryDirectory(prefix="bench_latex_cache_") as cache_dir:
+        elapsed, result = util_compile(document, cache_dir)
+        print(f"{'cold':>7} | {1:>3} | {elapsed:>8.2f} | {result.passes:>6}")
+        for run in range(1, args.runs + 1):
+            elapsed, result = util_compile(document, cache_dir)
+            print(f"{'warm':>7} | {run:>3} | {elapsed:>8.2f} | {result.passes:>6}")
+
+
+if __name__ == "__main__":
+    main()
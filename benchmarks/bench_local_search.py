@@ -0,0 +1,104 @@
+"""
+本地混合检索基准：在合成的论文语料（标题+摘要，中英文混合）上测量
+- BM25倒排索引的构建耗时和索引规模
+- 查询延迟（p50/p95），以及与一路向量候选做倒数排名融合后的延迟
+向量检索本身由Chroma完成，这里用随机排序代替，只计入融合开销
+
+用法: python benchmarks/bench_local_search.py [--sizes 10000 100000] [--queries 200]
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from backend.src.utils.bm25_util import Bm25Index, reciprocal_rank_fusion  # noqa: E402
+
+EN_TERMS = ("transformer attention retrieval augmented generation graph neural network reinforcement learning "
+            "diffusion model contrastive representation benchmark multimodal alignment distillation federated "
+            "privacy robustness adversarial segmentation detection tracking planning reasoning agent memory "
+            "compression quantization pruning optimization convergence sampling uncertainty calibration").split()
+ZH_TERMS = ("大语言模型 检索增强 图神经网络 强化学习 扩散模型 对比学习 多模态 知识蒸馏 联邦学习 隐私保护 鲁棒性 "
+            "对抗样本 目标检测 语义分割 推理能力 智能体 长期记忆 模型压缩 量化 剪枝 优化算法 不确定性 校准").split()
+FILLER_ZH = "本文提出一种新的方法并在多个数据集上验证了其有效性实验结果表明该方法显著优于现有基线"
+# 长尾词表（按Zipf分布抽样），使词项分布接近真实语料，而不是所有文档共用几百个词
+RARE_TERMS = [f"term{i}" for i in range(50000)]
+RARE_CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(RARE_TERMS))))
+
+
+def build_corpus(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(size):
+        rare = rng.choices(RARE_TERMS, cum_weights=RARE_CUM_WEIGHTS, k=40)
+        if rng.random() < 0.5:
+            words = rng.choices(EN_TERMS, k=rng.randint(40, 100)) + rare
+            title = " ".join(rng.choices(EN_TERMS, k=6))
+        else:
+            words = rng.choices(ZH_TERMS, k=rng.randint(20, 40)) + [FILLER_ZH[:rng.randint(20, len(FILLER_ZH))]] + rare
+            title = "".join(rng.choices(ZH_TERMS, k=3))
+        corpus.append((f"paper:{index}", f"{title}\n{title}\n{' '.join(words)}"))
+    return corpus
+
+
+def build_queries(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            queries.append(" ".join(rng.sample(EN_TERMS, 2) + rng.sample(RARE_TERMS[100:5000], 1)))
+        else:
+            queries.append("".join(rng.sample(ZH_TERMS, 2)))
+    return queries
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(size: int, query_count: int, k: int, fetch_k: int):
+    corpus = build_corpus(size)
+    index = Bm25Index()
+    start = time.perf_counter()
+    for key, text in corpus:
+        index.add(key, text)
+    build_seconds = time.perf_counter() - start
+    postings = sum(len(p) for p in index.postings.values())
+
+    rng = random.Random(3)
+    keys = [key for key, _ in corpus]
+    bm25_latencies, hybrid_latencies = [], []
+    for query in build_queries(query_count):
+        start = time.perf_counter()
+        bm25_ranking = [key for key, _ in index.search(query, fetch_k)]
+        bm25_latencies.append(time.perf_counter() - start)
+        vector_ranking = rng.sample(keys, fetch_k)
+        reciprocal_rank_fusion([bm25_ranking, vector_ranking])[:k]
+        hybrid_latencies.append(time.perf_counter() - start)
+
+    print(f"{size:>7} 篇: 构建 {build_seconds:.2f}s（{size / build_seconds:,.0f} 篇/s），"
+          f"词项 {len(index.postings):,}，倒排记录 {postings:,}")
+    print(f"         BM25 查询 p50 {percentile(bm25_latencies, 0.5) * 1000:.1f}ms "
+          f"p95 {percentile(bm25_latencies, 0.95) * 1000:.1f}ms；"
+          f"含RRF融合 p50 {percentile(hybrid_latencies, 0.5) * 1000:.1f}ms "
+          f"p95 {percentile(hybrid_latencies, 0.95) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地BM25+向量混合检索基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--fetch-k", type=int, default=50)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.k, args.fetch_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+长论文总结的覆盖率与耗时：用合成的论文全文（摘要、6个章节、参考文献）对比
+- head：改造前的做法，截取前10000字符一次总结
+- 分章节：summarize_pdf 按章节切分，在单次调用的token上限内给每个章节分配预算后一次总结；
+  设置环境变量 PDF_SUMMARY_MAP_REDUCE=1 时长论文改为并发总结片段后合并（map-reduce）
+假模型的延迟 = 固定开销 + 输入token × 预填充耗时 + 输出token × 解码耗时（输出token取max_tokens或约定长度），
+统计送入模型的字符数、覆盖的章节数、调用次数和单篇论文的墙钟时间
+
+用法: python benchmarks/bench_pdf_summary.py [--pages 10 20 60] [--decode-ms 20] [--prefill-ms 0.2]
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from backend.src.agent import tools  # noqa: E402
+from backend.src.utils.token_util import TokenUtil  # noqa: E402
+
+SECTIONS = ["1 Introduction", "2 Related Work", "3 Method", "4 Experiments", "5 Discussion", "6 Conclusion"]
+SENTENCE = ("We evaluate the proposed retrieval-augmented model on five benchmarks and report accuracy, "
+            "latency and robustness under distribution shift, observing consistent gains of 3.2 points. ")
+# 最终摘要约300-400中文字，约600 token
+FINAL_SUMMARY_TOKENS = 600
+
+
+def build_paper(pages: int) -> str:
+    per_section = max(1, pages * 3000 // (len(SECTIONS) * len(SENTENCE)))
+    parts = ["Retrieval-Augmented Models at Scale\nA. Author, B. Author\n\nAbstract\n" + SENTENCE * 6]
+    for title in SECTIONS:
+        paragraphs = "\n\n".join(SENTENCE * 5 for _ in range(max(1, per_section // 5)))
+        parts.append(f"{title}\n{paragraphs}")
+    parts.append("References\n" + "".join(f"[{i}] A. Author. Some title. 2023.\n" for i in range(60)))
+    return "\n".join(parts)
+
+
+class FakeChatModel:
+    """按输入输出token数模拟延迟的假模型，记录每次调用看到的原文"""
+    calls = []
+
+    def __init__(self, prefill_ms: float, decode_ms: float, overhead: float, max_tokens=None, **kwargs):
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+        self.overhead = overhead
+        self.max_tokens = max_tokens
+
+    def invoke(self, messages):
+        prompt = messages[-1].content
+        output_tokens = self.max_tokens or FINAL_SUMMARY_TOKENS
+        time.sleep(self.overhead + (TokenUtil.count_tokens(prompt) * self.prefill_ms
+                                    + output_tokens * self.decode_ms) / 1000)
+        FakeChatModel.calls.append(prompt)
+        return SimpleNamespace(content="要点" * 50)
+
+
+def covered_sections(prompts) -> int:
+    return sum(1 for title in SECTIONS if any(title in prompt for prompt in prompts))
+
+
+def run(paper: str, pages: int, model_args: dict):
+    print(f"{pages} 页合成论文 {len(paper)} 字符，{len(SECTIONS)} 个章节")
+
+    # head：截取前10000字符，一次调用
+    FakeChatModel.calls = []
+    start = time.perf_counter()
+    head = paper[:10000]
+    FakeChatModel(**model_args).invoke([SimpleNamespace(content=tools.PDF_SUMMARY_PROMPT.format(text=head))])
+    print(f"  head  : 送入 {len(head):>6} 字符，覆盖章节 {covered_sections(FakeChatModel.calls)}/{len(SECTIONS)}，"
+          f"调用 1 次，耗时 {time.perf_counter() - start:.2f}s")
+
+    # 分章节：替换提取函数和模型后调用真实的summarize_pdf
+    FakeChatModel.calls = []
+    tools._extract_pdf_text = lambda path, max_chars: paper[:max_chars]
+    start = time.perf_counter()
+    result = tools.summarize_pdf.invoke({"path": "synthetic.pdf"})
+    elapsed = time.perf_counter() - start
+    print(f"  分章节: 送入 {result['covered_chars']:>6} 字符，覆盖章节 {covered_sections(FakeChatModel.calls)}/{len(SECTIONS)}，"
+          f"调用 {len(FakeChatModel.calls)} 次（{result['chunks']} 个片段），耗时 {elapsed:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="长论文总结的覆盖率与耗时")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 20, 60], help="正文页数（每页约3000字符）")
+    parser.add_argument("--prefill-ms", type=float, default=0.2, help="每个输入token的耗时（毫秒）")
+    parser.add_argument("--decode-ms", type=float, default=20, help="每个输出token的耗时（毫秒）")
+    parser.add_argument("--overhead", type=float, default=0.5, help="每次调用的固定开销（秒）")
+    args = parser.parse_args()
+
+    model_args = dict(prefill_ms=args.prefill_ms, decode_ms=args.decode_ms, overhead=args.overhead)
+    tools.ChatOpenAI = lambda **kwargs: FakeChatModel(**model_args, **{k: v for k, v in kwargs.items()
+                                                                       if k == "max_tokens"})
+    for pages in args.pages:
+        run(build_paper(pages), pages, model_args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+服务启动耗时基准：在子进程中用 python -X importtime 导入 src.routers.server（与uvicorn启动时相同），统计
+- 导入总耗时（墙钟）和importtime累计耗时
+- 累计耗时最高的模块
+- 启动阶段是否加载了重型依赖（chromadb、langchain、fitz等应在首次使用时才导入）
+
+用法: python benchmarks/bench_startup.py [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+
+# 只应在生成计划书、检索或导出时才需要的模块
+HEAVY_MODULES = (
+    "langchain_chroma", "chromadb", "langchain_dashscope", "langchain_community", "langchain_openai",
+    "langchain_core", "langgraph", "fitz", "arxiv", "scholarly", "crossref", "tavily",
+)
+# import time: self [us] | cumulative | imported package
+_IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def run_once(module: str):
+    """返回 (墙钟秒数, [(模块名, 累计微秒, 嵌套深度)])"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        tail = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        raise SystemExit(f"导入 {module} 失败:\n{tail[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if match:
+            depth = (len(match.group(3)) - 1) // 2
+            entries.append((match.group(4), int(match.group(2)), depth))
+    return wall, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服务启动导入耗时基准")
+    parser.add_argument("--module", default="src.routers.server", help="要导入的模块（相对于backend目录）")
+    parser.add_argument("--runs", type=int, default=3, help="重复次数，取最快的一次")
+    parser.add_argument("--top", type=int, default=15, help="列出累计耗时最高的模块数")
+    args = parser.parse_args()
+
+    runs = [run_once(args.module) for _ in range(args.runs)]
+    wall, entries = min(runs, key=lambda run: run[0])
+    total_us = sum(cumulative for _, cumulative, depth in entries if depth == 0)
+    print(f"导入 {args.module}: 墙钟 {wall * 1000:.0f}ms（{args.runs}次取最快，含解释器启动），"
+          f"importtime累计 {total_us / 1000:.0f}ms，共 {len(entries)} 个模块")
+
+    print(f"\n累计耗时最高的 {args.top} 个模块:")
+    for name, cumulative, _ in sorted(entries, key=lambda entry: -entry[1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    loaded = sorted({name.split(".")[0] for name, _, _ in entries} & set(HEAVY_MODULES))
+    if loaded:
+        print(f"\n⚠️ 启动时加载了重型依赖: {', '.join(loaded)}")
+        sys.exit(1)
+    print("\n✅ 启动时未加载重型依赖")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 from backend.src.agent.graph import ProposalAgent
-from backend.src.reviewer.reviewer import ReviewerAgent
+from backend.src.reviewer.reviewer import get_reviewer
+from backend.src.utils.md_section_util import MdSectionIndex
 import os
 import json
 import argparse
 import logging
-import re
 from datetime import datetime
 
 logging.basicConfig(
@@ -32,28 +32,18 @@ def load_original_proposal(file_path):
         return None
 
 def extract_sections(content):
-    """从原始内容中提取各个章节"""
+    """从原始内容中提取各个章节（一次扫描建立章节索引后按标题查找）"""
+    index = MdSectionIndex(content)
     sections = {}
-    
-    # 提取引言部分
-    intro_match = re.search(r'(?:# 引言|## 引言|# 1[\.、]\s*引言)(.*?)(?=# |## |$)', content, re.DOTALL)
-    if intro_match:
-        sections['introduction'] = intro_match.group(1).strip()
-    
-    # 提取文献综述
-    lit_review_match = re.search(r'(?:# 文献综述|## 文献综述|# 2[\.、]\s*文献综述)(.*?)(?=# |## |$)', content, re.DOTALL)
-    if lit_review_match:
-        sections['literature_review'] = lit_review_match.group(1).strip()
-    
-    # 提取研究设计
-    design_match = re.search(r'(?:# 研究设计|## 研究设计|# 3[\.、]\s*研究设计)(.*?)(?=# |## |$)', content, re.DOTALL)
-    if design_match:
-        sections['research_design'] = design_match.group(1).strip()
-    
-    # 提取结论部分
-    conclusion_match = re.search(r'(?:# 结论|## 结论|# 4[\.、]\s*结论)(.*?)(?=# |## |$)', content, re.DOTALL)
-    if conclusion_match:
-        sections['conclusion'] = conclusion_match.group(1).strip()
+    for key, titles in [
+        ('introduction', ['引言']),
+        ('literature_review', ['文献综述']),
+        ('research_design', ['研究设计']),
+        ('conclusion', ['结论']),
+    ]:
+        body = index.section_text(titles, include_heading=False).strip()
+        if body:
+            sections[key] = body
     
     return sections
 
@@ -158,17 +148,13 @@ def format_revision_guidance(review_result, original_content=None):
 
 def main():
     parser = argparse.ArgumentParser(description="使用评审结果改进研究计划书")
-    parser.add_argument("--review", "-r", help="评审结果JSON文件路径", required=True)
+    parser.add_argument("--review", "-r", help="评审结果JSON文件路径（不提供时直接评审原始研究计划书，相同内容复用已缓存的评审结果）")
     parser.add_argument("--original", "-o", help="原始研究计划书文件路径")
     parser.add_argument("--question", "-q", help="原始研究问题")
     
     args = parser.parse_args()
-    
-    # 加载评审结果
-    review_result = load_review_result(args.review)
-    if not review_result:
-        print("无法加载评审结果，请检查文件路径")
-        return
+    if not args.review and not args.original:
+        parser.error("请提供评审结果文件 (--review) 或原始研究计划书 (--original)")
     
     # 加载原始研究计划（如果提供）
     original_content = None
@@ -179,6 +165,18 @@ def main():
         else:
             print("警告: 无法加载原始研究计划，将不使用原文进行参考")
     
+    # 加载评审结果：优先使用评审文件，否则在内存中评审原文
+    if args.review:
+        review_result = load_review_result(args.review)
+    elif original_content:
+        print("未提供评审结果文件，正在评审原始研究计划...")
+        review_result = get_reviewer().review_proposal(original_content, args.question or "通用研究")
+    else:
+        review_result = None
+    if not review_result or not review_result.get("success"):
+        print("无法获取评审结果，请检查文件路径")
+        return
+    
     # 获取原始研究问题
     research_question = args.question
     if not research_question:
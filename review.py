@@ -1,4 +1,4 @@
-from backend.src.reviewer.reviewer import ReviewerAgent
+from backend.src.reviewer.reviewer import get_reviewer
 import os
 import logging
 import json
@@ -41,6 +41,7 @@ def main():
     parser.add_argument("--file", "-f", help="要评审的研究计划书文件路径")
     parser.add_argument("--section", "-s", help="要评审的特定章节 (引言/文献综述/研究设计/结论)")
     parser.add_argument("--field", "-r", default="通用研究", help="研究领域")
+    parser.add_argument("--no-cache", action="store_true", help="忽略已缓存的评审结果，重新评审")
     
     args = parser.parse_args()
     
@@ -48,8 +49,8 @@ def main():
         print("请指定要评审的文件路径。使用 --file 参数。")
         return
     
-    # 初始化评审代理
-    reviewer = ReviewerAgent()
+    # 获取共享的评审代理
+    reviewer = get_reviewer()
     
     # 加载研究计划书
     proposal_content = load_proposal_from_file(args.file)
@@ -67,7 +68,7 @@ def main():
     else:
         # 评审整个研究计划书
         print(f"正在评审完整研究计划书...")
-        result = reviewer.review_proposal(proposal_content, args.field)
+        result = reviewer.review_proposal(proposal_content, args.field, use_cache=not args.no_cache)
     
     if result.get("success"):
         # 保存评审结果